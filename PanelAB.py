@@ -1,13 +1,14 @@
 from PyQt6.QtWidgets import (QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsTextItem, 
                              QGraphicsItem, QMenu, QDialog, QWidget, QVBoxLayout, QPushButton, 
-                             QStackedLayout, QInputDialog, QGraphicsSimpleTextItem, QTabWidget, QApplication, QStyleOptionGraphicsItem,
-                             QHBoxLayout, QLineEdit, QTextEdit, QComboBox)
-from PyQt6.QtCore import Qt, pyqtSignal, QRectF, QPoint, QPointF, QMimeData, QByteArray, QDataStream, QIODevice, QUrl, QEvent
-from PyQt6.QtGui import QColor, QBrush, QPen, QFont, QPainter, QCursor, QDrag, QPixmap, QFontMetrics
+                             QStackedLayout, QInputDialog, QGraphicsSimpleTextItem, QTabWidget, QApplication,
+                             QHBoxLayout, QLineEdit, QTextEdit, QComboBox, QRubberBand)
+from PyQt6.QtCore import Qt, pyqtSignal, QRectF, QPoint, QPointF, QMimeData, QByteArray, QDataStream, QIODevice, QUrl, QEvent, QTimer, QRect
+from PyQt6.QtGui import QColor, QBrush, QPen, QFont, QPainter, QCursor, QDrag, QPixmap, QFontMetrics, QPolygonF
 import config
-from map_view import get_cell_layout
-from utils import get_font_name, get_fitted_font_size
-from editor_window import EditCellDialog
+from map_view import get_cell_layout, column_label, CellIndex
+from cell_model import cell_visuals
+from utils import get_fitted_font_size
+from editor_window import EditCellDialog, BulkEditCellDialog
 from detailed_view import DetailedView
 from Chars import PlayersTab
 from OrangeTab import OrangeTab
@@ -15,6 +16,10 @@ from ItemsTab import ItemsTab
 from PurpleTab import PurpleTab
 from text_formatting import RichTextEditor, FormattingToolbar
 import os
+import math
+import time
+from collections import OrderedDict
+from itertools import count
 
 class LoreTab(QWidget):
     def __init__(self, parent=None):
@@ -141,34 +146,159 @@ class LoreTab(QWidget):
         if self.combo_lore.currentText() == "Текущий сюжет":
             self.text_edit.setHtml(self.current_story_text)
 
+class CellPixmapCache:
+    """
+    Готовые картинки содержимого ячеек (заливка и подписи), общие для обеих карт.
+    Ключ: (версия данных ячейки, толщина обводки подсветки, ступень масштаба, размер ячейки).
+    При превышении бюджета выбрасываются давно не использованные картинки.
+    """
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.pixmaps = OrderedDict()
+
+    def get(self, key):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.discard(key)
+        self.pixmaps[key] = pixmap
+        self.used_bytes += self.pixmap_bytes(pixmap)
+        while self.used_bytes > self.budget_bytes and len(self.pixmaps) > 1:
+            _, old = self.pixmaps.popitem(last=False)
+            self.used_bytes -= self.pixmap_bytes(old)
+
+    def discard(self, key):
+        pixmap = self.pixmaps.pop(key, None)
+        if pixmap is not None:
+            self.used_bytes -= self.pixmap_bytes(pixmap)
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.used_bytes = 0
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+cell_pixmap_cache = CellPixmapCache(config.CELL_PIXMAP_CACHE_MB * 1024 * 1024)
+
+# Номер сцены в ключах плиток: у разных сцен плитки не пересекаются
+_scene_ids = count(1)
+
+
+def event_view(event):
+    """Вид карты, в котором произошло событие мыши (сцена общая для обеих панелей)."""
+    widget = event.widget()
+    return widget.parentWidget() if widget else None
+
+
+# Уровни детализации ячеек: плашка, только номер, полный текст
+LOD_FLAT, LOD_NUMBER, LOD_FULL = 0, 1, 2
+
+
+def lod_tier(scale):
+    if scale < config.LOD_FLAT_BELOW:
+        return LOD_FLAT
+    if scale < config.LOD_NUMBER_BELOW:
+        return LOD_NUMBER
+    return LOD_FULL
+
+
+def view_lod_tier(widget):
+    """Уровень детализации вида, который сейчас рисует сцену (без вида - например, картинка для перетаскивания - полный)."""
+    view = widget.parentWidget() if widget else None
+    return getattr(view, 'lod_tier', LOD_FULL)
+
+
+# Сколько ступеней зума вперед покрывает одна картинка ячейки
+BUCKETS_AHEAD = 2
+
+# До какого момента текущий кадр вида может готовить новые картинки (None - без ограничения)
+_render_deadline = None
+_frame_deferred = False
+
+
+def start_frame():
+    """Вид начинает кадр: отсчет времени на подготовку новых картинок ячеек и плиток."""
+    global _render_deadline, _frame_deferred
+    _render_deadline = time.perf_counter() + config.MAP_RENDER_BUDGET_MS / 1000
+    _frame_deferred = False
+
+
+def frame_time_left():
+    return _render_deadline is None or time.perf_counter() < _render_deadline
+
+
+def defer_to_next_frame(widget):
+    """Не успевшее в кадр дорисуется в следующем: одна перерисовка вида на кадр."""
+    global _frame_deferred
+    if not _frame_deferred:
+        _frame_deferred = True
+        QTimer.singleShot(0, widget.update)
+
+
+def scale_bucket(scale):
+    """
+    Ступень масштаба: четверть октавы с округлением вверх. При плавном зуме картинки
+    переиспользуются и не мылятся.
+    """
+    return math.ceil(math.log2(max(scale, 1 / 64)) * 4)
+
+
+def bucket_scale(bucket):
+    return 2 ** (bucket / 4)
+
+
+def paint_cell_content(painter, data, content_rect, rect, tier=LOD_FULL):
+    """Заливка (внутри обводки rect) и подписи ячейки; на уровне LOD_NUMBER - только номер."""
+    visuals = cell_visuals(data)
+    painter.setBrush(QBrush(visuals.fill_color))
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.drawRoundedRect(rect, config.CELL_RADIUS, config.CELL_RADIUS)
+
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+
+    painter.setFont(visuals.number_font)
+    painter.setPen(visuals.number_color)
+
+    if visuals.is_inner_contour or not visuals.name_text or tier == LOD_NUMBER:
+        painter.drawText(content_rect, Qt.AlignmentFlag.AlignCenter, visuals.number_text)
+    else:
+        num_rect = QRectF(content_rect.x(), content_rect.y() + content_rect.height() * 0.05, content_rect.width(), content_rect.height() * 0.30)
+        painter.drawText(num_rect, Qt.AlignmentFlag.AlignCenter, visuals.number_text)
+        
+        fitted_font_size = get_fitted_font_size(visuals.name_text, visuals.name_bold, int(visuals.name_size), rect.width() * 0.95)
+        
+        painter.setFont(visuals.name_font(fitted_font_size))
+        painter.setPen(visuals.name_color)
+        
+        name_rect = QRectF(content_rect.x() + 5, content_rect.y() + content_rect.height() * 0.35, content_rect.width() - 10, content_rect.height() * 0.65)
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, visuals.wrapped_name)
+
+
 class MapCellItem(QGraphicsRectItem):
-    def __init__(self, r, c, x, y, w, h, data, parent_view):
+    """
+    Ячейка карты в общей сцене. Выделение активной ячейки у каждого вида свое
+    и рисуется поверх сцены (MapGraphicsView.drawForeground).
+    """
+    def __init__(self, r, c, x, y, w, h, data):
         super().__init__(float(x), float(y), float(w), float(h))
         self.r = r
         self.c = c
         self.data = data
-        self.parent_view = parent_view
         
         self.setAcceptHoverEvents(True)
         
         self.is_hovered = False
-        self.is_active = False 
-        self.is_remote_active = False 
-        self.is_drop_target = False
         self._drag_started = False
         self._drag_start_pos = QPoint()
-
-    def set_active(self, active):
-        self.is_active = active
-        self.update()
-
-    def set_remote_active(self, active):
-        self.is_remote_active = active
-        self.update()
-
-    def set_drop_target(self, active):
-        self.is_drop_target = active
-        self.update()
+        self.cache_keys = set()
 
     def hoverEnterEvent(self, event):
         self.is_hovered = True
@@ -180,77 +310,120 @@ class MapCellItem(QGraphicsRectItem):
         self.update()
         super().hoverLeaveEvent(event)
 
-    def paint(self, painter, option, widget=None):
-        color_str = self.data.get('color', '#CCCCCC')
-        if not isinstance(color_str, str) or not color_str.startswith('#'):
-            color_str = '#CCCCCC'
-        color = QColor(color_str)
-        painter.setBrush(QBrush(color))
-
-        pen_width = 0
-        if self.is_drop_target:
-            pen = QPen(QColor(0, 255, 0), 4)
-            pen_width = 4
-            painter.setPen(pen)
-        elif self.is_remote_active or self.is_active:
-            pen = QPen(QColor(*config.REMOTE_HIGHLIGHT_COLOR), 4)
-            pen_width = 4
-            painter.setPen(pen)
-        elif self.is_hovered:
-            pen = QPen(QColor(*config.HIGHLIGHT_COLOR), 3)
-            pen_width = 3
-            painter.setPen(pen)
-        else:
-            painter.setPen(Qt.PenStyle.NoPen)
+    def outline_pen(self):
+        """Обводка подсветки (или None) и ее толщина. Цель перетаскивания рисует вид (drawForeground)."""
+        if self.is_hovered:
+            return QPen(QColor(*config.HIGHLIGHT_COLOR), 3), 3
+        return None, 0
 
+    def paint(self, painter, option, widget=None):
+        pen, pen_width = self.outline_pen()
         rect = self.rect()
+        inset_rect = rect
         if pen_width > 0:
             inset = pen_width / 2.0
-            rect = rect.adjusted(inset, inset, -inset, -inset)
-            
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.drawRoundedRect(rect, config.CELL_RADIUS, config.CELL_RADIUS)
+            inset_rect = rect.adjusted(inset, inset, -inset, -inset)
 
-        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+        tier = view_lod_tier(widget)
+        lazy = self.scene().lazy
+        if tier != LOD_FULL and lazy:
+            # Отдаленную большую сетку вид рисует плитками (MapScene.draw_tiles), от ячейки нужна только обводка
+            self.paint_outline(painter, pen, inset_rect)
+            return
 
-        content_rect = self.rect()
-        
-        num_text = str(self.data.get('number', '0000'))
-        if self.data.get('room_type') == 'Сгенерированная зала':
-            num_text = f"-{num_text}-"
-        
-        name_text = str(self.data.get('name', '')).strip()
-        has_name = bool(name_text)
-        room_type = self.data.get('room_type', '')
-        is_inner_contour = room_type == 'Зала внутреннего контура'
+        scale = option.levelOfDetailFromTransform(painter.worldTransform()) * painter.device().devicePixelRatioF()
+        version = getattr(self.data, 'version', None)
+        if tier == LOD_FLAT:
+            # Ячейка в несколько пикселей: текст не нужен, картинка тоже
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QBrush(cell_visuals(self.data).fill_color))
+            painter.drawRoundedRect(inset_rect, config.CELL_RADIUS, config.CELL_RADIUS)
+        elif version is None or scale > config.CELL_PIXMAP_MAX_SCALE:
+            paint_cell_content(painter, self.data, rect, inset_rect, tier)
+        else:
+            # На большой сетке подходит и картинка на пару ступеней крупнее (уменьшается без потерь),
+            # новая готовится с запасом: при зуме колесом ячейки не перерисовываются на каждом шаге
+            bucket = scale_bucket(scale)
+            buckets_ahead = BUCKETS_AHEAD if lazy else 0
+            for ahead in range(buckets_ahead + 1):
+                key = (version, pen_width, bucket + ahead, rect.width(), rect.height(), tier)
+                pixmap = cell_pixmap_cache.get(key)
+                if pixmap is not None:
+                    break
+            else:
+                if widget is not None and lazy and not frame_time_left():
+                    # Большая сетка, кадр исчерпан: пока плашка, картинка будет готова в следующем кадре
+                    defer_to_next_frame(widget)
+                else:
+                    bucket = min(bucket + buckets_ahead, scale_bucket(config.CELL_PIXMAP_MAX_SCALE))
+                    key = (version, pen_width, bucket, rect.width(), rect.height(), tier)
+                    pixmap = self.render_content(rect, inset_rect, bucket_scale(bucket), tier)
+                    cell_pixmap_cache.put(key, pixmap)
+                    self.cache_keys.add(key)
+            if pixmap is None:
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QBrush(cell_visuals(self.data).fill_color))
+                painter.drawRoundedRect(inset_rect, config.CELL_RADIUS, config.CELL_RADIUS)
+            else:
+                painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+                painter.drawPixmap(rect.topLeft(), pixmap)
+        self.paint_outline(painter, pen, inset_rect)
+
+    @staticmethod
+    def paint_outline(painter, pen, inset_rect):
+        if pen:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.setPen(pen)
+            painter.drawRoundedRect(inset_rect, config.CELL_RADIUS, config.CELL_RADIUS)
 
-        font_size_num = int(self.data.get('font_size_num', 12))
-        is_bold_num = self.data.get('font_weight_num') == 'bold'
-        num_font = QFont(get_font_name(is_bold_num), font_size_num)
-        painter.setFont(num_font)
-        painter.setPen(QColor(self.data.get('text_color', '#000000')))
+    def render_content(self, rect, inset_rect, scale, tier=LOD_FULL):
+        """Рисует содержимое ячейки в картинку с плотностью scale пикселей на единицу сцены."""
+        pixmap = QPixmap(math.ceil(rect.width() * scale), math.ceil(rect.height() * scale))
+        pixmap.setDevicePixelRatio(scale)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.translate(-rect.x(), -rect.y())
+        paint_cell_content(painter, self.data, rect, inset_rect, tier)
+        painter.end()
+        return pixmap
 
-        if is_inner_contour or not has_name:
-            painter.drawText(content_rect, Qt.AlignmentFlag.AlignCenter, num_text)
-        else:
-            num_rect = QRectF(content_rect.x(), content_rect.y() + content_rect.height() * 0.05, content_rect.width(), content_rect.height() * 0.30)
-            painter.drawText(num_rect, Qt.AlignmentFlag.AlignCenter, num_text)
-            
-            initial_font_size_name = int(self.data.get('font_size_name', 10))
-            is_bold_name = self.data.get('font_weight_name') == 'bold'
-            
-            fitted_font_size = get_fitted_font_size(name_text, is_bold_name, initial_font_size_name, rect.width() * 0.95)
-            
-            name_font = QFont(get_font_name(is_bold_name), fitted_font_size)
-            painter.setFont(name_font)
-            painter.setPen(QColor(self.data.get('text_color_name', '#000000')))
-            
-            formatted_name = name_text.replace(' ', '\n')
-            
-            name_rect = QRectF(content_rect.x() + 5, content_rect.y() + content_rect.height() * 0.35, content_rect.width() - 10, content_rect.height() * 0.65)
-            painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, formatted_name)
+    def drag_ghost(self, scale):
+        """
+        Полупрозрачная картинка ячейки для перетаскивания при масштабе вида scale.
+        Берется из общего кэша картинок и сама кэшируется до смены данных ячейки.
+        """
+        rect = self.rect()
+        version = getattr(self.data, 'version', None)
+        bucket = min(scale_bucket(scale), scale_bucket(config.CELL_PIXMAP_MAX_SCALE))
+        ghost_key = (version, 'ghost', bucket, rect.width(), rect.height())
+        ghost = cell_pixmap_cache.get(ghost_key) if version is not None else None
+        if ghost is None:
+            key = (version, 0, bucket, rect.width(), rect.height(), LOD_FULL)
+            pixmap = cell_pixmap_cache.get(key) if version is not None else None
+            if pixmap is None:
+                pixmap = self.render_content(rect, rect, bucket_scale(bucket))
+            ghost = QPixmap(pixmap.size())
+            ghost.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(ghost)
+            painter.setOpacity(0.7)
+            painter.drawPixmap(0, 0, pixmap)
+            painter.end()
+            if version is not None:
+                cell_pixmap_cache.put(ghost_key, ghost)
+                self.cache_keys.add(ghost_key)
+        # Картинка ступени может быть крупнее вида: на экране она показывается в размере ячейки
+        ghost = QPixmap(ghost)
+        ghost.setDevicePixelRatio(ghost.width() / (rect.width() * scale))
+        return ghost
 
     def update_visuals(self):
+        # Картинки прежней версии данных больше не понадобятся
+        for key in self.cache_keys:
+            cell_pixmap_cache.discard(key)
+        self.cache_keys.clear()
         self.update()
 
     def mousePressEvent(self, event):
@@ -259,7 +432,7 @@ class MapCellItem(QGraphicsRectItem):
             self._drag_started = False
             event.accept()
         elif event.button() == Qt.MouseButton.RightButton:
-            self.parent_view.on_cell_right_clicked(self.r, self.c)
+            event_view(event).on_cell_right_clicked(self.r, self.c)
             event.accept()
         else:
             super().mousePressEvent(event)
@@ -274,7 +447,8 @@ class MapCellItem(QGraphicsRectItem):
                 return
             self._drag_started = True
 
-        drag = QDrag(self.parent_view)
+        view = event_view(event)
+        drag = QDrag(view)
         mime_data = QMimeData()
         
         item_data = QByteArray()
@@ -285,60 +459,102 @@ class MapCellItem(QGraphicsRectItem):
         
         drag.setMimeData(mime_data)
         
-        transform = self.parent_view.transform()
-        scale_x = transform.m11()
-        scale_y = transform.m22()
-        
-        base_size = self.boundingRect().size()
-        scaled_size = base_size.toSize()
-        scaled_size.setWidth(int(base_size.width() * scale_x))
-        scaled_size.setHeight(int(base_size.height() * scale_y))
-        
-        pixmap = QPixmap(scaled_size)
-        pixmap.fill(Qt.GlobalColor.transparent)
-        
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        scale = view.transform().m11()
+        drag.setPixmap(self.drag_ghost(scale))
         
-        painter.scale(scale_x, scale_y)
-        
-        rect = self.rect()
-        painter.translate(-rect.x(), -rect.y())
-        
-        option = QStyleOptionGraphicsItem()
-        self.paint(painter, option, None)
-        painter.end()
-        
-        ghost = QPixmap(pixmap.size())
-        ghost.fill(Qt.GlobalColor.transparent)
-        p = QPainter(ghost)
-        p.setOpacity(0.7)
-        p.drawPixmap(0, 0, pixmap)
-        p.end()
-        
-        drag.setPixmap(ghost)
-        
-        hot_spot = event.pos() - rect.topLeft()
-        hot_spot_x = int(hot_spot.x() * scale_x)
-        hot_spot_y = int(hot_spot.y() * scale_y)
-        drag.setHotSpot(QPoint(hot_spot_x, hot_spot_y))
+        hot_spot = event.pos() - self.rect().topLeft()
+        drag.setHotSpot(QPoint(int(hot_spot.x() * scale), int(hot_spot.y() * scale)))
         
         drag.exec(Qt.DropAction.MoveAction)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             if not self._drag_started:
-                self.parent_view.on_cell_clicked(self.r, self.c)
+                event_view(event).on_cell_clicked(self.r, self.c)
             self._drag_started = False
             event.accept()
         else:
             super().mouseReleaseEvent(event)
 
+class CoordLabelItem(QGraphicsSimpleTextItem):
+    """
+    Подпись координаты. При отдалении вида текст не раскладывается заново:
+    рисуется один раз подготовленная картинка (глиф), все прозрачнее с уменьшением детализации.
+    """
+    OPACITY = {LOD_FLAT: 0.35, LOD_NUMBER: 0.7}
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.glyph = None
+
+    def paint(self, painter, option, widget=None):
+        tier = view_lod_tier(widget)
+        if tier == LOD_FULL:
+            super().paint(painter, option, widget)
+            return
+        if self.glyph is None:
+            bound = self.boundingRect()
+            self.glyph = QPixmap(math.ceil(bound.width()), math.ceil(bound.height()))
+            self.glyph.fill(Qt.GlobalColor.transparent)
+            glyph_painter = QPainter(self.glyph)
+            glyph_painter.setFont(self.font())
+            glyph_painter.setPen(self.brush().color())
+            glyph_painter.drawText(QRectF(self.glyph.rect()), Qt.AlignmentFlag.AlignCenter, self.text())
+            glyph_painter.end()
+        painter.setOpacity(self.OPACITY[tier])
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(QPointF(0, 0), self.glyph)
+
+
+class MovePathItem(QGraphicsItem):
+    """
+    Путь перемещения белой залы по контуру: линия через центры ячеек и точки на них.
+    Путь уже посчитан; анимация только открывает его по шагу (shown - сколько точек видно).
+    """
+    POINT_RADIUS = 10
+
+    def __init__(self, points):
+        super().__init__()
+        self.points = points
+        self.shown = 1
+        self.setZValue(50)
+        self.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+        left = min(p.x() for p in points)
+        top = min(p.y() for p in points)
+        right = max(p.x() for p in points)
+        bottom = max(p.y() for p in points)
+        margin = self.POINT_RADIUS + 4
+        self.bounds = QRectF(left, top, right - left, bottom - top).adjusted(-margin, -margin, margin, margin)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        visible = self.points[:self.shown]
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        pen = QPen(QColor(*config.PATH_COLOR), 6)
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+        painter.setPen(pen)
+        painter.drawPolyline(QPolygonF(visible))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(*config.PATH_POINT_COLOR))
+        for point in visible:
+            painter.drawEllipse(point, self.POINT_RADIUS, self.POINT_RADIUS)
+
+    def advance_step(self):
+        """Открывает следующую точку пути. False - путь показан целиком."""
+        if self.shown >= len(self.points):
+            return False
+        self.shown += 1
+        self.update()
+        return True
+
+
 class TitleItem(QGraphicsTextItem):
-    def __init__(self, text_ref, parent_view):
+    def __init__(self, text_ref):
         super().__init__(text_ref[0])
         self.text_ref = text_ref
-        self.parent_view = parent_view
         
         font = QFont(config.FONT_FAMILY_BOLD, config.BASE_FONT_SIZE_TITLE)
         self.setFont(font)
@@ -346,7 +562,7 @@ class TitleItem(QGraphicsTextItem):
         
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.RightButton:
-            self.parent_view.edit_title()
+            event_view(event).edit_title()
             event.accept()
         else:
             super().mousePressEvent(event)
@@ -354,193 +570,473 @@ class TitleItem(QGraphicsTextItem):
     def update_text(self):
         self.setPlainText(self.text_ref[0])
 
-class MapGraphicsView(QGraphicsView):
-    cell_clicked = pyqtSignal(int, int)
-    cell_data_changed = pyqtSignal(int, int, dict)
-    zoom_changed = pyqtSignal(float)
-    
+class MapScene(QGraphicsScene):
+    """
+    Сетка ячеек, подписи и название похода. Одна сцена на обе панели:
+    правка ячейки перерисовывает один набор элементов, который видят оба вида.
+    На больших сетках элементы ячеек создаются только для видимой в панелях области,
+    а поиск ячейки по точке идет через CellIndex. Отдаленный вид большой сетки рисуется
+    готовыми плитками (draw_tiles) вместо элементов.
+    """
     def __init__(self, cell_data, campaign_title_ref, parent=None):
         super().__init__(parent)
         self.cell_data = cell_data
         self.campaign_title_ref = campaign_title_ref
         
-        self.scene = QGraphicsScene(self)
-        self.setScene(self.scene)
-        
-        self.setBackgroundBrush(QBrush(QColor(50, 50, 50)))
-        
-        self.setRenderHint(QPainter.RenderHint.Antialiasing)
-        self.setDragMode(QGraphicsView.DragMode.NoDrag)
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        self.setAcceptDrops(True)
+        self.cell_items = {}    # только созданные элементы
+        self.label_items = []
+        self.view_rects = {}    # вид -> видимая область сцены
+        self.scene_id = next(_scene_ids)
+        self.tile_keys = set()
         
-        self._panning = False
-        self._pan_start_pos = QPoint()
-        self._last_drop_target = None
+        # Показ пути перемещения белой залы
+        self.path_item = None
+        self.path_timer = QTimer(self)
+        self.path_timer.setInterval(config.WHITE_ROOM_PATH_STEP_MS)
+        self.path_timer.timeout.connect(self.advance_path)
+        self.path_hold_timer = QTimer(self)
+        self.path_hold_timer.setSingleShot(True)
+        self.path_hold_timer.setInterval(config.WHITE_ROOM_PATH_HOLD_MS)
+        self.path_hold_timer.timeout.connect(self.clear_path)
+        self.title_item = TitleItem(self.campaign_title_ref)
+        self.addItem(self.title_item)
         
-        self.cell_items = {}
-        self.active_cell = None
-        self.remote_active_cell = None
+        self._build_layout()
+
+    def _build_layout(self):
+        self.grid_size = (config.ROWS, config.COLS)
         self.cell_layout = get_cell_layout()
-        self.title_item = None
+        self.index = CellIndex(self.cell_layout)
+        # Маленькую сетку дешевле создать целиком, чем следить за видимой областью
+        self.lazy = len(self.cell_layout) > config.MAP_EAGER_CELLS
         
-        self._create_grid()
+        if not self.lazy:
+            self._create_grid()
         self._create_labels()
         self._create_title()
         self._add_scene_padding()
-        
-        if not self.scene.sceneRect().isEmpty():
-             self.centerOn(self.scene.sceneRect().center())
-
-    def showEvent(self, event):
-        super().showEvent(event)
-        if not event.spontaneous():
-            self.zoom_changed.emit(self.transform().m11())
+        self.materialize()
+
+    def _rebuild_layout(self):
+        """Размер сетки сменился (другой поход): элементы и подписи создаются заново."""
+        self.invalidate_tiles()
+        self.clear_path()
+        for item in list(self.cell_items.values()) + self.label_items:
+            self.removeItem(item)
+        self.cell_items = {}
+        self.label_items = []
+        self._build_layout()
 
     def _create_grid(self):
-        if not self.cell_layout:
-            return
+        for coord in self.cell_layout:
+            self._create_item(coord)
 
-        max_y = max(pos[1] + pos[3] for pos in self.cell_layout.values())
-        
-        for (r, c), (x, y, w, h) in self.cell_layout.items():
-            qt_y = max_y - (y + h)
-            if (r, c) in self.cell_data:
-                item = MapCellItem(r, c, x, qt_y, w, h, self.cell_data[(r, c)], self)
-                self.scene.addItem(item)
-                self.cell_items[(r, c)] = item
+    def _create_item(self, coord):
+        if coord in self.cell_items or coord not in self.cell_data:
+            return
+        x, y, w, h = self.index.rects[coord]
+        item = MapCellItem(coord[0], coord[1], x, y, w, h, self.cell_data[coord])
+        self.addItem(item)
+        self.cell_items[coord] = item
+
+    def cell_rect(self, coord):
+        """Прямоугольник ячейки в сцене (есть и у ячеек, чьи элементы еще не созданы)."""
+        rect = self.index.rects.get(coord)
+        return QRectF(*rect) if rect else None
+
+    def cell_at(self, pos):
+        return self.index.cell_at(pos.x(), pos.y())
+
+    def set_view_rect(self, view, rect):
+        """
+        Вид сообщает свою видимую область; на большой сетке под нее создаются элементы ячеек.
+        None - виду элементы не нужны (отдаленный вид рисует плашки сам).
+        """
+        self.view_rects[view] = rect
+        self.materialize()
+
+    def materialize(self):
+        if not self.lazy:
+            return
+        margin = config.CELL_SIZE
+        wanted = set()
+        for rect in self.view_rects.values():
+            if rect is None:
+                continue
+            rect = rect.adjusted(-margin, -margin, margin, margin)
+            wanted |= self.index.cells_in(rect.x(), rect.y(), rect.width(), rect.height())
+        for coord in wanted:
+            self._create_item(coord)
+
+        # Ушедшие из всех видов элементы освобождаются (кэш картинок ячеек остается)
+        grabber = self.mouseGrabberItem()
+        for coord in [coord for coord in self.cell_items if coord not in wanted]:
+            if self.cell_items[coord] is not grabber:
+                self.removeItem(self.cell_items.pop(coord))
 
     def _create_labels(self):
-        if not self.cell_items: return
+        if not self.index.rects: return
         
         font = QFont(config.FONT_FAMILY_BOLD, config.BASE_FONT_SIZE_COORDS)
+        rects = self.index.rects
+        min_x = min(x for x, _, _, _ in rects.values())
+
+        def add_label(text, x, y):
+            text_item = CoordLabelItem(text)
+            text_item.setFont(font)
+            text_item.setBrush(QBrush(QColor("white")))
+            text_item.setZValue(100)
+            self.addItem(text_item)
+            self.label_items.append(text_item)
+            return text_item
         
-        min_y = min(item.rect().y() for item in self.cell_items.values())
-        min_x = min(item.rect().x() for item in self.cell_items.values())
-        
+        # Буквы столбцов - над верхней ячейкой столбца
+        top_in_column = {}
+        for (r, c), rect in rects.items():
+            if c not in top_in_column or rect[1] < rects[top_in_column[c]][1]:
+                top_in_column[c] = (r, c)
         for c in range(config.COLS + config.EXTRA_COLS):
-            cell_in_col = None
-            max_r = -1
-            for r in range(config.ROWS + config.EXTRA_ROWS_TOP + 1):
-                if (r, c) in self.cell_items:
-                    max_r = max(max_r, r)
-            
-            if max_r != -1:
-                cell_in_col = self.cell_items[(max_r, c)]
-                
-                x = cell_in_col.rect().x() + cell_in_col.rect().width() / 2
-                y = cell_in_col.rect().y() - 20
-                
-                label_text = ""
-                if c < config.COLS:
-                    label_text = chr(ord('A') + c)
-                elif c == config.COLS:
-                    label_text = "X"
-                elif c == config.COLS + 1:
-                    label_text = "Z"
-                
-                if label_text:
-                    text_item = QGraphicsSimpleTextItem(label_text)
-                    text_item.setFont(font)
-                    text_item.setBrush(QBrush(QColor("white")))
-                    text_item.setZValue(100)
-                    
-                    bound = text_item.boundingRect()
-                    text_item.setPos(x - bound.width() / 2, y - bound.height())
-                    self.scene.addItem(text_item)
+            if c in top_in_column:
+                x, y, w, _ = rects[top_in_column[c]]
+                text_item = add_label(column_label(c), 0, 0)
+                bound = text_item.boundingRect()
+                text_item.setPos(x + w / 2 - bound.width() / 2, y - 20 - bound.height())
 
+        # Номера рядов основной сетки - слева от сетки
         for r in range(config.ROWS):
-            cell_in_row = None
-            for c in range(config.COLS):
-                if (r, c) in self.cell_items:
-                    cell_in_row = self.cell_items[(r, c)]
-                    break
-            
-            if cell_in_row:
-                y = cell_in_row.rect().y() + cell_in_row.rect().height() / 2
-                x = min_x - 50
-                
-                label_text = str(config.ROWS - r)
-                
-                text_item = QGraphicsSimpleTextItem(label_text)
-                text_item.setFont(font)
-                text_item.setBrush(QBrush(QColor("white")))
-                text_item.setZValue(100)
-                
+            coord = next(((r, c) for c in range(config.COLS) if (r, c) in rects), None)
+            if coord:
+                _, y, _, h = rects[coord]
+                text_item = add_label(str(config.ROWS - r), 0, 0)
                 bound = text_item.boundingRect()
-                text_item.setPos(x - bound.width(), y - bound.height() / 2)
-                self.scene.addItem(text_item)
+                text_item.setPos(min_x - 50 - bound.width(), y + h / 2 - bound.height() / 2)
                 
+        # Номера рядов столбцов X и Z
         for r in range(config.EXTRA_ROWS_TOP + 1):
-            cell_in_row = None
-            for c in range(config.COLS, config.COLS + config.EXTRA_COLS):
-                if (r, c) in self.cell_items:
-                    cell_in_row = self.cell_items[(r, c)]
-                    break
-            
-            if cell_in_row:
-                y = cell_in_row.rect().y() + cell_in_row.rect().height() / 2
-                x = cell_in_row.rect().x() - 20
-                
-                label_text = str(6 - r)
-                
-                text_item = QGraphicsSimpleTextItem(label_text)
-                text_item.setFont(font)
-                text_item.setBrush(QBrush(QColor("white")))
-                text_item.setZValue(100)
-                
+            coord = next(((r, c) for c in range(config.COLS, config.COLS + config.EXTRA_COLS) if (r, c) in rects), None)
+            if coord:
+                x, y, _, h = rects[coord]
+                text_item = add_label(str(6 - r), 0, 0)
                 bound = text_item.boundingRect()
-                text_item.setPos(x - bound.width(), y - bound.height() / 2)
-                self.scene.addItem(text_item)
+                text_item.setPos(x - 20 - bound.width(), y + h / 2 - bound.height() / 2)
 
     def _create_title(self):
-        if not self.cell_items: return
-        min_y = min(item.rect().y() for item in self.cell_items.values())
-        min_x = min(item.rect().x() for item in self.cell_items.values())
-        
-        self.title_item = TitleItem(self.campaign_title_ref, self)
+        if not self.index.rects: return
+        min_x, min_y, _, _ = self.index.bounds()
         self.title_item.setPos(min_x, min_y - 150)
-        self.scene.addItem(self.title_item)
+
+    def content_rect(self):
+        """Ячейки, подписи и название - без полей вокруг."""
+        rect = QRectF(*self.index.bounds())
+        for item in self.label_items + [self.title_item]:
+            rect = rect.united(item.sceneBoundingRect())
+        return rect
 
     def _add_scene_padding(self):
-        rect = self.scene.itemsBoundingRect()
+        rect = self.content_rect()
         padding = 1000
         rect.adjust(-padding, -padding, padding, padding)
-        self.scene.setSceneRect(rect)
+        self.setSceneRect(rect)
+
+    def tile_span(self, tier):
+        """Масштаб плиток уровня tier (верхняя граница уровня) и их сторона в единицах сцены."""
+        scale = config.LOD_FLAT_BELOW if tier == LOD_FLAT else config.LOD_NUMBER_BELOW
+        return scale, config.MAP_TILE_PX / scale
+
+    def tiles_in(self, rect, tier):
+        _, span = self.tile_span(tier)
+        rect = rect.intersected(QRectF(*self.index.bounds()))
+        if rect.isEmpty():
+            return []
+        return [(i, j)
+                for i in range(math.floor(rect.left() / span), math.floor(rect.right() / span) + 1)
+                for j in range(math.floor(rect.top() / span), math.floor(rect.bottom() / span) + 1)]
+
+    def draw_tiles(self, painter, rect, tier):
+        """
+        Отдаленная большая сетка: ячейки рисуются плитками по MAP_TILE_PX пикселей, один раз
+        подготовленными в масштабе верхней границы уровня. Внутри уровня зум только растягивает готовые плитки.
+        False - не все плитки успели подготовиться в этом кадре.
+        """
+        _, span = self.tile_span(tier)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for i, j in self.tiles_in(rect, tier):
+            key = ('tile', self.scene_id, tier, i, j)
+            pixmap = cell_pixmap_cache.get(key)
+            if pixmap is None:
+                if not frame_time_left():
+                    # Остальные плитки - в следующих кадрах
+                    return False
+                pixmap = self.render_tile(tier, i, j)
+                cell_pixmap_cache.put(key, pixmap)
+                self.tile_keys.add(key)
+            painter.drawPixmap(QRectF(i * span, j * span, span, span), pixmap, QRectF(pixmap.rect()))
+        return True
+
+    def render_tile(self, tier, i, j):
+        scale, span = self.tile_span(tier)
+        pixmap = QPixmap(config.MAP_TILE_PX, config.MAP_TILE_PX)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.scale(scale, scale)
+        painter.translate(-i * span, -j * span)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for coord in self.index.cells_in(i * span, j * span, span, span):
+            data = self.cell_data.get(coord)
+            if data is None:
+                continue
+            rect = QRectF(*self.index.rects[coord])
+            if tier == LOD_FLAT:
+                painter.setBrush(cell_visuals(data).fill_color)
+                painter.drawRoundedRect(rect, config.CELL_RADIUS, config.CELL_RADIUS)
+            else:
+                paint_cell_content(painter, data, rect, rect, tier)
+        painter.end()
+        return pixmap
+
+    def invalidate_tiles(self, coord=None):
+        """Выбрасывает плитки с ячейкой coord (без coord - все плитки сцены)."""
+        if coord is None:
+            keys = list(self.tile_keys)
+        else:
+            rect = self.cell_rect(coord)
+            if rect is None:
+                return
+            keys = [('tile', self.scene_id, tier, i, j)
+                    for tier in (LOD_FLAT, LOD_NUMBER) for i, j in self.tiles_in(rect, tier)]
+        for key in keys:
+            cell_pixmap_cache.discard(key)
+            self.tile_keys.discard(key)
+
+    def show_path(self, coords):
+        """Показывает путь по ячейкам coords: по точке за шаг таймера, затем путь гаснет."""
+        self.clear_path()
+        points = [QRectF(*self.index.rects[coord]).center() for coord in coords if coord in self.index.rects]
+        if len(points) < 2:
+            return
+        self.path_item = MovePathItem(points)
+        self.addItem(self.path_item)
+        self.path_timer.start()
+
+    def advance_path(self):
+        if self.path_item is None or not self.path_item.advance_step():
+            self.path_timer.stop()
+            self.path_hold_timer.start()
+
+    def clear_path(self):
+        self.path_timer.stop()
+        self.path_hold_timer.stop()
+        if self.path_item is not None:
+            self.removeItem(self.path_item)
+            self.path_item = None
+
+    def update_visuals(self, r, c):
+        if self.lazy:
+            self.invalidate_tiles((r, c))
+            self.update(self.cell_rect((r, c)) or QRectF())
+        if (r, c) in self.cell_items:
+            self.cell_items[(r, c)].data = self.cell_data[(r, c)]
+            self.cell_items[(r, c)].update_visuals()
+
+    def set_cell_data(self, cell_data):
+        """
+        Привязывает сцену к новым данным похода без пересоздания сетки: у существующих элементов
+        меняются только данные, лишние удаляются, недостающие добавляются.
+        Перерисовываются только ячейки, чья запись сменилась.
+        """
+        self.cell_data = cell_data
+        if self.grid_size != (config.ROWS, config.COLS):
+            self._rebuild_layout()
+            return
+
+        for coord in [coord for coord in self.cell_items if coord not in cell_data]:
+            item = self.cell_items.pop(coord)
+            item.update_visuals()
+            self.removeItem(item)
+        for coord, item in self.cell_items.items():
+            if item.data is not cell_data[coord]:
+                self.update_visuals(*coord)
+
+        if self.lazy:
+            # Записи сменились у многих ячеек сразу: плитки дешевле подготовить заново
+            self.invalidate_tiles()
+            self.update()
+            self.materialize()
+        else:
+            self._create_grid()
+
+class MapGraphicsView(QGraphicsView):
+    cell_clicked = pyqtSignal(int, int)
+    cell_data_changed = pyqtSignal(int, int, dict)
+    cells_data_changed = pyqtSignal(object, dict)  # набор координат, одна правка для всех
+    cell_swap_requested = pyqtSignal(int, int, int, int)
+    zoom_changed = pyqtSignal(float)
+    
+    def __init__(self, map_scene, parent=None):
+        super().__init__(parent)
+        self.scene = map_scene
+        self.setScene(self.scene)
+        
+        self.setBackgroundBrush(QBrush(QColor(50, 50, 50)))
+        
+        self.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.setDragMode(QGraphicsView.DragMode.NoDrag)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.setAcceptDrops(True)
+        
+        self._panning = False
+        self._pan_start_pos = QPoint()
+        self.drop_target = None  # координата ячейки под перетаскиваемой
+        
+        # Выделение своей и соседней панели - только у этого вида
+        self.active_cell = None
+        self.remote_active_cell = None
+        
+        # Выделение нескольких ячеек: Ctrl+клик или рамка, протянутая с пустого места (или с Ctrl)
+        self.selected_cells = set()
+        self._band_origin = None
+        self._rubber_band = QRubberBand(QRubberBand.Shape.Rectangle, self.viewport())
+        
+        self.lod_tier = lod_tier(self.transform().m11())
+        
+        # Любой зум (колесо, кнопки, сброс) сообщается через zoom_changed
+        self.zoom_changed.connect(self.on_zoom_changed)
+        
+        if not self.scene.sceneRect().isEmpty():
+             self.centerOn(self.scene.sceneRect().center())
+
+    @property
+    def cell_data(self):
+        return self.scene.cell_data
+
+    @property
+    def cell_items(self):
+        return self.scene.cell_items
+
+    @property
+    def title_item(self):
+        return self.scene.title_item
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not event.spontaneous():
+            self.zoom_changed.emit(self.transform().m11())
+        self.update_visible_cells()
+
+    def on_zoom_changed(self):
+        tier = lod_tier(self.transform().m11())
+        if tier != self.lod_tier:
+            self.lod_tier = tier
+            self.viewport().update()
+        self.update_visible_cells()
+
+    def update_visible_cells(self):
+        """Сообщает сцене видимую область, чтобы на большой сетке были созданы нужные ячейки."""
+        if self.lod_tier != LOD_FULL and self.scene.lazy:
+            # Плитки рисует drawBackground, элементы ячеек для этого вида не нужны
+            self.scene.set_view_rect(self, None)
+        else:
+            self.scene.set_view_rect(self, self.mapToScene(self.viewport().rect()).boundingRect())
+
+    def drawBackground(self, painter, rect):
+        start_frame()
+        super().drawBackground(painter, rect)
+        if self.lod_tier != LOD_FULL and self.scene.lazy:
+            if not self.scene.draw_tiles(painter, rect, self.lod_tier):
+                defer_to_next_frame(self.viewport())
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.update_visible_cells()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_visible_cells()
 
     def edit_title(self):
-        text, ok = QInputDialog.getText(self, "Название похода", "Введите название:", text=self.campaign_title_ref[0])
+        text, ok = QInputDialog.getText(self, "Название похода", "Введите название:", text=self.scene.campaign_title_ref[0])
         if ok:
-            self.campaign_title_ref[0] = text
+            self.scene.campaign_title_ref[0] = text
             self.title_item.update_text()
 
     def on_cell_clicked(self, r, c):
-        if self.active_cell:
-            if self.active_cell in self.cell_items:
-                self.cell_items[self.active_cell].set_active(False)
-        
-        self.active_cell = (r, c)
-        if (r, c) in self.cell_items:
-            self.cell_items[(r, c)].set_active(True)
-            
+        self.clear_selection()
+        self.set_active_cell((r, c))
         self.cell_clicked.emit(r, c)
 
+    def set_selection(self, coords):
+        """Заменяет выделение; перерисовываются только ячейки, чье состояние поменялось."""
+        coords = set(coords)
+        changed = coords ^ self.selected_cells
+        self.selected_cells = coords
+        for coord in changed:
+            self.update_cell_area(coord)
+
+    def clear_selection(self):
+        self.set_selection(())
+
+    def set_active_cell(self, coord):
+        self.update_cell_area(self.active_cell)
+        self.active_cell = coord
+        self.update_cell_area(coord)
+
     def set_remote_highlight(self, r, c):
-        if self.remote_active_cell:
-            if self.remote_active_cell in self.cell_items:
-                self.cell_items[self.remote_active_cell].set_remote_active(False)
-        
+        self.update_cell_area(self.remote_active_cell)
         self.remote_active_cell = (r, c)
-        if (r, c) in self.cell_items:
-            self.cell_items[(r, c)].set_remote_active(True)
+        self.update_cell_area(self.remote_active_cell)
+
+    def update_cell_area(self, coord):
+        """Перерисовывает в этом виде только область ячейки (элементы сцены не трогаются)."""
+        cell_rect = self.scene.cell_rect(coord)
+        if cell_rect is not None:
+            rect = self.mapFromScene(cell_rect).boundingRect()
+            self.viewport().update(rect.adjusted(-2, -2, 2, 2))
+
+    def set_drop_target(self, coord):
+        if coord != self.drop_target:
+            self.update_cell_area(self.drop_target)
+            self.drop_target = coord
+            self.update_cell_area(coord)
+
+    def drawForeground(self, painter, rect):
+        """Выделенные ячейки, цель перетаскивания, активная ячейка этой панели и ячейка, открытая в соседней."""
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if self.selected_cells:
+            color = QColor(*config.HIGHLIGHT_COLOR)
+            painter.setPen(QPen(color, 4))
+            color.setAlpha(60)
+            painter.setBrush(color)
+            for coord in self.selected_cells:
+                cell_rect = self.scene.cell_rect(coord)
+                if cell_rect is not None and cell_rect.intersects(rect):
+                    painter.drawRoundedRect(cell_rect.adjusted(2, 2, -2, -2), config.CELL_RADIUS, config.CELL_RADIUS)
+
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        drop_rect = self.scene.cell_rect(self.drop_target)
+        if drop_rect is not None and drop_rect.intersects(rect):
+            painter.setPen(QPen(QColor(0, 255, 0), 4))
+            painter.drawRoundedRect(drop_rect.adjusted(2, 2, -2, -2), config.CELL_RADIUS, config.CELL_RADIUS)
+
+        pen = QPen(QColor(*config.REMOTE_HIGHLIGHT_COLOR), 4)
+        painter.setPen(pen)
+        for coord in {self.active_cell, self.remote_active_cell}:
+            cell_rect = self.scene.cell_rect(coord)
+            if cell_rect is not None and cell_rect.intersects(rect):
+                painter.drawRoundedRect(cell_rect.adjusted(2, 2, -2, -2), config.CELL_RADIUS, config.CELL_RADIUS)
 
     def on_cell_right_clicked(self, r, c):
         menu = QMenu(self)
         edit_action = menu.addAction("Настроить залу...")
+        bulk_action = None
+        if (r, c) in self.selected_cells and len(self.selected_cells) > 1:
+            bulk_action = menu.addAction(f"Настроить выделенные залы ({len(self.selected_cells)})...")
         action = menu.exec(QCursor.pos())
         if action == edit_action:
             self.open_edit_dialog(r, c)
+        elif action is not None and action == bulk_action:
+            self.open_bulk_edit_dialog(r, c)
 
     def open_edit_dialog(self, r, c):
         if (r, c) not in self.cell_data:
@@ -548,14 +1044,17 @@ class MapGraphicsView(QGraphicsView):
         dialog = EditCellDialog(self.cell_data[(r, c)], coords=(r, c), parent=self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             new_data = dialog.get_data()
-            self.cell_data[(r, c)].update(new_data)
-            self.update_visuals(r, c)
             self.cell_data_changed.emit(r, c, new_data)
 
-    def update_visuals(self, r, c):
-        if (r, c) in self.cell_items:
-            self.cell_items[(r, c)].data = self.cell_data[(r, c)]
-            self.cell_items[(r, c)].update_visuals()
+    def open_bulk_edit_dialog(self, r, c):
+        coords = {coord for coord in self.selected_cells if coord in self.cell_data}
+        if not coords:
+            return
+        dialog = BulkEditCellDialog(len(coords), self.cell_data[(r, c)], parent=self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            changes = dialog.get_changes()
+            if changes:
+                self.cells_data_changed.emit(coords, changes)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasFormat("application/x-map-cell"):
@@ -567,33 +1066,19 @@ class MapGraphicsView(QGraphicsView):
         if event.mimeData().hasFormat("application/x-map-cell"):
             event.accept()
             
-            pos = self.mapToScene(event.position().toPoint())
-            item = self.scene.itemAt(pos, self.transform())
-            
-            target_cell = None
-            if isinstance(item, MapCellItem):
-                target_cell = item
-            
-            if self._last_drop_target and self._last_drop_target != target_cell:
-                self._last_drop_target.set_drop_target(False)
-            
-            if target_cell:
-                target_cell.set_drop_target(True)
-                self._last_drop_target = target_cell
-            else:
-                self._last_drop_target = None
+            # Ячейка под курсором находится арифметикой по индексу сетки; подсветка - в drawForeground
+            coord = self.scene.cell_at(self.mapToScene(event.position().toPoint()))
+            self.set_drop_target(coord if coord in self.cell_data else None)
         else:
             event.ignore()
             
     def dragLeaveEvent(self, event):
-        if self._last_drop_target:
-            self._last_drop_target.set_drop_target(False)
-            self._last_drop_target = None
+        self.set_drop_target(None)
         super().dragLeaveEvent(event)
 
     def dropEvent(self, event):
-        if self._last_drop_target:
-            self._last_drop_target.set_drop_target(False)
+        target = self.drop_target
+        self.set_drop_target(None)
             
         if event.mimeData().hasFormat("application/x-map-cell"):
             item_data = event.mimeData().data("application/x-map-cell")
@@ -601,16 +1086,8 @@ class MapGraphicsView(QGraphicsView):
             r1 = data_stream.readInt()
             c1 = data_stream.readInt()
             
-            if self._last_drop_target:
-                r2, c2 = self._last_drop_target.r, self._last_drop_target.c
-                
-                if (r1, c1) != (r2, c2):
-                    self.cell_data[(r1, c1)], self.cell_data[(r2, c2)] = self.cell_data[(r2, c2)], self.cell_data[(r1, c1)]
-                    
-                    self.cell_data_changed.emit(r1, c1, self.cell_data[(r1, c1)])
-                    self.cell_data_changed.emit(r2, c2, self.cell_data[(r2, c2)])
-            
-            self._last_drop_target = None
+            if target is not None and (r1, c1) != target:
+                self.cell_swap_requested.emit(r1, c1, *target)
             event.accept()
         else:
             event.ignore()
@@ -631,6 +1108,17 @@ class MapGraphicsView(QGraphicsView):
             self._pan_start_pos = event.pos()
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
             event.accept()
+        elif event.button() == Qt.MouseButton.LeftButton and (
+                event.modifiers() & Qt.KeyboardModifier.ControlModifier or self.itemAt(event.pos()) is None):
+            # Начало рамки выделения; до отпускания неизвестно, рамка это или клик
+            self._band_origin = event.pos()
+            event.accept()
+        elif event.button() == Qt.MouseButton.RightButton and self.itemAt(event.pos()) is None:
+            # Ячейка, нарисованная плиткой без элемента (отдаленная большая сетка)
+            coord = self.scene.cell_at(self.mapToScene(event.pos()))
+            if coord in self.cell_data:
+                self.on_cell_right_clicked(*coord)
+            event.accept()
         else:
             super().mousePressEvent(event)
 
@@ -639,6 +1127,9 @@ class MapGraphicsView(QGraphicsView):
             self._panning = False
             self.setCursor(Qt.CursorShape.ArrowCursor)
             event.accept()
+        elif event.button() == Qt.MouseButton.LeftButton and self._band_origin is not None:
+            self.finish_band(event)
+            event.accept()
         else:
             super().mouseReleaseEvent(event)
 
@@ -649,15 +1140,49 @@ class MapGraphicsView(QGraphicsView):
             self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - delta.x())
             self.verticalScrollBar().setValue(self.verticalScrollBar().value() - delta.y())
             event.accept()
+        elif self._band_origin is not None:
+            if self._rubber_band.isVisible() or \
+                    (event.pos() - self._band_origin).manhattanLength() >= QApplication.startDragDistance():
+                self._rubber_band.setGeometry(QRect(self._band_origin, event.pos()).normalized())
+                self._rubber_band.show()
+            event.accept()
         else:
             super().mouseMoveEvent(event)
+
+    def finish_band(self, event):
+        """Отпускание левой кнопки после mousePressEvent без захвата элементом."""
+        origin, self._band_origin = self._band_origin, None
+        additive = bool(event.modifiers() & Qt.KeyboardModifier.ControlModifier)
+        if self._rubber_band.isVisible():
+            self._rubber_band.hide()
+            rect = self.mapToScene(QRect(origin, event.pos()).normalized()).boundingRect()
+            # Ячейки под рамкой берутся из пространственного индекса, без обхода элементов сцены
+            coords = self.scene.index.cells_in(rect.x(), rect.y(), rect.width(), rect.height())
+            coords = {coord for coord in coords if coord in self.cell_data}
+            self.set_selection(self.selected_cells | coords if additive else coords)
+            return
+
+        coord = self.scene.cell_at(self.mapToScene(event.pos()))
+        if coord not in self.cell_data:
+            if not additive:
+                self.clear_selection()
+        elif additive:
+            self.set_selection(self.selected_cells ^ {coord})
+        else:
+            # Ячейка, нарисованная плиткой без элемента (отдаленная большая сетка)
+            self.on_cell_clicked(*coord)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape and self.selected_cells:
+            self.clear_selection()
+            event.accept()
+        else:
+            super().keyPressEvent(event)
             
     def reset_view(self):
         self.resetTransform()
-        if self.cell_items:
-            content_rect = QRectF()
-            for item in self.scene.items():
-                content_rect = content_rect.united(item.sceneBoundingRect())
+        if self.scene.index.rects:
+            content_rect = self.scene.content_rect()
             self.fitInView(content_rect, Qt.AspectRatioMode.KeepAspectRatio)
             self.scale(0.9, 0.9)
             self.centerOn(content_rect.center())
@@ -671,11 +1196,27 @@ class MapGraphicsView(QGraphicsView):
         self.scale(1 / 1.15, 1 / 1.15)
         self.zoom_changed.emit(self.transform().m11())
 
+# Разделы данных панели: ключ -> (атрибут вкладки, метод применения, метод чтения, значение по умолчанию)
+PANEL_SECTIONS = {
+    'npc_text': ('npc_editor', 'setHtml', 'toHtml', ""),
+    'notes_text': ('notes_editor', 'setHtml', 'toHtml', ""),
+    'lore_data': ('lore_tab', 'set_data', 'get_data', {}),
+    'orange_data': ('orange_tab', 'set_data', 'get_data', {}),
+    'purple_data': ('purple_tab', 'set_data', 'get_data', {}),
+    'items_data': ('items_tab', 'set_data', 'get_data', {}),
+    'players_data': ('players_tab', 'set_data', 'get_data', []),
+}
+
 class MainPanel(QWidget):
     remote_highlight_signal = pyqtSignal(int, int)
     cell_data_changed = pyqtSignal(int, int, dict)
+    cells_data_changed = pyqtSignal(object, dict)
+    cell_swap_requested = pyqtSignal(int, int, int, int)
+    # Пробрасываются из вкладок Оранжевого и Фиолетового уровней, когда те будут созданы
+    show_image_requested = pyqtSignal(object)
+    play_signal_requested = pyqtSignal()
     
-    def __init__(self, cell_data, campaign_title_ref, parent=None):
+    def __init__(self, map_scene, parent=None):
         super().__init__(parent)
         
         self.orange_tab = None
@@ -699,9 +1240,11 @@ class MainPanel(QWidget):
         map_layout = QVBoxLayout(self.map_container)
         map_layout.setContentsMargins(0, 0, 0, 0)
         
-        self.map_view = MapGraphicsView(cell_data, campaign_title_ref)
+        self.map_view = MapGraphicsView(map_scene)
         self.map_view.cell_clicked.connect(self.show_detailed_view)
         self.map_view.cell_data_changed.connect(self.cell_data_changed)
+        self.map_view.cells_data_changed.connect(self.cells_data_changed)
+        self.map_view.cell_swap_requested.connect(self.cell_swap_requested)
         map_layout.addWidget(self.map_view)
         
         self.controls_container = QWidget(self.map_container)
@@ -753,45 +1296,78 @@ class MainPanel(QWidget):
         
         self.tabs.addTab(self.map_tab_widget, "Карта Серого уровня")
         
+        # Остальные вкладки создаются при первом открытии; до этого в QTabWidget стоит пустая заглушка
+        self.placeholders = {}  # заглушка -> название вкладки
         for name in config.tab_names[1:]:
-            if name == "Персонажи игроков":
-                self.players_tab = PlayersTab()
-                self.tabs.addTab(self.players_tab, name)
-            elif name == "Оранжевый уровень":
-                self.orange_tab = OrangeTab()
-                self.tabs.addTab(self.orange_tab, name)
-            elif name == "Предметы":
-                self.items_tab = ItemsTab()
-                self.tabs.addTab(self.items_tab, name)
-            elif name == "Фиолетовый уровень":
-                self.purple_tab = PurpleTab()
-                self.tabs.addTab(self.purple_tab, name)
-            elif name == "Сюжет":
-                self.lore_tab = LoreTab()
-                self.tabs.addTab(self.lore_tab, name)
-            elif name == "NPC":
-                self.npc_editor = RichTextEditor()
-                self.npc_editor.set_edit_mode(True)
-                self.tabs.addTab(self.npc_editor, name)
-            elif name == "Заметки":
-                self.notes_editor = RichTextEditor()
-                self.notes_editor.set_edit_mode(True)
-                self.tabs.addTab(self.notes_editor, name)
-            else:
-                text_edit = QTextEdit()
-                text_edit.setStyleSheet("""
-                    QTextEdit {
-                        background-color: #2b2b2b;
-                        color: #a9b7c6;
-                        border: 1px solid #3c3f41;
-                        font-family: Consolas, 'Courier New', monospace;
-                        font-size: 14px;
-                        padding: 8px;
-                    }
-                """)
-                self.tabs.addTab(text_edit, name)
+            placeholder = QWidget()
+            self.placeholders[placeholder] = name
+            self.tabs.addTab(placeholder, name)
             
         layout.addWidget(self.tabs)
+
+        # Режимы редактирования для еще не созданных вкладок
+        self.edit_modes = {'npc_editor': True, 'notes_editor': True}
+
+        # Загруженные, но еще не примененные к вкладкам разделы (ключ -> сырые данные)
+        self.pending_sections = {}
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+    def create_tab(self, name):
+        if name == "Персонажи игроков":
+            self.players_tab = PlayersTab()
+            return self.players_tab
+        elif name == "Оранжевый уровень":
+            self.orange_tab = OrangeTab()
+            self.orange_tab.show_image_requested.connect(self.show_image_requested.emit)
+            self.orange_tab.play_signal_requested.connect(self.play_signal_requested.emit)
+            return self.orange_tab
+        elif name == "Предметы":
+            self.items_tab = ItemsTab()
+            return self.items_tab
+        elif name == "Фиолетовый уровень":
+            self.purple_tab = PurpleTab()
+            self.purple_tab.show_image_requested.connect(self.show_image_requested.emit)
+            self.purple_tab.play_signal_requested.connect(self.play_signal_requested.emit)
+            return self.purple_tab
+        elif name == "Сюжет":
+            self.lore_tab = LoreTab()
+            return self.lore_tab
+        elif name == "NPC":
+            self.npc_editor = RichTextEditor()
+            return self.npc_editor
+        elif name == "Заметки":
+            self.notes_editor = RichTextEditor()
+            return self.notes_editor
+        else:
+            text_edit = QTextEdit()
+            text_edit.setStyleSheet("""
+                QTextEdit {
+                    background-color: #2b2b2b;
+                    color: #a9b7c6;
+                    border: 1px solid #3c3f41;
+                    font-family: Consolas, 'Courier New', monospace;
+                    font-size: 14px;
+                    padding: 8px;
+                }
+            """)
+            return text_edit
+
+    def build_tab(self, index):
+        """Заменяет заглушку настоящей вкладкой."""
+        placeholder = self.tabs.widget(index)
+        name = self.placeholders.pop(placeholder)
+        tab = self.create_tab(name)
+        for attr, enabled in self.edit_modes.items():
+            if getattr(self, attr) is tab:
+                tab.set_edit_mode(enabled)
+
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, tab, name)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+        return tab
         
     def show_detailed_view(self, r, c):
         if (r, c) in self.map_view.cell_data:
@@ -800,12 +1376,7 @@ class MainPanel(QWidget):
             self.remote_highlight_signal.emit(r, c)
             
     def on_detail_cell_changed(self, r, c):
-        if self.map_view.active_cell:
-            if self.map_view.active_cell in self.map_view.cell_items:
-                self.map_view.cell_items[self.map_view.active_cell].set_active(False)
-        self.map_view.active_cell = (r, c)
-        if (r, c) in self.map_view.cell_items:
-            self.map_view.cell_items[(r, c)].set_active(True)
+        self.map_view.set_active_cell((r, c))
         self.remote_highlight_signal.emit(r, c)
 
     def on_detail_data_changed(self, r, c, key, value):
@@ -816,10 +1387,7 @@ class MainPanel(QWidget):
         self.cell_data_changed.emit(r, c, update_dict)
             
     def show_map(self):
-        if self.map_view.active_cell:
-            if self.map_view.active_cell in self.map_view.cell_items:
-                self.map_view.cell_items[self.map_view.active_cell].set_active(False)
-            self.map_view.active_cell = None
+        self.map_view.set_active_cell(None)
             
         self.map_stack.setCurrentIndex(0)
         self.remote_highlight_signal.emit(-1, -1)
@@ -827,8 +1395,19 @@ class MainPanel(QWidget):
     def set_remote_highlight(self, r, c):
         self.map_view.set_remote_highlight(r, c)
         
+    def refresh_detailed_view(self):
+        """После смены похода: выделение снимается, открытая ячейка показывается заново, исчезнувшая - возврат к карте."""
+        self.map_view.clear_selection()
+        if self.map_stack.currentIndex() != 1:
+            return
+        r, c = self.detailed_view.r, self.detailed_view.c
+        if (r, c) in self.map_view.cell_data:
+            self.update_cell_view(r, c)
+        else:
+            self.show_map()
+
     def update_cell_view(self, r, c):
-        self.map_view.update_visuals(r, c)
+        """Обновляет подробный вид; элементы карты обновляет общая сцена (MapScene.update_visuals)."""
         if self.map_stack.currentIndex() == 1:
             if self.detailed_view.r == r and self.detailed_view.c == c:
                 self.detailed_view.show_cell(r, c, self.map_view.cell_data[(r, c)], self.map_view.cell_data)
@@ -848,42 +1427,48 @@ class MainPanel(QWidget):
         self.detailed_view.set_edit_mode(enabled)
 
     def set_edit_mode_npc(self, enabled):
+        self.edit_modes['npc_editor'] = enabled
         if self.npc_editor:
             self.npc_editor.set_edit_mode(enabled)
 
     def set_edit_mode_lore(self, enabled):
+        self.edit_modes['lore_tab'] = enabled
         if self.lore_tab:
             self.lore_tab.set_edit_mode(enabled)
 
     def set_edit_mode_notes(self, enabled):
+        self.edit_modes['notes_editor'] = enabled
         if self.notes_editor:
             self.notes_editor.set_edit_mode(enabled)
 
+    def on_tab_changed(self, index):
+        widget = self.tabs.widget(index)
+        if widget in self.placeholders:
+            widget = self.build_tab(index)
+        self.hydrate_tab(widget)
+
+    def hydrate_tab(self, widget):
+        """Применяет отложенные данные к вкладке при первом показе."""
+        for key, (attr, apply_data, _, _) in PANEL_SECTIONS.items():
+            tab = getattr(self, attr)
+            if tab is not None and tab is widget and key in self.pending_sections:
+                getattr(tab, apply_data)(self.pending_sections.pop(key))
+
     def get_data(self):
-        data = {
-            'npc_text': self.npc_editor.toHtml() if self.npc_editor else "",
-            'notes_text': self.notes_editor.toHtml() if self.notes_editor else "",
-            'lore_data': self.lore_tab.get_data() if self.lore_tab else {},
-            'orange_data': self.orange_tab.get_data() if self.orange_tab else {},
-            'purple_data': self.purple_tab.get_data() if self.purple_tab else {},
-            'items_data': self.items_tab.get_data() if self.items_tab else {},
-            'players_data': self.players_tab.get_data() if self.players_tab else []
-        }
+        data = {}
+        for key, (attr, _, read_data, default) in PANEL_SECTIONS.items():
+            tab = getattr(self, attr)
+            # Непоказанные вкладки отдают данные в том виде, в каком они были загружены
+            if key in self.pending_sections:
+                data[key] = self.pending_sections[key]
+            elif tab is not None:
+                data[key] = getattr(tab, read_data)()
+            else:
+                data[key] = default
         return data
 
     def set_data(self, data):
         if not data: return
-        if self.npc_editor:
-            self.npc_editor.setHtml(data.get('npc_text', ''))
-        if self.notes_editor:
-            self.notes_editor.setHtml(data.get('notes_text', ''))
-        if self.lore_tab:
-            self.lore_tab.set_data(data.get('lore_data', {}))
-        if self.orange_tab:
-            self.orange_tab.set_data(data.get('orange_data', {}))
-        if self.purple_tab:
-            self.purple_tab.set_data(data.get('purple_data', {}))
-        if self.items_tab:
-            self.items_tab.set_data(data.get('items_data', {}))
-        if self.players_tab:
-            self.players_tab.set_data(data.get('players_data', []))
+        for key, (_, _, _, default) in PANEL_SECTIONS.items():
+            self.pending_sections[key] = data.get(key, default)
+        self.hydrate_tab(self.tabs.currentWidget())
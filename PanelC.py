@@ -1,15 +1,15 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTabWidget, QLabel, 
                              QPushButton, QHBoxLayout, QLineEdit, QScrollArea, QFrame, QFileDialog, QGridLayout, QGroupBox, QStyleOptionButton, QRadioButton,
-                             QSizePolicy)
-from PyQt6.QtCore import Qt, QRectF, QPointF, QSize, QRect, pyqtSignal, QTimer
-from PyQt6.QtGui import QFont, QColor, QPainter, QBrush, QPen, QPalette, QTextDocument, QTextOption, QFontMetrics, QIcon, QIntValidator
-from config import FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR, AUDIO_PANEL_SOUNDS_DIR, TIMER_SOUNDS_DIR, OUTER_CONTOUR_COORDS, SCRIPT_DIR, PLAYER_BUTTONS_DIR
-from MusicPlayer import MusicPlayer
+                             QSizePolicy, QSpinBox, QCheckBox)
+from PyQt6.QtCore import Qt, QRectF, QPointF, QSize, QRect, pyqtSignal, QTimer, QEvent
+from PyQt6.QtGui import QFont, QColor, QPainter, QBrush, QPen, QPalette, QTextDocument, QTextOption, QFontMetrics, QIcon, QIntValidator, QPixmap
+from config import FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR, AUDIO_PANEL_SOUNDS_DIR, TIMER_SOUNDS_DIR, SCRIPT_DIR, PLAYER_BUTTONS_DIR
 from VisualTab import VisualTab
-from Syntez import SynthesizerTab
 from widgets import WrappingButton
 import os
+import time
 import random
+import config
 
 class TimeInput(QLineEdit):
     def __init__(self, default_value="00", max_val=None, width=60, height=40, parent=None):
@@ -134,6 +134,8 @@ class DiceResultWidget(QWidget):
 
 class ManagementTab(QWidget):
     white_room_move_requested = pyqtSignal(bool, bool) # (clockwise, with_sound)
+    white_room_steps_requested = pyqtSignal(bool, int, bool, bool) # (clockwise, шагов, with_sound, показать путь)
+    white_room_target_requested = pyqtSignal(bool, str, bool, bool) # (clockwise, координата, with_sound, показать путь)
 
     def __init__(self, timer, parent=None):
         super().__init__(parent)
@@ -265,6 +267,29 @@ class ManagementTab(QWidget):
         radio_layout.addWidget(self.radio_ccw)
         move_layout.addLayout(radio_layout)
         
+        # Несколько шагов за раз или до заданной ячейки контура
+        steps_layout = QHBoxLayout()
+        steps_layout.addWidget(QLabel("Шагов:"))
+        self.spin_white_steps = QSpinBox()
+        self.spin_white_steps.setRange(1, 999)
+        steps_layout.addWidget(self.spin_white_steps)
+        steps_layout.addWidget(QLabel("или до ячейки:"))
+        self.input_white_target = QLineEdit()
+        self.input_white_target.setPlaceholderText("D7")
+        self.input_white_target.setFixedWidth(60)
+        steps_layout.addWidget(self.input_white_target)
+        self.check_white_path = QCheckBox("Показать путь")
+        self.check_white_path.setChecked(True)
+        steps_layout.addWidget(self.check_white_path)
+        self.btn_white_steps = WrappingButton("Переместить")
+        self.btn_white_steps.clicked.connect(self.on_white_steps_click)
+        steps_layout.addWidget(self.btn_white_steps)
+        move_layout.addLayout(steps_layout)
+        
+        self.white_room_controls = [self.radio_cw, self.radio_ccw, self.btn_white_move, self.btn_silent_move,
+                                    self.spin_white_steps, self.input_white_target, self.check_white_path,
+                                    self.btn_white_steps]
+        
         move_group.setLayout(move_layout)
         layout.addWidget(move_group)
         
@@ -364,17 +389,18 @@ class ManagementTab(QWidget):
         clockwise = self.radio_cw.isChecked()
         self.white_room_move_requested.emit(clockwise, with_sound)
 
-    def update_white_room_controls(self, cell_data):
-        has_white_room = False
-        for coord in OUTER_CONTOUR_COORDS:
-            if coord in cell_data and cell_data[coord].get('room_type') == 'Белая зала':
-                has_white_room = True
-                break
-        
-        self.radio_cw.setEnabled(has_white_room)
-        self.radio_ccw.setEnabled(has_white_room)
-        self.btn_white_move.setEnabled(has_white_room)
-        self.btn_silent_move.setEnabled(has_white_room)
+    def on_white_steps_click(self):
+        clockwise = self.radio_cw.isChecked()
+        show_path = self.check_white_path.isChecked()
+        target = self.input_white_target.text().strip()
+        if target:
+            self.white_room_target_requested.emit(clockwise, target, True, show_path)
+        else:
+            self.white_room_steps_requested.emit(clockwise, self.spin_white_steps.value(), True, show_path)
+
+    def update_white_room_controls(self, has_white_room):
+        for widget in self.white_room_controls:
+            widget.setEnabled(has_white_room)
 
     def dec_dice(self):
         try:
@@ -706,7 +732,10 @@ class TimerTab(QWidget):
 
 class PanelC(QWidget):
     white_room_move_requested = pyqtSignal(bool, bool)
+    white_room_steps_requested = pyqtSignal(bool, int, bool, bool)
+    white_room_target_requested = pyqtSignal(bool, str, bool, bool)
     intro_volume_changed = pyqtSignal(int)
+    audio_assigned = pyqtSignal(str, str)  # путь к озвучке, координата (из синтезатора)
 
     def __init__(self, timer, parent=None):
         super().__init__(parent)
@@ -726,6 +755,8 @@ class PanelC(QWidget):
         self.tabs = QTabWidget()
         self.management_tab = ManagementTab(self.timer)
         self.management_tab.white_room_move_requested.connect(self.white_room_move_requested.emit)
+        self.management_tab.white_room_steps_requested.connect(self.white_room_steps_requested.emit)
+        self.management_tab.white_room_target_requested.connect(self.white_room_target_requested.emit)
         
         self.visual_tab = VisualTab(self.timer)
         self.visual_tab.background_color_changed.connect(self.timer.set_background_color)
@@ -740,13 +771,17 @@ class PanelC(QWidget):
         # self.visual_tab.orange_level_changed.connect(self.timer.set_orange_level_image) # REMOVED
         self.visual_tab.open_timer_window_requested.connect(self.timer.create_window)
         
-        self.synthesizer_tab = SynthesizerTab()
+        # Плеер и синтезатор (QtMultimedia, edge_tts) импортируются и создаются при первом открытии вкладки
+        self.music_player = None
+        self.synthesizer_tab = None
+        self.placeholders = {}  # заглушка -> название вкладки
         
         self.tabs.addTab(self.management_tab, "Управление")
         self.tabs.addTab(TimerTab(self.timer), "Таймер")
-        self.tabs.addTab(MusicPlayer(), "Плеер")
+        self.add_placeholder("Плеер")
         self.tabs.addTab(self.visual_tab, "Визуал")
-        self.tabs.addTab(self.synthesizer_tab, "Синтезатор")
+        self.add_placeholder("Синтезатор")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         
         layout.addWidget(self.tabs)
         self.setLayout(layout)
@@ -756,20 +791,122 @@ class PanelC(QWidget):
         self.timer.intro_position_changed.connect(lambda pos, dur: self.visual_tab.update_intro_slider(pos, dur))
         self.intro_volume_changed.connect(self.timer.set_intro_volume)
 
+    def add_placeholder(self, name):
+        placeholder = QWidget()
+        self.placeholders[placeholder] = name
+        self.tabs.addTab(placeholder, name)
+
+    def create_tab(self, name):
+        if name == "Плеер":
+            from MusicPlayer import MusicPlayer
+            self.music_player = MusicPlayer()
+            return self.music_player
+        if name == "Синтезатор":
+            from Syntez import SynthesizerTab
+            self.synthesizer_tab = SynthesizerTab()
+            self.synthesizer_tab.audio_assigned.connect(self.audio_assigned.emit)
+            return self.synthesizer_tab
+
+    def on_tab_changed(self, index):
+        placeholder = self.tabs.widget(index)
+        if placeholder not in self.placeholders:
+            return
+        name = self.placeholders.pop(placeholder)
+        tab = self.create_tab(name)
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, tab, name)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+
     def update_timer_display(self, time_str):
         self.lbl_timer_display.setText(f"Остаточное время похода: {time_str}")
 
-    def update_white_room_controls(self, cell_data):
-        self.management_tab.update_white_room_controls(cell_data)
+    def update_white_room_controls(self, has_white_room):
+        self.management_tab.update_white_room_controls(has_white_room)
+
+    def get_data(self):
+        return {
+            'custom_overlay_path': self.visual_tab.custom_image_path
+        }
+
+    def set_data(self, data):
+        if not data: return
+        path = data.get('custom_overlay_path')
+        if path:
+            self.visual_tab.set_custom_image(path)
 
     def start_preview_timer(self):
+        """
+        Предпросмотр окна таймера на вкладке "Визуал". Кадр снимается только после перерисовки
+        окна (фильтр событий Paint), не чаще config.TIMER_PREVIEW_FPS и только пока вкладка видна.
+        """
+        self.preview_window = None
+        self.preview_dirty = True
+        self.preview_capturing = False
+        self.last_preview_at = 0.0
         self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
         self.preview_timer.timeout.connect(self.update_preview)
-        self.preview_timer.start(50) # ~20 FPS
+        
+        self.timer.timer_window_state_changed.connect(self.attach_preview_window)
+        self.tabs.currentChanged.connect(lambda index: self.request_preview())
+        self.attach_preview_window()
+
+    def attach_preview_window(self, *args):
+        """Следит за перерисовками текущего окна таймера (оно создается заново после закрытия)."""
+        window = self.timer.timer_window
+        if window is not self.preview_window:
+            self.preview_window = window
+            if window is not None:
+                self.watch_preview_widget(window)
+        self.request_preview()
+
+    def watch_preview_widget(self, widget):
+        widget.installEventFilter(self)
+        for child in widget.findChildren(QWidget):
+            child.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and not self.preview_capturing:
+            self.request_preview()
+        elif event.type() == QEvent.Type.ChildAdded and isinstance(event.child(), QWidget):
+            # Виджеты, добавленные в окно таймера позже, тоже должны обновлять превью
+            self.watch_preview_widget(event.child())
+        return super().eventFilter(obj, event)
+
+    def request_preview(self):
+        self.preview_dirty = True
+        if not self.visual_tab.isVisible() or self.preview_timer.isActive():
+            # Скрытая вкладка снимет кадр, когда ее откроют
+            return
+        interval = 1000 / config.TIMER_PREVIEW_FPS
+        wait = interval - (time.monotonic() - self.last_preview_at) * 1000
+        self.preview_timer.start(max(0, int(wait)))
 
     def update_preview(self):
-        if self.timer and self.timer.timer_window and self.timer.timer_window.isVisible():
-            pixmap = self.timer.timer_window.grab()
-            self.visual_tab.update_preview(pixmap)
-        else:
+        if not self.preview_dirty or not self.visual_tab.isVisible():
+            return
+        self.preview_dirty = False
+        self.last_preview_at = time.monotonic()
+        window = self.timer.timer_window
+        if window is None or not window.isVisible() or window.width() == 0 or window.height() == 0:
             self.visual_tab.update_preview(None)
+            return
+        
+        # Окно рисуется сразу в размере превью, а не снимается целиком и уменьшается
+        label = self.visual_tab.preview_label
+        size = window.size().scaled(label.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        ratio = label.devicePixelRatioF()
+        pixmap = QPixmap(round(size.width() * ratio), round(size.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.scale(size.width() / window.width(), size.height() / window.height())
+        self.preview_capturing = True
+        window.render(painter)
+        self.preview_capturing = False
+        painter.end()
+        self.visual_tab.update_preview(pixmap)
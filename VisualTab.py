@@ -3,7 +3,6 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLa
                              QStyle, QSizePolicy, QGroupBox, QRadioButton, QCheckBox, QButtonGroup, QLineEdit, QGridLayout)
 from PyQt6.QtCore import Qt, QUrl, QSize, pyqtSignal, QTime, QRect, QTimer, QPoint
 from PyQt6.QtGui import QAction, QFont, QIcon, QCursor, QPainter, QFontMetrics, QColor, QPixmap
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 import os
 from config import FONT_FAMILY_REGULAR, FONT_FAMILY_BOLD, PLAYER_BUTTONS_DIR
 from widgets import WrappingButton
@@ -270,21 +269,24 @@ class VisualTab(QWidget):
     def browse_custom_image(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Выберите изображение", "", "Images (*.png *.jpg *.jpeg *.bmp)")
         if file_path:
-            self.custom_image_path = file_path
-            filename = os.path.basename(file_path)
-            
-            # Elide text if too long
-            metrics = QFontMetrics(self.lbl_custom_filename.font())
-            elided_text = metrics.elidedText(filename, Qt.TextElideMode.ElideRight, 150) # Approx width
-            self.lbl_custom_filename.setText(elided_text)
-            self.lbl_custom_filename.setToolTip(filename)
-            
-            self.rb_custom.setEnabled(True)
-            self.custom_overlay_changed.emit(file_path)
-            
-            # If custom radio is already checked, update the overlay immediately
-            if self.rb_custom.isChecked():
-                self.overlay_changed.emit("Custom")
+            self.set_custom_image(file_path)
+
+    def set_custom_image(self, file_path):
+        self.custom_image_path = file_path
+        filename = os.path.basename(file_path)
+        
+        # Elide text if too long
+        metrics = QFontMetrics(self.lbl_custom_filename.font())
+        elided_text = metrics.elidedText(filename, Qt.TextElideMode.ElideRight, 150) # Approx width
+        self.lbl_custom_filename.setText(elided_text)
+        self.lbl_custom_filename.setToolTip(filename)
+        
+        self.rb_custom.setEnabled(True)
+        self.custom_overlay_changed.emit(file_path)
+        
+        # If custom radio is already checked, update the overlay immediately
+        if self.rb_custom.isChecked():
+            self.overlay_changed.emit("Custom")
 
     def on_start_pause(self):
         if not self.timer.is_running:
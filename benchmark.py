@@ -0,0 +1,421 @@
+"""
+Замеры производительности горячих мест панели управления без вывода на экран.
+
+    python benchmark.py                      # все замеры, результат в benchmark_results.json
+    python benchmark.py --quick -o out.json  # укороченный прогон
+    python benchmark.py --only map_repaint timer_ticks
+
+Результат пишется в JSON (время в мс, пиковая память Python в КБ), чтобы сравнивать прогоны между коммитами.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+import config
+import campaign_io
+from main import MainWindow
+from map_view import set_grid_size
+
+ZOOM_LEVELS = [0.25, 0.5, 1.0, 2.0, 4.0]
+ITEMS_ZOOM_LEVELS = [0.5, 0.9, 1.5]
+CAMPAIGN_TEXT_KB = [1, 16, 128]       # Объем описания на ячейку в синтетических походах
+TIMER_TICKS = 5 * 3600                # 5 часов посекундных тиков
+REOPEN_TIMES = 10                     # Сколько раз подряд открывается один и тот же поход
+LARGE_GRID = 64                       # Сторона сетки для замеров большой карты
+ZOOM_STEPS = 20                       # Шагов колеса от масштаба 1 до общего вида и обратно
+FRAME_BUDGET_MS = 1000 / 60
+TIMER_SLACK_MS = 15                   # Опоздание срабатывания QTimer в замере ухода таймера
+TIMER_STALLS = (0.3, 1.7, 4.2)        # Подвисания цикла событий (сохранение, картинка, диалог), с
+TIMER_DRIFT_LIMIT_MS = 50
+
+
+def summarize(times):
+    """Сводка по списку замеров (секунды -> миллисекунды)."""
+    ms = sorted(t * 1000 for t in times)
+    return {
+        'n': len(ms),
+        'mean_ms': statistics.fmean(ms),
+        'median_ms': statistics.median(ms),
+        'min_ms': ms[0],
+        'max_ms': ms[-1],
+        'p95_ms': ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        'total_ms': sum(ms),
+    }
+
+
+def measure(func, repeat, teardown=None):
+    """
+    Время каждого вызова func и пиковая память Python за один дополнительный прогон.
+    tracemalloc замедляет код, поэтому время и память снимаются в разных прогонах.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+        if teardown:
+            teardown(result)
+
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if teardown:
+        teardown(result)
+
+    stats = summarize(times)
+    stats['peak_kb'] = peak / 1024
+    return stats
+
+
+def close_window(window):
+    window.is_modified = False
+    window.journal.discard()
+    window.close()
+    window.deleteLater()
+    if window.timer.timer_window:
+        window.timer.timer_window.close()
+    app.processEvents()
+
+
+def synthetic_campaign(window, text_kb):
+    """Данные похода, где у каждой ячейки описание размером text_kb и заполнены заметки панелей."""
+    data = window.collect_data()
+    paragraph = "<p>Зала наполнена гулом механизмов, по стенам бегут светящиеся линии.</p>"
+    text = paragraph * max(1, text_kb * 1024 // len(paragraph.encode('utf-8')))
+    for cell in data['cell_data'].values():
+        cell['description_text'] = text
+        cell['signal_text'] = "Досточтимые рыцари!"
+    for panel in ('panel_a_data', 'panel_b_data'):
+        data[panel]['npc_text'] = text
+        data[panel]['notes_text'] = text
+    return data
+
+
+def bench_main_window(repeat):
+    return measure(lambda: MainWindow(), repeat, teardown=close_window)
+
+
+def bench_campaign_io(repeat, sizes, work_dir):
+    window = MainWindow()
+    results = {}
+    for text_kb in sizes:
+        path = os.path.join(work_dir, f"synthetic_{text_kb}kb.kontt")
+        campaign_io.write_campaign(path, synthetic_campaign(window, text_kb))
+
+        def open_file():
+            window.load_campaign_file(path)
+
+        def save_file():
+            window.save_to_file(path)
+            window.wait_for_save()
+
+        results[f"{text_kb}kb"] = {
+            'file_kb': os.path.getsize(path) / 1024,
+            'open': measure(open_file, repeat),
+            'save': measure(save_file, repeat),
+        }
+    close_window(window)
+    return results
+
+
+def bench_campaign_reopen(times, work_dir):
+    """
+    Один и тот же поход открывается times раз подряд: число элементов сцены и память Python
+    после каждого открытия должны оставаться на месте.
+    """
+    window = MainWindow()
+    path = os.path.join(work_dir, "reopen.kontt")
+    campaign_io.write_campaign(path, synthetic_campaign(window, 1))
+
+    scene_items, memory_kb, times_ms = [], [], []
+    tracemalloc.start()
+    for _ in range(times):
+        start = time.perf_counter()
+        window.load_campaign_file(path)
+        app.processEvents()
+        times_ms.append((time.perf_counter() - start) * 1000)
+        gc.collect()
+        scene_items.append(len(window.map_scene.items()))
+        memory_kb.append(tracemalloc.get_traced_memory()[0] / 1024)
+    tracemalloc.stop()
+    close_window(window)
+
+    return {
+        'open_ms': times_ms,
+        'scene_items': scene_items,
+        'memory_kb': memory_kb,
+        'items_flat': len(set(scene_items)) == 1,
+        # Рост памяти со второго открытия (первое заполняет кэши)
+        'memory_growth_kb': memory_kb[-1] - memory_kb[1] if times > 1 else 0.0,
+    }
+
+
+def bench_map_repaint(repeat):
+    window = MainWindow()
+    window.resize(1600, 1000)
+    window.show()
+    app.processEvents()
+    view = window.panel_a.map_view
+    viewport = view.viewport()
+
+    results = {}
+    for zoom in ZOOM_LEVELS:
+        view.resetTransform()
+        view.scale(zoom, zoom)
+        app.processEvents()
+        results[f"zoom_{zoom}"] = measure(viewport.repaint, repeat)
+    close_window(window)
+    return results
+
+
+def bench_map_wheel_zoom(steps):
+    """
+    Большая сетка: шаги зума (как колесом) от масштаба 1 до всей карты и обратно, каждый с перерисовкой.
+    frames_over_budget - сколько шагов не уложились в кадр 60 Гц.
+    """
+    window = MainWindow()
+    window.resize(1600, 1000)
+    window.show()
+    window.new_campaign(LARGE_GRID, LARGE_GRID)
+    app.processEvents()
+    view = window.panel_a.map_view
+    viewport = view.viewport()
+    view.resetTransform()
+    view.zoom_changed.emit(1.0)
+    app.processEvents()
+
+    times = []
+    for zoom_step in [view.zoom_out] * steps + [view.zoom_in] * steps:
+        start = time.perf_counter()
+        zoom_step()
+        viewport.repaint()
+        times.append(time.perf_counter() - start)
+    cells = len(window.cell_data)
+    close_window(window)
+    # Размер сетки глобальный: следующие замеры идут на обычной 7x7
+    set_grid_size(config.DEFAULT_ROWS, config.DEFAULT_COLS)
+
+    result = summarize(times)
+    result['cells'] = cells
+    result['frames_over_budget'] = sum(1 for t in times if t * 1000 > FRAME_BUDGET_MS)
+    return result
+
+
+def bench_orange_map_label(repeat):
+    from OrangeTab import InteractiveMapLabel, POINTS_OF_INTEREST
+
+    label = InteractiveMapLabel()
+    for data in POINTS_OF_INTEREST.values():
+        label.set_group_visible(data["group"], True)
+    label.resize(900, 900)
+    label.show()
+    app.processEvents()
+    result = measure(label.repaint, repeat)
+    label.close()
+    label.deleteLater()
+    return result
+
+
+def bench_items_tab(repeat):
+    from ItemsTab import ItemsTab
+
+    results = {'construct': measure(ItemsTab, repeat, teardown=lambda tab: tab.deleteLater())}
+
+    tab = ItemsTab()
+    tab.resize(900, 900)
+    tab.show()
+    app.processEvents()
+    for zoom in ITEMS_ZOOM_LEVELS:
+        def zoom_once(zoom=zoom):
+            tab.scale_factor = zoom
+            tab.update_zoom()
+            app.processEvents()
+        results[f"update_zoom_{zoom}"] = measure(zoom_once, repeat)
+    tab.close()
+    tab.deleteLater()
+    return results
+
+
+class FakeClock:
+    """Монотонные часы для Timer, которые двигает сам замер."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def bench_timer_ticks(ticks):
+    """Посекундные тики таймера с окном таймера на экране; каждый тик отрисовывается."""
+    from timer import Timer
+
+    clock = FakeClock()
+    timer = Timer(clock=clock)
+    timer.create_window()
+    timer.set_time(0, 0, ticks)
+    timer.start()
+    app.processEvents()
+
+    times = []
+    tracemalloc.start()
+    for _ in range(ticks):
+        clock.now += 1
+        start = time.perf_counter()
+        timer.update()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timer.stop()
+    timer.timer_window.close()
+    app.processEvents()
+
+    result = summarize(times)
+    result['peak_kb'] = peak / 1024
+    return result
+
+
+def bench_timer_drift(ticks):
+    """
+    Таймер на подменных часах: каждое срабатывание опаздывает на случайные 0..TIMER_SLACK_MS,
+    время от времени цикл событий подвисает на секунды. drift_ms - насколько отсчет на экране
+    отстает от настоящих часов после каждого тика; после подвисания отсчет должен сразу догнать
+    начало текущей секунды. Звуковые сигналы, в том числе попавшие на подвисание, должны сработать ровно по разу.
+    """
+    from timer import Timer
+
+    rng = random.Random(1)
+    clock = FakeClock()
+    timer = Timer(clock=clock)
+    timer.set_time(0, 0, ticks)
+    signal_seconds = list(range(ticks - 5, 0, -max(1, ticks // 50)))
+    for seconds in signal_seconds:
+        timer.set_sound_signal(seconds, f"signal_{seconds}.mp3")
+    played = []
+    timer.play_sound_signal.connect(played.append)
+    timer.start()
+    start_at = clock.now
+
+    drift, stall_drift, stalls = [], [], 0
+    while timer.total_seconds > 0:
+        # Срабатывание через запрошенный таймером интервал, с опозданием
+        clock.now += timer.timer.interval() / 1000 + rng.uniform(0, TIMER_SLACK_MS) / 1000
+        stalled = rng.random() < 0.02
+        if stalled:
+            clock.now += rng.choice(TIMER_STALLS)
+            stalls += 1
+        timer.update()
+        # Отсчет обязан совпадать с прошедшим временем; остаток - задержка показа этой секунды
+        shown_elapsed = ticks - timer.total_seconds
+        lag_ms = (clock.now - start_at - shown_elapsed) * 1000
+        if stalled:
+            # Секунда, на которую пришлось подвисание, еще идет: считается только недосчитанное до ее начала
+            stall_drift.append(lag_ms - (clock.now - start_at) % 1 * 1000)
+        else:
+            drift.append(lag_ms)
+    timer.stop()
+
+    expected = {f"signal_{seconds}.mp3" for seconds in signal_seconds}
+    return {
+        'ticks': ticks,
+        'stalls': stalls,
+        'max_drift_ms': max(drift),
+        'mean_drift_ms': statistics.fmean(drift),
+        'max_drift_after_stall_ms': max(stall_drift, default=0.0),
+        'drift_ok': max(drift) < TIMER_DRIFT_LIMIT_MS and max(map(abs, stall_drift), default=0.0) < TIMER_DRIFT_LIMIT_MS,
+        'sounds_once': len(played) == len(expected) and set(played) == expected,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=config.SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности панели управления")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="файл для результатов (JSON)")
+    parser.add_argument('--repeat', type=int, default=10, help="повторов на замер")
+    parser.add_argument('--quick', action='store_true', help="короткий прогон: меньше повторов, размеров и тиков")
+    parser.add_argument('--only', nargs='*', help="запустить только указанные замеры")
+    args = parser.parse_args()
+
+    repeat = 3 if args.quick else args.repeat
+    sizes = CAMPAIGN_TEXT_KB[:2] if args.quick else CAMPAIGN_TEXT_KB
+    ticks = 600 if args.quick else TIMER_TICKS
+
+    work_dir = tempfile.mkdtemp(prefix="kontt_bench_")
+    # Окна замеров пишут и стирают журнал несохраненного похода: чужой журнал восстановления трогать нельзя
+    config.UNTITLED_JOURNAL_PATH = os.path.join(work_dir, "untitled.journal")
+    cases = {
+        'main_window': lambda: bench_main_window(repeat),
+        'campaign_io': lambda: bench_campaign_io(repeat, sizes, work_dir),
+        'campaign_reopen': lambda: bench_campaign_reopen(REOPEN_TIMES, work_dir),
+        'map_repaint': lambda: bench_map_repaint(repeat * 5),
+        'map_wheel_zoom': lambda: bench_map_wheel_zoom(ZOOM_STEPS),
+        'orange_map_label': lambda: bench_orange_map_label(repeat * 5),
+        'items_tab': lambda: bench_items_tab(repeat),
+        'timer_ticks': lambda: bench_timer_ticks(ticks),
+        'timer_drift': lambda: bench_timer_drift(ticks),
+    }
+
+    results = {}
+    for name, run in cases.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"{name}...", flush=True)
+        results[name] = run()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'pyqt': PYQT_VERSION_STR,
+            'platform': platform.platform(),
+            'qpa': os.environ.get("QT_QPA_PLATFORM"),
+            'repeat': repeat,
+            'timer_ticks': ticks,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+    # Уход таймера - проверка, а не только замер: провал должен быть виден по коду выхода
+    failed = [f"timer_drift.{key}" for key in ('drift_ok', 'sounds_once')
+              if not results.get('timer_drift', {}).get(key, True)]
+    if failed:
+        print("Проверки не пройдены: " + ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
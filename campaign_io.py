@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from PyQt6.QtCore import QThread, pyqtSignal
+import config
+
+DATA_ENTRY = 'data.json'
+MEDIA_PREFIX = 'media/'
+CHUNK_SIZE = 1024 * 1024
+
+# Уже сжатые форматы кладем в архив без повторного сжатия
+STORED_EXTENSIONS = {'.mp3', '.m4a', '.ogg', '.png', '.jpg', '.jpeg', '.gif', '.mp4'}
+
+# Кэш хэшей: (путь, размер, mtime) -> sha256, чтобы не перечитывать неизменные файлы при каждом сохранении
+_hash_cache = {}
+
+# Медиа-хранилище открытого похода (см. resolve_media)
+active_store = None
+
+
+def snapshot_data(data):
+    """
+    Делает неизменяемый снимок данных похода для записи в фоновом потоке.
+    Копируются только контейнеры (dict/list), строки и числа разделяются с оригиналом,
+    поэтому снимок дешевый даже при длинных HTML-текстах.
+    """
+    if isinstance(data, dict):
+        return {k: snapshot_data(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple, set)):
+        return [snapshot_data(v) for v in data]
+    return data
+
+
+def encode_data(data):
+    """Компактная сериализация данных похода (без отступов и \\u-экранирования)."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def collect_media_paths(data):
+    """Возвращает множество путей к медиафайлам, на которые ссылается поход."""
+    paths = set()
+    cells = list(data.get('cell_data', {}).values()) + list(data.get('cell_storage', {}).values())
+    for cell in cells:
+        path = cell.get('custom_sound_path')
+        if path:
+            paths.add(path)
+    overlay = data.get('panel_c_data', {}).get('custom_overlay_path')
+    if overlay:
+        paths.add(overlay)
+    return paths
+
+
+def file_sha256(path):
+    """Потоковый sha256 файла с кэшированием по размеру и времени изменения."""
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = _hash_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _hash_cache[key] = digest
+    return digest
+
+
+def media_member_name(digest, path):
+    return f"{MEDIA_PREFIX}{digest}{os.path.splitext(path)[1].lower()}"
+
+
+def _write_media(zip_ref, media_paths, previous_store):
+    """
+    Копирует медиафайлы в архив без загрузки целиком в память.
+    Одинаковое содержимое хранится один раз. Если исходного файла уже нет на диске,
+    блоб переносится из предыдущего архива похода.
+    Возвращает манифест {исходный путь: имя в архиве}.
+    """
+    manifest = {}
+    written = set()
+    for path in sorted(media_paths):
+        source_zip = None
+        if os.path.isfile(path):
+            member = media_member_name(file_sha256(path), path)
+        elif previous_store and path in previous_store.members:
+            member = previous_store.members[path]
+            source_zip = previous_store.archive_path
+        else:
+            continue
+
+        manifest[path] = member
+        if member in written:
+            continue
+
+        ext = os.path.splitext(member)[1]
+        info = zipfile.ZipInfo(member)
+        info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        with zip_ref.open(info, 'w', force_zip64=True) as dst:
+            if source_zip:
+                with zipfile.ZipFile(source_zip, 'r') as old_zip, old_zip.open(member) as src:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                with open(path, 'rb') as src:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        written.add(member)
+    return manifest
+
+
+def write_campaign(file_path, data, previous_store=None):
+    """
+    Записывает .kontt атомарно: сначала во временный файл в той же папке,
+    затем os.replace поверх старого. При ошибке старый файл остается нетронутым.
+    Возвращает манифест упакованных медиафайлов.
+    """
+    file_path = os.path.abspath(file_path)
+    directory = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_DEFLATED) as zip_ref:
+                data['media'] = _write_media(zip_ref, collect_media_paths(data), previous_store)
+                zip_ref.writestr(DATA_ENTRY, encode_data(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+        return data['media']
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_campaign(file_path):
+    """Читает только data.json; медиафайлы остаются в архиве до первого обращения."""
+    with zipfile.ZipFile(file_path, 'r') as zip_ref:
+        with zip_ref.open(DATA_ENTRY) as f:
+            return json.load(f)
+
+
+class MediaStore:
+    """
+    Медиафайлы открытого похода. Блобы извлекаются в кэш похода лениво,
+    при первом воспроизведении, и повторно не извлекаются: имя файла в кэше - его sha256.
+    """
+    def __init__(self, archive_path, members):
+        self.archive_path = os.path.abspath(archive_path)
+        self.members = dict(members or {})
+        campaign_key = hashlib.sha1(os.path.normcase(self.archive_path).encode('utf-8')).hexdigest()[:16]
+        self.cache_dir = os.path.join(config.MEDIA_CACHE_DIR, campaign_key)
+
+    def resolve(self, path):
+        """Возвращает локальный путь к файлу (исходный или извлеченный из архива) либо None."""
+        if not path:
+            return None
+        if os.path.isfile(path):
+            return path
+        member = self.members.get(path)
+        if not member:
+            return None
+
+        target = os.path.join(self.cache_dir, os.path.basename(member))
+        if os.path.isfile(target):
+            return target
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            part_path = target + ".part"
+            with zipfile.ZipFile(self.archive_path, 'r') as zip_ref:
+                with zip_ref.open(member) as src, open(part_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(part_path, target)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Не удалось извлечь {member}: {e}")
+            return None
+        return target
+
+
+def resolve_media(path):
+    """Путь к медиафайлу с учетом архива открытого похода."""
+    if active_store:
+        return active_store.resolve(path)
+    if path and os.path.isfile(path):
+        return path
+    return None
+
+
+class SaveWorker(QThread):
+    """Поток для сохранения похода, чтобы не блокировать интерфейс"""
+    saved = pyqtSignal(str)  # Не finished: тот уже есть у QThread
+    error = pyqtSignal(str)
+
+    def __init__(self, file_path, data, previous_store=None):
+        super().__init__()
+        self.file_path = file_path
+        self.data = data
+        self.previous_store = previous_store
+        self.media_manifest = {}
+        self.error_message = None
+
+    def run(self):
+        try:
+            self.media_manifest = write_campaign(self.file_path, self.data, self.previous_store)
+            self.saved.emit(self.file_path)
+        except Exception as e:
+            self.error_message = str(e)
+            self.error.emit(self.error_message)
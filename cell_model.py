@@ -0,0 +1,302 @@
+from collections.abc import MutableMapping
+from itertools import count
+from types import MappingProxyType
+from PyQt6.QtGui import QColor, QFont
+from config import DEFAULT_COLOR, FONT_FAMILY_REGULAR, BASE_FONT_SIZE_NUMBER
+from utils import get_font_name
+
+INNER_CONTOUR_ROOM = 'Зала внутреннего контура'
+GENERATED_ROOM = 'Сгенерированная зала'
+WHITE_ROOM = 'Белая зала'
+TRANSPORT_ROOM = 'Транспортная зала'
+
+# --- ШАБЛОНЫ ЯЧЕЕК ---
+# Значения по умолчанию для каждого типа залы (те же, что раньше заполнял set_cell_default).
+# Ячейка хранит только поля, отличающиеся от шаблона своего типа.
+BASE_TEMPLATE = {
+    'color': DEFAULT_COLOR, 'name': "Введите имя залы", 'number': "0000",
+    'text_color': '#CCCCCC', 'text_color_name': '#CCCCCC',
+    'font_size_num': BASE_FONT_SIZE_NUMBER,
+    'font_size_name': 12,
+    'font_family_num': FONT_FAMILY_REGULAR,
+    'font_weight_num': 'bold',
+    'font_family_name': FONT_FAMILY_REGULAR, 'font_weight_name': 'normal',
+    'is_default_name': True, 'is_default_number': True,
+    'font_slant_num': 'roman', 'font_underline_num': False, 'font_overstrike_num': False,
+    'font_slant_name': 'roman', 'font_underline_name': False, 'font_overstrike_name': False,
+    'description_text': '', 'signal_text': '', 'key_action_enabled': False,
+}
+
+CELL_TEMPLATES = {
+    None: MappingProxyType(BASE_TEMPLATE),
+    INNER_CONTOUR_ROOM: MappingProxyType({
+        **BASE_TEMPLATE,
+        'room_type': INNER_CONTOUR_ROOM,
+        'color': '#666666',
+        'name': "",
+        'description_text': "В зале находится таймер на 20 мин и экран, транслирующий вид на какой-то город. Нет никакого испытания, можно кратко описать, чем занимаются персонажи.",
+        'signal_text': "Досточтимые рыцари! Вы находитесь в зале внутреннего контура. Двери залы откроются через 20 минут.",
+    }),
+    GENERATED_ROOM: MappingProxyType({
+        **BASE_TEMPLATE,
+        'room_type': GENERATED_ROOM,
+    }),
+    WHITE_ROOM: MappingProxyType({
+        **BASE_TEMPLATE,
+        'room_type': WHITE_ROOM,
+        'color': '#FFFFFF',
+        'text_color': '#000000',
+        'text_color_name': '#000000',
+        'number': "1001",
+        'name': "Точка нужной координаты",
+        'description_text': "Играет торжественная музыка. В центре залы находится консоль, в которую можно ввести требуемое для исполнения желание. В комнате стоят конструкторы, они смотрят на героев, что-то делают.",
+        'signal_text': "Досточтимые рыцари! Ваш поход завершен. Вы находитесь в белой зале конструктора под номером 1001. Для окончания похода просканируйте вашу эмблему, введите желание, требуемое для исполнения, а затем нажмите кнопку ввода.",
+    }),
+    TRANSPORT_ROOM: MappingProxyType({
+        **BASE_TEMPLATE,
+        'room_type': TRANSPORT_ROOM,
+        'color': '#ffc000',
+        'text_color': '#000000',
+        'text_color_name': '#000000',
+        'number': "2761",
+        'name': "Переход вертикального уровня",
+        'description_text': "Двери залы открыты. В центре залы стоит кабина лифта, напоминающего лифт из дорого отеля начала 21-го века.\nС помощью лифта можно переместиться на Оранжевый или Фиолетовый уровень конструктора",
+        'signal_text': "Досточтимые рыцари! Вы находитесь в транспортной зале Конструктора. Двери залы открыты. Вы можете использовать залу для перемещения между уровнями Конструктора.",
+    }),
+}
+
+# Отметка поля, удаленного из ячейки, хотя оно есть в шаблоне
+_DELETED = object()
+# Так удаленное поле пишется в дельту файла похода и журнала
+DELETED_MARKER = {'__deleted__': True}
+
+# Общий счетчик версий: разные записи никогда не получают одну и ту же версию
+_versions = count(1)
+
+
+def get_cell_template(room_type):
+    """Шаблон типа залы; для типов без шаблона ("Обычная зала") - базовый."""
+    return CELL_TEMPLATES.get(room_type, CELL_TEMPLATES[None])
+
+
+def _same_value(a, b):
+    # 0 == False в Python, поэтому сравниваем и тип
+    return type(a) is type(b) and a == b
+
+
+class CellVisuals:
+    """Разобранные для отрисовки значения ячейки: цвета, шрифт номера, подписи."""
+    __slots__ = ('fill_color', 'number_color', 'name_color', 'number_text', 'name_text', 'wrapped_name',
+                 'is_inner_contour', 'number_size', 'name_size', 'number_bold', 'name_bold',
+                 'number_font', '_name_fonts')
+
+    def __init__(self, data):
+        color_str = data.get('color', '#CCCCCC')
+        if not isinstance(color_str, str) or not color_str.startswith('#'):
+            color_str = '#CCCCCC'
+        self.fill_color = QColor(color_str)
+        self.number_color = QColor(data.get('text_color', '#000000'))
+        self.name_color = QColor(data.get('text_color_name', '#000000'))
+
+        room_type = data.get('room_type', '')
+        number = str(data.get('number', ''))
+        self.number_text = f"-{number}-" if room_type == GENERATED_ROOM else number
+        self.name_text = str(data.get('name', '')).strip()
+        self.wrapped_name = self.name_text.replace(' ', '\n')
+        self.is_inner_contour = room_type == INNER_CONTOUR_ROOM
+
+        self.number_size = data.get('font_size_num', 24)
+        self.name_size = data.get('font_size_name', 12)
+        self.number_bold = data.get('font_weight_num') == 'bold'
+        self.name_bold = data.get('font_weight_name') == 'bold'
+        self.number_font = QFont(get_font_name(self.number_bold), int(self.number_size))
+        self._name_fonts = {}
+
+    def name_font(self, size):
+        """Шрифт имени подобранного размера (размер зависит от ширины, поэтому кэшируется по нему)."""
+        font = self._name_fonts.get(size)
+        if font is None:
+            font = self._name_fonts[size] = QFont(get_font_name(self.name_bold), size)
+        return font
+
+
+def cell_visuals(data):
+    """Значения для отрисовки: у CellRecord берутся из кэша, у обычного словаря (превью редактора) - считаются."""
+    if isinstance(data, CellRecord):
+        return data.visuals
+    return CellVisuals(data)
+
+
+class CellRecord(MutableMapping):
+    """
+    Данные ячейки в виде словаря: шаблон типа залы + поля, отличающиеся от него.
+    Чтение отсутствующих в дельте полей прозрачно берется из шаблона.
+    version меняется при каждой записи и уникальна среди всех записей; производные значения для отрисовки (visuals)
+    кэшируются до следующей записи.
+    """
+    __slots__ = ('template', 'delta', 'version', '_visuals')
+
+    def __init__(self, template, delta=None):
+        self.template = template
+        self.delta = {}
+        self.version = next(_versions)
+        self._visuals = None
+        for key, value in (delta or {}).items():
+            if value == DELETED_MARKER:
+                if key in self.template:
+                    self.delta[key] = _DELETED
+            else:
+                self._store(key, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Ячейка из полного словаря или из дельты (как в файле похода)."""
+        return cls(get_cell_template(data.get('room_type')), data)
+
+    @property
+    def visuals(self):
+        if self._visuals is None:
+            self._visuals = CellVisuals(self)
+        return self._visuals
+
+    def _changed(self):
+        self.version = next(_versions)
+        self._visuals = None
+
+    def _store(self, key, value):
+        if key in self.template and _same_value(self.template[key], value):
+            self.delta.pop(key, None)
+        else:
+            self.delta[key] = value
+
+    def __getitem__(self, key):
+        if key in self.delta:
+            value = self.delta[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        return self.template[key]
+
+    def __setitem__(self, key, value):
+        if key == 'room_type' and value != self.get('room_type'):
+            self._rebase(value)
+        self._store(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self.template:
+            self.delta[key] = _DELETED
+        else:
+            del self.delta[key]
+        self._changed()
+
+    def __iter__(self):
+        for key in self.template:
+            if self.delta.get(key) is not _DELETED:
+                yield key
+        for key, value in self.delta.items():
+            if key not in self.template and value is not _DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"CellRecord({dict(self)!r})"
+
+    def _rebase(self, room_type):
+        """Смена типа залы: дельта пересчитывается относительно шаблона нового типа."""
+        full = dict(self)
+        full['room_type'] = room_type
+        self.template = get_cell_template(room_type)
+        self.delta = {}
+        for key, value in full.items():
+            self._store(key, value)
+        for key in self.template:
+            if key not in full:
+                self.delta[key] = _DELETED
+
+    def copy(self):
+        return dict(self)
+
+    def same_content(self, other):
+        """Те же данные, что у other (без сравнения полей шаблона по одному)."""
+        return (isinstance(other, CellRecord) and self.template is other.template
+                and self.delta.keys() == other.delta.keys()
+                and all(_same_value(value, other.delta[key]) for key, value in self.delta.items()))
+
+    def with_changes(self, changes):
+        """Новая запись с изменениями; исходная не меняется (шаблон общий, копируется только дельта)."""
+        record = CellRecord(self.template)
+        record.delta = dict(self.delta)
+        record.update(changes)
+        return record
+
+    def to_delta(self):
+        """Только отличающиеся от шаблона поля; тип залы пишется всегда, чтобы найти шаблон при чтении."""
+        data = {key: (dict(DELETED_MARKER) if value is _DELETED else value) for key, value in self.delta.items()}
+        if 'room_type' in self:
+            data['room_type'] = self['room_type']
+        return data
+
+
+def encode_cell(cell):
+    """Ячейка для записи в файл похода или журнал."""
+    if not isinstance(cell, CellRecord):
+        cell = CellRecord.from_dict(cell)
+    return cell.to_delta()
+
+
+def decode_cell(data):
+    """Ячейка из файла похода. Старые файлы с полными словарями читаются так же."""
+    return CellRecord.from_dict(data)
+
+
+class CellLookup:
+    """
+    Индексы по данным похода: тип залы -> координаты и номер -> координаты.
+    Обновляются на каждой записи ячейки (update), поэтому поиск белой залы и родной залы контура
+    не перебирает всю карту.
+    """
+    def __init__(self, cell_data=None):
+        self.rebuild(cell_data or {})
+
+    def rebuild(self, cell_data):
+        self.by_type = {}    # тип залы -> {координаты}
+        self.by_number = {}  # номер -> {координаты}
+        self.keys = {}       # координата -> (тип залы, номер), под которыми она записана
+        for coord, record in cell_data.items():
+            self.update(coord, record)
+
+    def update(self, coord, record):
+        """Ячейка coord теперь record (None - ячейка удалена)."""
+        old = self.keys.pop(coord, None)
+        if old is not None:
+            self._discard(self.by_type, old[0], coord)
+            self._discard(self.by_number, old[1], coord)
+        if record is not None:
+            keys = (record.get('room_type'), str(record.get('number')))
+            self.keys[coord] = keys
+            self.by_type.setdefault(keys[0], set()).add(coord)
+            self.by_number.setdefault(keys[1], set()).add(coord)
+
+    @staticmethod
+    def _discard(index, key, coord):
+        coords = index.get(key)
+        if coords is not None:
+            coords.discard(coord)
+            if not coords:
+                del index[key]
+
+    def coords_of_type(self, room_type):
+        return self.by_type.get(room_type, set())
+
+    def coords_of_number(self, number):
+        return self.by_number.get(str(number), set())
+
+    def type_of(self, coord):
+        """Тип залы, под которым записана ячейка coord (None, если ячейки нет)."""
+        keys = self.keys.get(coord)
+        return keys[0] if keys is not None else None
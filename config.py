@@ -7,8 +7,12 @@ FONT_FAMILY_BOLD = 'Epilepsy Sans B'
 FONT_FAMILY_FALLBACK = 'Arial'  # Запасной шрифт
 
 # --- КОНФИГУРАЦИЯ СЕТКИ ---
-ROWS = 7
-COLS = 7
+# ROWS/COLS меняются во время работы (размер сетки хранится в походе, см. map_view.set_grid_size)
+DEFAULT_ROWS = 7
+DEFAULT_COLS = 7
+MAX_GRID_SIZE = 128
+ROWS = DEFAULT_ROWS
+COLS = DEFAULT_COLS
 EXTRA_COLS = 2
 EXTRA_ROWS_TOP = 5
 EXTRA_ROWS_BOTTOM = 1
@@ -39,6 +43,33 @@ REMOTE_HIGHLIGHT_COLOR = (237, 125, 49, 255)
 PATH_COLOR = (255, 165, 0, 255)
 PATH_POINT_COLOR = (0, 0, 255, 255)
 
+# --- ПЕРЕМЕЩЕНИЕ БЕЛОЙ ЗАЛЫ ---
+WHITE_ROOM_PATH_STEP_MS = 150    # Показ пути: задержка между соседними шагами
+WHITE_ROOM_PATH_HOLD_MS = 2000   # Сколько путь виден целиком, прежде чем погаснуть
+
+# --- БОЛЬШИЕ СЕТКИ ---
+MAP_EAGER_CELLS = 400            # До стольких ячеек все элементы карты создаются сразу
+
+# --- УРОВНИ ДЕТАЛИЗАЦИИ КАРТЫ (по масштабу вида) ---
+LOD_FLAT_BELOW = 0.15            # Мельче - только цветные плашки
+LOD_NUMBER_BELOW = 0.3           # Мельче - только номер, без имени залы
+MAP_TILE_PX = 256                # Сторона плитки отдаленной большой карты в пикселях
+MAP_RENDER_BUDGET_MS = 5         # Время кадра на подготовку новых картинок ячеек, остальные - в следующих кадрах
+
+# --- КЭШ ОТРИСОВКИ ЯЧЕЕК ---
+CELL_PIXMAP_CACHE_MB = 48        # Общий бюджет готовых картинок ячеек для обеих карт
+CELL_PIXMAP_MAX_SCALE = 4.0      # При большем увеличении ячейки рисуются напрямую
+
+# --- ПРЕДПРОСМОТР ОКНА ТАЙМЕРА ---
+TIMER_PREVIEW_FPS = 20           # Не чаще стольких кадров в секунду; кадр снимается только после перерисовки окна
+
+# --- ЖУРНАЛ ПРАВОК ---
+JOURNAL_FLUSH_INTERVAL_MS = 1000      # Как часто накопленные правки сбрасываются на диск
+JOURNAL_COMPACT_BYTES = 256 * 1024    # Размер журнала, после которого он сворачивается в .kontt
+
+# --- ИСТОРИЯ ПРАВОК ---
+UNDO_LIMIT = 500  # Шаги хранят только ссылки на записи ячеек, поэтому история дешевая
+
 # --- ПАРАМЕТРЫ ВКЛАДОК ---
 tab_names = [
     "Карта Серого уровня", "Оранжевый уровень", "Фиолетовый уровень",
@@ -76,6 +107,8 @@ LORE_DIR = os.path.join(BASE_DIR, "Lore")
 ITEMS_DIR = os.path.join(BASE_DIR, "Items")
 VISUAL_TAB_DIR = os.path.join(BASE_DIR, "VisualTab")
 WHITE_ROOM_MOVE_DIR = os.path.join(BASE_DIR, "WhiteRoomMove")
+MEDIA_CACHE_DIR = os.path.join(BASE_DIR, "MediaCache") # Извлеченные из .kontt медиафайлы
+UNTITLED_JOURNAL_PATH = os.path.join(BASE_DIR, "untitled.journal") # Журнал правок несохраненного похода
 
 # Создаем папки для записи, если их нет
 for d in [AUDIO_PANEL_SOUNDS_DIR, SYNTH_SPEECH_DIR]:
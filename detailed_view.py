@@ -3,10 +3,14 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QMenu, QMessageBox, QFileDialog, QGridLayout, QPlainTextEdit, QSizePolicy, QLayout, QDialog)
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QRectF, QPointF, QRect, QPoint, QEvent
 from PyQt6.QtGui import QFont, QColor, QPalette, QPainter, QBrush, QPen, QTextDocument, QTextOption, QPolygonF, QFontMetrics, QAction
-from config import FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR, BASE_ROOM_SOUNDS_DIR, AUDIO_PANEL_SOUNDS_DIR, CELL_RADIUS, ROWS, COLS
+import config
+from config import FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR, BASE_ROOM_SOUNDS_DIR, AUDIO_PANEL_SOUNDS_DIR, CELL_RADIUS
+from map_view import coord_label
 from utils import get_font_name, get_fitted_font_size
 from editor_window import EditCellDialog
 from text_formatting import FormattingToolbar
+from campaign_io import resolve_media
+from cell_model import cell_visuals
 import os
 import math
 
@@ -186,30 +190,21 @@ class CellWidget(QWidget):
         
         if not self.data: return
 
-        color_str = self.data.get('color', '#CCCCCC')
-        if not isinstance(color_str, str) or not color_str.startswith('#'):
-            color_str = '#CCCCCC'
-        bg_color = QColor(color_str)
-        painter.setBrush(QBrush(bg_color))
+        visuals = cell_visuals(self.data)
+        painter.setBrush(QBrush(visuals.fill_color))
         painter.setPen(Qt.PenStyle.NoPen)
             
         rect = QRectF(self.rect())
         painter.drawRoundedRect(rect, CELL_RADIUS, CELL_RADIUS)
         
-        num_text = str(self.data.get('number', ''))
-        if self.data.get('room_type') == 'Сгенерированная зала':
-            num_text = f"-{num_text}-"
-            
-        text_color = QColor(self.data.get('text_color', '#000000'))
-        painter.setPen(text_color)
+        painter.setPen(visuals.number_color)
         
-        font_size_num = int(self.data.get('font_size_num', 24) * (self.width() / 100.0))
-        is_bold_num = self.data.get('font_weight_num') == 'bold'
-        font_num = QFont(get_font_name(is_bold_num), font_size_num)
+        font_size_num = int(visuals.number_size * (self.width() / 100.0))
+        font_num = QFont(get_font_name(visuals.number_bold), font_size_num)
         painter.setFont(font_num)
         
         # Always draw number in the center, no name
-        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, num_text)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, visuals.number_text)
 
 class NavButton(QPushButton, SquareWidgetMixin):
     def __init__(self, r, c, data, parent=None):
@@ -247,11 +242,8 @@ class NavButton(QPushButton, SquareWidgetMixin):
         y_offset = (self.height() - side) / 2
         rect = QRectF(x_offset, y_offset, side, side)
         
-        color_str = self.data.get('color', '#CCCCCC')
-        if not isinstance(color_str, str) or not color_str.startswith('#'):
-            color_str = '#CCCCCC'
-        bg_color = QColor(color_str)
-        painter.setBrush(QBrush(bg_color))
+        visuals = cell_visuals(self.data)
+        painter.setBrush(QBrush(visuals.fill_color))
         
         if self.is_hovered:
             pen = QPen(QColor(255, 215, 0))
@@ -266,37 +258,30 @@ class NavButton(QPushButton, SquareWidgetMixin):
             
         painter.drawRoundedRect(rect, CELL_RADIUS, CELL_RADIUS)
         
-        num_text = str(self.data.get('number', ''))
-        if self.data.get('room_type') == 'Сгенерированная зала':
-            num_text = f"-{num_text}-"
-            
-        text_color = QColor(self.data.get('text_color', '#000000'))
-        painter.setPen(text_color)
+        num_text = visuals.number_text
+        painter.setPen(visuals.number_color)
         
         scale_factor = side / 100.0
-        font_size_num = int(self.data.get('font_size_num', 24) * 0.9 * scale_factor)
-        is_bold_num = self.data.get('font_weight_num') == 'bold'
-        font_num = QFont(get_font_name(is_bold_num), max(8, font_size_num))
+        font_size_num = int(visuals.number_size * 0.9 * scale_factor)
+        font_num = QFont(get_font_name(visuals.number_bold), max(8, font_size_num))
         painter.setFont(font_num)
         
-        name_text = str(self.data.get('name', '')).strip()
-        room_type = self.data.get('room_type', '')
-        is_inner_contour = room_type == 'Зала внутреннего контура'
+        name_text = visuals.name_text
         
-        if is_inner_contour:
+        if visuals.is_inner_contour:
             painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, num_text)
         elif name_text:
             num_rect = QRectF(rect.x(), rect.y() + rect.height() * 0.05, rect.width(), rect.height() * 0.3)
             painter.drawText(num_rect, Qt.AlignmentFlag.AlignCenter, num_text)
             
             painter.save()
-            text_color_name = QColor(self.data.get('text_color_name', '#000000'))
+            text_color_name = visuals.name_color
             
-            initial_font_size_name = int(self.data.get('font_size_name', 12) * 0.9 * scale_factor)
-            is_bold_name = self.data.get('font_weight_name') == 'bold'
+            initial_font_size_name = int(visuals.name_size * 0.9 * scale_factor)
+            is_bold_name = visuals.name_bold
             fitted_font_size = get_fitted_font_size(name_text, is_bold_name, initial_font_size_name, rect.width() * 0.95)
             
-            font_name = QFont(get_font_name(is_bold_name), max(6, fitted_font_size))
+            font_name = visuals.name_font(max(6, fitted_font_size))
             
             name_area_width = rect.width() - 10
             name_area_x = rect.x() + 5
@@ -426,7 +411,7 @@ class NavPanel(QWidget):
                     
                     # Check exclusion logic
                     is_excluded = False
-                    if c == COLS - 1 and nc >= COLS: # G column excluding X/Z
+                    if c == config.COLS - 1 and nc >= config.COLS: # Last column excluding X/Z
                         is_excluded = True
                     
                     if not is_excluded and (nr, nc) in cell_data:
@@ -704,26 +689,13 @@ class DetailedView(QWidget):
         
         self.cell_preview.update_data(data)
         
-        name_text = str(data.get('name', '')).strip()
-        if data.get('room_type') == 'Зала внутреннего контура':
+        visuals = cell_visuals(data)
+        name_text = visuals.name_text
+        if visuals.is_inner_contour:
             name_text = "ЗАЛА ВНУТРЕННЕГО КОНТУРА"
         self.lbl_name.setText(name_text.upper())
         
-        col_char = ""
-        if c < COLS:
-            col_char = chr(ord('A') + c)
-        elif c == COLS:
-            col_char = "X"
-        elif c == COLS + 1:
-            col_char = "Z"
-            
-        row_num = ""
-        if c < COLS:
-            row_num = str(ROWS - r)
-        else:
-            row_num = str(6 - r) # Для X и Z
-
-        self.lbl_coord.setText(f"Координата: {col_char}{row_num}")
+        self.lbl_coord.setText(f"Координата: {coord_label(r, c)}")
         
         # Only update text if widget doesn't have focus to prevent cursor jump
         if not self.txt_desc.hasFocus():
@@ -750,7 +722,7 @@ class DetailedView(QWidget):
         self.chk_key_action.blockSignals(False)
         
         # Hide nav panel for X and Z columns
-        if c >= COLS:
+        if c >= config.COLS:
             self.nav_panel.hide()
         else:
             self.nav_panel.show()
@@ -771,17 +743,14 @@ class DetailedView(QWidget):
 
     def on_desc_changed(self):
         val = self.txt_desc.toHtml()
-        self.data['description_text'] = val
         self.data_changed_signal.emit(self.r, self.c, 'description_text', val)
 
     def on_signal_changed(self):
         val = self.input_signal.toHtml() # Save as HTML now
-        self.data['signal_text'] = val
         self.data_changed_signal.emit(self.r, self.c, 'signal_text', val)
 
     def on_key_action_changed(self, state):
         val = bool(state)
-        self.data['key_action_enabled'] = val
         self.data_changed_signal.emit(self.r, self.c, 'key_action_enabled', val)
 
     def on_play_click(self):
@@ -796,8 +765,9 @@ class DetailedView(QWidget):
 
     def _resolve_and_play(self):
         # Check if a custom sound file is set
-        custom_sound = self.data.get('custom_sound_path')
-        if custom_sound and os.path.exists(custom_sound):
+        # Файл может быть упакован в .kontt и извлекается при первом воспроизведении
+        custom_sound = resolve_media(self.data.get('custom_sound_path'))
+        if custom_sound:
             self.play_sound_path(custom_sound)
             return
 
@@ -855,13 +825,10 @@ class DetailedView(QWidget):
         if action == action_select:
             file_path, _ = QFileDialog.getOpenFileName(self, "Выберите файл", "", "Audio (*.wav *.mp3)")
             if file_path:
-                # Save the full path to the data dictionary
-                self.data['custom_sound_path'] = file_path
                 self.data_changed_signal.emit(self.r, self.c, 'custom_sound_path', file_path)
                 QMessageBox.information(self, "Успех", f"Звуковой файл привязан: {os.path.basename(file_path)}")
         elif action == action_clear:
-            if 'custom_sound_path' in self.data:
-                del self.data['custom_sound_path']
+            if self.data.get('custom_sound_path'):
                 self.data_changed_signal.emit(self.r, self.c, 'custom_sound_path', None)
                 QMessageBox.information(self, "Успех", "Привязка звукового файла удалена")
 
@@ -869,7 +836,5 @@ class DetailedView(QWidget):
         dialog = EditCellDialog(self.data, coords=(self.r, self.c), parent=self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             new_data = dialog.get_data()
+            # Ячейка заменяется новой записью, вид обновится через update_cell_view
             self.data_changed_signal.emit(self.r, self.c, '__all__', new_data)
-            
-            # Update local view
-            self.show_cell(self.r, self.c, new_data)
@@ -3,8 +3,10 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QDialogButtonBox, QFrame, QComboBox, QWidget, QGroupBox, QGridLayout)
 from PyQt6.QtGui import QColor, QPainter, QBrush, QPen, QFont, QTextDocument, QTextOption, QIcon, QPixmap
 from PyQt6.QtCore import Qt, QRectF, QSize
-from config import CELL_RADIUS, CELL_SIZE, FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR, ROWS, COLS
-from utils import get_font_name, get_fitted_font_size
+from config import CELL_RADIUS, CELL_SIZE, FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR
+from map_view import coord_label
+from utils import get_fitted_font_size
+from cell_model import cell_visuals
 
 # Пресеты для типов комнат
 ROOM_TYPES = {
@@ -55,28 +57,18 @@ class CellPreviewWidget(QWidget):
         margin_y = (self.height() - CELL_SIZE) / 2
         rect = QRectF(margin_x, margin_y, CELL_SIZE, CELL_SIZE)
 
-        bg_color = QColor(self.data.get('color', '#CCCCCC'))
-        painter.setBrush(QBrush(bg_color))
+        visuals = cell_visuals(self.data)
+        painter.setBrush(QBrush(visuals.fill_color))
         painter.setPen(Qt.PenStyle.NoPen)
         painter.drawRoundedRect(rect, CELL_RADIUS, CELL_RADIUS)
 
-        num_text = str(self.data.get('number', ''))
-        if self.data.get('room_type') == 'Сгенерированная зала':
-            num_text = f"-{num_text}-"
+        num_text = visuals.number_text
+        painter.setPen(visuals.number_color)
+        painter.setFont(visuals.number_font)
 
-        text_color = QColor(self.data.get('text_color', '#000000'))
-        painter.setPen(text_color)
+        name_text = visuals.name_text
         
-        font_size_num = self.data.get('font_size_num', 24)
-        is_bold_num = self.data.get('font_weight_num') == 'bold'
-        font_num = QFont(get_font_name(is_bold_num), font_size_num)
-        painter.setFont(font_num)
-
-        name_text = self.data.get('name', '').strip()
-        room_type = self.data.get('room_type', '')
-        is_inner_contour = room_type == 'Зала внутреннего контура'
-        
-        if is_inner_contour:
+        if visuals.is_inner_contour:
             painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, num_text)
             
         elif name_text:
@@ -86,14 +78,13 @@ class CellPreviewWidget(QWidget):
             
             painter.save()
             
-            text_color_name = QColor(self.data.get('text_color_name', '#000000'))
+            text_color_name = visuals.name_color
             
             # Auto-fit font size for name
-            initial_font_size_name = self.data.get('font_size_name', 12)
-            is_bold_name = self.data.get('font_weight_name') == 'bold'
-            fitted_font_size = get_fitted_font_size(name_text, is_bold_name, initial_font_size_name, rect.width() * 0.95)
+            is_bold_name = visuals.name_bold
+            fitted_font_size = get_fitted_font_size(name_text, is_bold_name, visuals.name_size, rect.width() * 0.95)
             
-            font_name = QFont(get_font_name(is_bold_name), fitted_font_size)
+            font_name = visuals.name_font(fitted_font_size)
             
             name_area_width = rect.width() - 10
             name_area_x = rect.x() + 5
@@ -134,23 +125,7 @@ class EditCellDialog(QDialog):
         
         title = "Настройка залы"
         if coords:
-            r, c = coords
-            
-            col_char = ""
-            if c < COLS:
-                col_char = chr(ord('A') + c)
-            elif c == COLS:
-                col_char = "X"
-            elif c == COLS + 1:
-                col_char = "Z"
-                
-            row_num = ""
-            if c < COLS:
-                row_num = str(ROWS - r)
-            else:
-                row_num = str(6 - r)
-            
-            title = f"Настройка залы [{col_char}{row_num}]"
+            title = f"Настройка залы [{coord_label(*coords)}]"
             
         self.setWindowTitle(title)
         self.resize(700, 550)
@@ -467,3 +442,140 @@ class EditCellDialog(QDialog):
             'signal_text': self.data.get('signal_text', '')
         }
         return data
+
+
+class BulkEditCellDialog(QDialog):
+    """
+    Одна правка для нескольких выделенных зал: меняются только отмеченные поля,
+    остальное (номер, описание, сигнал) у каждой залы остается своим.
+    """
+    def __init__(self, count, data, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Настройка выделенных зал ({count})")
+        self.resize(420, 420)
+        
+        # Начальные значения берутся из залы, на которой открыли меню
+        self.current_colors = {
+            'color': data.get('color', '#CCCCCC'),
+            'text_color': data.get('text_color', '#000000'),
+            'text_color_name': data.get('text_color_name', '#000000')
+        }
+        self.checks = {}
+        
+        layout = QVBoxLayout()
+        grid = QGridLayout()
+        
+        # Белая зала на карте одна, поэтому массово ее не назначить
+        self.combo_type = QComboBox()
+        self.combo_type.addItems([name for name in ROOM_TYPES if name != "Белая зала"])
+        self.combo_type.setCurrentText(data.get('room_type', ''))
+        self.combo_type.currentTextChanged.connect(self.on_type_changed)
+        self.add_row(grid, 'room_type', "Тип залы:", self.combo_type)
+        
+        self.input_name = QLineEdit(data.get('name', ''))
+        self.input_name.textEdited.connect(lambda _: self.checks['name'].setChecked(True))
+        self.add_row(grid, 'name', "Имя:", self.input_name)
+        
+        self.color_buttons = {}
+        for key, title in (('color', "Цвет фона"), ('text_color', "Цвет номера"), ('text_color_name', "Цвет имени")):
+            btn = QPushButton(title)
+            self.update_btn_style(btn, self.current_colors[key])
+            btn.clicked.connect(lambda checked, k=key: self.choose_color(k))
+            self.color_buttons[key] = btn
+            self.add_row(grid, key, title + ":", btn)
+        
+        self.spin_size_num = QSpinBox()
+        self.spin_size_num.setRange(8, 72)
+        self.spin_size_num.setValue(int(data.get('font_size_num', 24)))
+        self.spin_size_num.valueChanged.connect(lambda _: self.checks['font_size_num'].setChecked(True))
+        self.add_row(grid, 'font_size_num', "Размер номера:", self.spin_size_num)
+        
+        self.spin_size_name = QSpinBox()
+        self.spin_size_name.setRange(8, 72)
+        self.spin_size_name.setValue(int(data.get('font_size_name', 12)))
+        self.spin_size_name.valueChanged.connect(lambda _: self.checks['font_size_name'].setChecked(True))
+        self.add_row(grid, 'font_size_name', "Размер имени:", self.spin_size_name)
+        
+        self.chk_bold_num = QCheckBox("Жирный")
+        self.chk_bold_num.setChecked(data.get('font_weight_num') == 'bold')
+        self.chk_bold_num.toggled.connect(lambda _: self.checks['font_weight_num'].setChecked(True))
+        self.add_row(grid, 'font_weight_num', "Номер:", self.chk_bold_num)
+        
+        self.chk_bold_name = QCheckBox("Жирный")
+        self.chk_bold_name.setChecked(data.get('font_weight_name') == 'bold')
+        self.chk_bold_name.toggled.connect(lambda _: self.checks['font_weight_name'].setChecked(True))
+        self.add_row(grid, 'font_weight_name', "Имя:", self.chk_bold_name)
+        
+        layout.addLayout(grid)
+        
+        palette_layout = QHBoxLayout()
+        for color_hex in PRESET_COLORS:
+            btn = QPushButton()
+            btn.setFixedSize(25, 25)
+            btn.setStyleSheet(f"background-color: {color_hex}; border: 1px solid #555;")
+            btn.clicked.connect(lambda checked, c=color_hex: self.set_preset_color(c))
+            palette_layout.addWidget(btn)
+        palette_layout.addStretch()
+        layout.addLayout(palette_layout)
+        layout.addStretch()
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def add_row(self, grid, key, title, widget):
+        """Строка "галочка + поле": в правку попадают только отмеченные поля."""
+        row = grid.rowCount()
+        check = QCheckBox(title)
+        self.checks[key] = check
+        grid.addWidget(check, row, 0)
+        grid.addWidget(widget, row, 1)
+
+    def update_btn_style(self, btn, color_str):
+        bg_color = QColor(color_str)
+        text_color = "black" if bg_color.lightness() > 128 else "white"
+        btn.setStyleSheet(f"background-color: {color_str}; color: {text_color}; font-weight: bold; border-radius: 4px; padding: 5px;")
+
+    def set_color(self, key, hex_color):
+        self.current_colors[key] = hex_color
+        self.update_btn_style(self.color_buttons[key], hex_color)
+        self.checks[key].setChecked(True)
+
+    def set_preset_color(self, color_hex):
+        self.set_color('color', color_hex)
+        text_color = "#000000" if QColor(color_hex).lightness() > 128 else "#ffffff"
+        self.set_color('text_color', text_color)
+        self.set_color('text_color_name', text_color)
+
+    def choose_color(self, key):
+        color = QColorDialog.getColor(QColor(self.current_colors[key]), self, "Выберите цвет")
+        if color.isValid():
+            self.set_color(key, color.name())
+
+    def on_type_changed(self, type_name):
+        # Как в настройке одной залы: тип подставляет свои цвета и начертание
+        self.checks['room_type'].setChecked(True)
+        preset = ROOM_TYPES.get(type_name)
+        if not preset:
+            return
+        for key in ('color', 'text_color', 'text_color_name'):
+            self.set_color(key, preset[key])
+        self.chk_bold_num.setChecked(preset['font_weight_num'] == 'bold')
+        self.chk_bold_name.setChecked(preset['font_weight_name'] == 'bold')
+
+    def get_changes(self):
+        """Частичная правка: только отмеченные поля."""
+        values = {
+            'room_type': self.combo_type.currentText(),
+            'name': self.input_name.text(),
+            'color': self.current_colors['color'],
+            'text_color': self.current_colors['text_color'],
+            'text_color_name': self.current_colors['text_color_name'],
+            'font_size_num': self.spin_size_num.value(),
+            'font_size_name': self.spin_size_name.value(),
+            'font_weight_num': 'bold' if self.chk_bold_num.isChecked() else 'normal',
+            'font_weight_name': 'bold' if self.chk_bold_name.isChecked() else 'normal',
+        }
+        return {key: value for key, value in values.items() if self.checks[key].isChecked()}
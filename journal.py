@@ -0,0 +1,204 @@
+import json
+import os
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+import config
+from campaign_io import encode_data
+from cell_model import encode_cell, decode_cell
+
+# Ключ '__all__' означает замену ячейки целиком (как в DetailedView.data_changed_signal)
+WHOLE_CELL = '__all__'
+
+
+def journal_path(campaign_path):
+    """Журнал лежит рядом с файлом похода; у несохраненного похода - общий журнал в папке программы."""
+    if campaign_path:
+        return campaign_path + '.journal'
+    return config.UNTITLED_JOURNAL_PATH
+
+
+def read_records(path):
+    """
+    Читает записи журнала. Чтение останавливается на первой поврежденной строке:
+    это недописанный хвост после аварийного завершения.
+    """
+    records = []
+    if not os.path.isfile(path):
+        return records
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def apply_records(records, cell_data, cell_storage):
+    """Повторяет записи журнала поверх данных похода. Возвращает координаты измененных ячеек."""
+    touched = set()
+    for record in records:
+        if 'c' in record:
+            coord = tuple(map(int, record['c'].split(',')))
+            key, value = record.get('k'), record.get('v')
+            if key == WHOLE_CELL:
+                if value is None:
+                    cell_data.pop(coord, None)
+                else:
+                    cell_data[coord] = decode_cell(value)
+            elif coord in cell_data:
+                # Копия, а не правка на месте: на прежнюю запись могут ссылаться шаги отмены
+                cell_data[coord] = cell_data[coord].with_changes({key: value})
+            touched.add(coord)
+        elif 's' in record:
+            if record.get('v') is None:
+                cell_storage.pop(record['s'], None)
+            else:
+                cell_storage[record['s']] = decode_cell(record['v'])
+    return touched
+
+
+class JournalFlushWorker(QThread):
+    """Дописывает накопленные записи в конец журнала"""
+    error = pyqtSignal(str)
+
+    def __init__(self, path, lines):
+        super().__init__()
+        self.path = path
+        self.lines = lines
+
+    def run(self):
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(b''.join(self.lines))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.error.emit(str(e))
+
+
+class EditJournal(QObject):
+    """
+    Журнал правок похода (JSON-строка на правку: координата, ключ, значение).
+    Правки копятся в памяти и пачками дописываются на диск в фоновом потоке.
+    После успешного сохранения .kontt записи, вошедшие в снимок, удаляются (compact).
+    """
+    compaction_needed = pyqtSignal()
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.seq = 0
+        self.size = 0
+        self.pending = []  # [(ключ для слияния, seq, строка)]
+        self.flush_worker = None
+        self.compaction_requested = False  # Сигнал уже отправлен, пока журнал не свернут
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(config.JOURNAL_FLUSH_INTERVAL_MS)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+        self.reset(path)
+
+    def record_cell(self, coord, key, value):
+        self._append((coord, key), {'c': f"{coord[0]},{coord[1]}", 'k': key, 'v': value})
+
+    def record_cell_replaced(self, coord, data):
+        self._append((coord, WHOLE_CELL), {'c': f"{coord[0]},{coord[1]}", 'k': WHOLE_CELL, 'v': encode_cell(data) if data is not None else None})
+
+    def record_storage(self, number, data):
+        self._append(('storage', number), {'s': number, 'v': encode_cell(data) if data is not None else None})
+
+    def _append(self, merge_key, record):
+        self.seq += 1
+        record['q'] = self.seq
+        # Значение кодируется сразу: ячейки дальше меняются на месте
+        line = encode_data(record) + b'\n'
+        # Подряд идущие правки одного поля (набор текста) до сброса на диск схлопываются в одну
+        if self.pending and self.pending[-1][0] == merge_key:
+            self.pending[-1] = (merge_key, self.seq, line)
+        else:
+            self.pending.append((merge_key, self.seq, line))
+
+    def flush(self):
+        if not self.pending or (self.flush_worker and self.flush_worker.isRunning()):
+            return
+        lines = [line for _, _, line in self.pending]
+        self.pending = []
+        self.size += sum(len(line) for line in lines)
+
+        self.flush_worker = JournalFlushWorker(self.path, lines)
+        self.flush_worker.error.connect(lambda msg: print(f"Ошибка записи журнала: {msg}"))
+        self.flush_worker.start()
+
+        # Журнал несохраненного похода свернуть некуда; у сохраненного - один сигнал на превышение порога
+        if (self.size > config.JOURNAL_COMPACT_BYTES and not self.compaction_requested
+                and self.path != journal_path(None)):
+            self.compaction_requested = True
+            self.compaction_needed.emit()
+
+    def wait(self):
+        if self.flush_worker:
+            self.flush_worker.wait()
+            self.flush_worker = None
+
+    def replay(self, cell_data, cell_storage):
+        """Восстанавливает правки, оставшиеся в журнале после аварийного завершения."""
+        self.wait()
+        records = read_records(self.path)
+        if not records:
+            return None
+        self.seq = max(self.seq, max(record.get('q', 0) for record in records))
+        return apply_records(records, cell_data, cell_storage)
+
+    def compact(self, saved_seq, campaign_path):
+        """
+        Убирает записи, которые уже вошли в сохраненный снимок похода (seq <= saved_seq).
+        Более поздние правки переносятся в журнал рядом с новым файлом.
+        """
+        self.wait()
+        remaining = [line for line in self._read_lines() if json.loads(line).get('q', 0) > saved_seq]
+        self.pending = [entry for entry in self.pending if entry[1] > saved_seq]
+        self._remove_file()
+        self.path = journal_path(campaign_path)
+        if remaining:
+            with open(self.path, 'wb') as f:
+                f.write(b''.join(remaining))
+        self.size = sum(len(line) for line in remaining)
+        self.compaction_requested = False
+
+    def discard(self):
+        """Удаляет журнал вместе с несброшенными правками (правки отброшены пользователем)."""
+        self.wait()
+        self.pending = []
+        self._remove_file()
+        self.size = 0
+        self.compaction_requested = False
+
+    def reset(self, path):
+        self.wait()
+        self.pending = []
+        self.path = path
+        self.seq = 0
+        self.size = os.path.getsize(path) if os.path.isfile(path) else 0
+        self.compaction_requested = False
+
+    def _read_lines(self):
+        lines = []
+        if os.path.isfile(self.path):
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                    lines.append(line if line.endswith(b'\n') else line + b'\n')
+        return lines
+
+    def _remove_file(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Не удалось удалить журнал {self.path}: {e}")
@@ -1,18 +1,23 @@
+import startup_trace
 import sys
 import os
-import json
-import zipfile
-import shutil
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QHBoxLayout, QSplitter, QVBoxLayout, QMenuBar, QMenu, QMessageBox, QFileDialog
-from PyQt6.QtCore import Qt, QUrl, QTimer
-from PyQt6.QtGui import QFontDatabase, QAction, QIcon
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QHBoxLayout, QSplitter, QVBoxLayout, QMenuBar, QMenu, QMessageBox, QFileDialog, QInputDialog
+from PyQt6.QtCore import Qt, QUrl, QTimer, QObject, QEvent
+from PyQt6.QtGui import QFontDatabase, QAction, QIcon, QKeySequence
 
 import config
-from map_view import set_cell_default, get_cell_layout
-from PanelAB import MainPanel
+from map_view import set_cell_default, get_cell_layout, set_grid_size, parse_coord_label, contour_position
+from PanelAB import MainPanel, MapScene
 from PanelC import PanelC
 from timer import Timer
+import campaign_io
+from campaign_io import SaveWorker, MediaStore, snapshot_data, read_campaign
+from journal import EditJournal, journal_path
+from cell_model import CellRecord, CellLookup, encode_cell, decode_cell, INNER_CONTOUR_ROOM, WHITE_ROOM
+from undo_stack import UndoStack
+from utils import clear_font_fit_cache
+
+startup_trace.mark("импорты")
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -28,13 +33,24 @@ class MainWindow(QMainWindow):
         self.current_file_path = None
         self.is_modified = False
         
-        # Заменяем QSoundEffect на QMediaPlayer для поддержки MP3
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
-        self.audio_output.setVolume(1.0)
+        # Фоновое сохранение
+        self.save_worker = None
+        self.pending_save_path = None
+        self.media_store = None
+        
+        # Журнал правок: каждая правка ячейки сразу уходит на диск, полная перезапись - только при сохранении
+        self.journal = EditJournal(journal_path(None), self)
+        self.journal.compaction_needed.connect(self.compact_journal)
+        
+        # История правок карты (отмена/повтор)
+        self.undo_stack = UndoStack()
         
-        self.load_fonts()
+        # Плеер звуков (QMediaPlayer для поддержки MP3) создается при первом звуке
+        self.player = None
+        self.audio_output = None
+        
+        with startup_trace.phase("шрифты (load_fonts)"):
+            self.load_fonts()
         
         self.cell_data = {}
         self.cell_storage = {}
@@ -42,20 +58,27 @@ class MainWindow(QMainWindow):
         self.cell_layout = get_cell_layout()
         for r, c in self.cell_layout.keys():
             set_cell_default(r, c, self.cell_data)
+        # Поиск ячеек по типу залы и номеру; обновляется на каждой записи в cell_data
+        self.cell_lookup = CellLookup(self.cell_data)
             
         self.timer = Timer()
         self.timer.play_sound_signal.connect(self.play_sound)
         self.timer.confirm_end_sound_signal.connect(self.confirm_end_sound)
         self.timer.stop_all_audio.connect(self.stop_all_sounds)
         
-        self.init_ui()
+        with startup_trace.phase("панели (init_ui)"):
+            self.init_ui()
         
-        self.timer.create_window()
+        with startup_trace.phase("окно таймера"):
+            self.timer.create_window()
         
-        self.panel_c.update_white_room_controls(self.cell_data)
+        self.panel_c.update_white_room_controls(self.has_white_room())
         
         self.panel_c.start_preview_timer()
         
+        # Правки несохраненного похода, пережившие аварийное завершение
+        self.replay_journal()
+        
         # Сохраняем начальные пропорции по умолчанию
         self.initial_ratios = [0.3, 0.3, 0.4]
         # Захватываем реальные пропорции после полной загрузки интерфейса
@@ -72,6 +95,7 @@ class MainWindow(QMainWindow):
         SCRIPT_DIR = config.SCRIPT_DIR
         font_regular_path = os.path.join(SCRIPT_DIR, "EpilepsySans.ttf")
         font_bold_path = os.path.join(SCRIPT_DIR, "EpilepsySansB.ttf")
+        previous_families = (config.FONT_FAMILY_REGULAR, config.FONT_FAMILY_BOLD)
         
         if os.path.exists(font_regular_path):
             id = QFontDatabase.addApplicationFont(font_regular_path)
@@ -84,6 +108,10 @@ class MainWindow(QMainWindow):
             families = QFontDatabase.applicationFontFamilies(id)
             if families:
                 config.FONT_FAMILY_BOLD = families[0]
+        
+        # Подобранные размеры шрифтов считались по прежним шрифтам
+        if (config.FONT_FAMILY_REGULAR, config.FONT_FAMILY_BOLD) != previous_families:
+            clear_font_fit_cache()
 
     def init_ui(self):
         menubar = self.menuBar()
@@ -91,18 +119,24 @@ class MainWindow(QMainWindow):
         file_menu = menubar.addMenu("Файл")
         
         new_action = QAction("Новый поход", self)
-        new_action.triggered.connect(self.new_campaign)
+        new_action.triggered.connect(lambda: self.new_campaign())
         file_menu.addAction(new_action)
         
+        new_sized_action = QAction("Новый поход с размером сетки...", self)
+        new_sized_action.triggered.connect(self.new_campaign_with_size)
+        file_menu.addAction(new_sized_action)
+        
         open_action = QAction("Открыть...", self)
         open_action.triggered.connect(self.open_campaign)
         file_menu.addAction(open_action)
         
         save_action = QAction("Сохранить", self)
+        save_action.setShortcut(QKeySequence.StandardKey.Save)
         save_action.triggered.connect(self.save_campaign)
         file_menu.addAction(save_action)
         
         save_as_action = QAction("Сохранить как...", self)
+        save_as_action.setShortcut(QKeySequence.StandardKey.SaveAs)
         save_as_action.triggered.connect(self.save_campaign_as)
         file_menu.addAction(save_as_action)
         
@@ -114,6 +148,20 @@ class MainWindow(QMainWindow):
         
         edit_menu = menubar.addMenu("Редактирование")
         
+        self.undo_action = QAction("Отменить", self)
+        self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undo_action.triggered.connect(self.undo)
+        self.undo_action.setEnabled(False)
+        edit_menu.addAction(self.undo_action)
+        
+        self.redo_action = QAction("Повторить", self)
+        self.redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redo_action.triggered.connect(self.redo)
+        self.redo_action.setEnabled(False)
+        edit_menu.addAction(self.redo_action)
+        
+        edit_menu.addSeparator()
+        
         show_edit_panel_menu = edit_menu.addMenu("Отобразить панель редактирования...")
         
         self.action_edit_grey = QAction("...на сером уровне", self, checkable=True)
@@ -166,10 +214,13 @@ class MainWindow(QMainWindow):
         
         self.splitter = QSplitter(Qt.Orientation.Horizontal)
         
-        self.panel_a = MainPanel(self.cell_data, self.campaign_title_ref)
+        # Одна сцена карты на обе панели
+        self.map_scene = MapScene(self.cell_data, self.campaign_title_ref, self)
+        
+        self.panel_a = MainPanel(self.map_scene)
         self.splitter.addWidget(self.panel_a)
         
-        self.panel_b = MainPanel(self.cell_data, self.campaign_title_ref)
+        self.panel_b = MainPanel(self.map_scene)
         self.splitter.addWidget(self.panel_b)
         
         self.panel_a.remote_highlight_signal.connect(self.panel_b.set_remote_highlight)
@@ -177,11 +228,17 @@ class MainWindow(QMainWindow):
         
         self.panel_a.cell_data_changed.connect(self.on_cell_data_changed)
         self.panel_b.cell_data_changed.connect(self.on_cell_data_changed)
+        self.panel_a.cells_data_changed.connect(self.on_cells_data_changed)
+        self.panel_b.cells_data_changed.connect(self.on_cells_data_changed)
+        self.panel_a.cell_swap_requested.connect(self.swap_cells)
+        self.panel_b.cell_swap_requested.connect(self.swap_cells)
         
         self.panel_c = PanelC(self.timer)
         self.panel_c.white_room_move_requested.connect(self.move_white_room)
+        self.panel_c.white_room_steps_requested.connect(self.move_white_room_steps)
+        self.panel_c.white_room_target_requested.connect(self.move_white_room_to)
         # Подключаем сигнал назначения аудио
-        self.panel_c.synthesizer_tab.audio_assigned.connect(self.on_audio_assigned)
+        self.panel_c.audio_assigned.connect(self.on_audio_assigned)
         
         self.splitter.addWidget(self.panel_c)
         
@@ -191,63 +248,26 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(self.splitter)
         
-        if self.panel_a.orange_tab:
-            self.panel_a.orange_tab.show_image_requested.connect(self.timer.set_orange_level_image)
-            self.panel_a.orange_tab.play_signal_requested.connect(self.play_white_room_signal)
-        if self.panel_b.orange_tab:
-            self.panel_b.orange_tab.show_image_requested.connect(self.timer.set_orange_level_image)
-            self.panel_b.orange_tab.play_signal_requested.connect(self.play_white_room_signal)
-            
-        if self.panel_a.purple_tab:
-            self.panel_a.purple_tab.show_image_requested.connect(self.timer.set_orange_level_image)
-            self.panel_a.purple_tab.play_signal_requested.connect(self.play_white_room_signal)
-        if self.panel_b.purple_tab:
-            self.panel_b.purple_tab.show_image_requested.connect(self.timer.set_orange_level_image)
-            self.panel_b.purple_tab.play_signal_requested.connect(self.play_white_room_signal)
+        # Вкладки уровней создаются лениво, поэтому подключаемся к сигналам панелей
+        for panel in (self.panel_a, self.panel_b):
+            panel.show_image_requested.connect(self.timer.set_orange_level_image)
+            panel.play_signal_requested.connect(self.play_white_room_signal)
 
     def on_audio_assigned(self, file_path, coord_str):
         # Парсим координату (например, "A2" или "X1")
         coord_str = coord_str.strip().upper()
-        if len(coord_str) < 2:
-            QMessageBox.warning(self, "Ошибка", f"Некорректный формат координаты: {coord_str}")
-            return
-            
-        col_char = coord_str[0]
-        row_char = coord_str[1:]
-        
-        try:
-            row_num = int(row_char)
-        except ValueError:
-            QMessageBox.warning(self, "Ошибка", f"Некорректный номер ряда: {row_char}")
-            return
-            
-        c = -1
-        r = -1
-        
-        # Определяем столбец
-        if 'A' <= col_char <= 'G':
-            c = ord(col_char) - ord('A')
-        elif col_char == 'X':
-            c = config.COLS # 7
-        elif col_char == 'Z':
-            c = config.COLS + 1 # 8
-        else:
-            QMessageBox.warning(self, "Ошибка", f"Неизвестный столбец: {col_char}")
+        coord = parse_coord_label(coord_str)
+        if coord is None:
+            QMessageBox.warning(self, "Ошибка", f"Некорректная координата: {coord_str}")
             return
-            
-        # Определяем ряд
-        if c < config.COLS:
-            r = config.ROWS - row_num
-        else:
-            r = 6 - row_num
+        r, c = coord
             
         if (r, c) in self.cell_data:
-            self.cell_data[(r, c)]['custom_sound_path'] = file_path
-            self.is_modified = True
+            self.replace_cells({(r, c): self.cell_data[(r, c)].with_changes({'custom_sound_path': file_path})})
+            self.journal.record_cell((r, c), 'custom_sound_path', file_path)
             
             # Обновляем UI если открыт детальный вид
-            self.panel_a.update_cell_view(r, c)
-            self.panel_b.update_cell_view(r, c)
+            self.update_views_for_coord((r, c))
             
             QMessageBox.information(self, "Успех", f"Аудио назначено на ячейку {coord_str}")
         else:
@@ -298,20 +318,64 @@ class MainWindow(QMainWindow):
 
     def on_cell_data_changed(self, r, c, new_data):
         if (r, c) in self.cell_data:
-            self.cell_data[(r, c)].update(new_data)
-            self.is_modified = True
-        
-        self.panel_a.update_cell_view(r, c)
-        self.panel_b.update_cell_view(r, c)
+            # Текст описания и сигнала приходит посимвольно: такие правки одного поля отменяются одним шагом
+            group = None
+            if len(new_data) == 1:
+                key = next(iter(new_data))
+                if key in ('description_text', 'signal_text'):
+                    group = (r, c, key)
+            self.replace_cells({(r, c): self.cell_data[(r, c)].with_changes(new_data)}, group=group)
+            for key, value in new_data.items():
+                self.journal.record_cell((r, c), key, value)
+        
+        self.update_views_for_coord((r, c))
+        
+        # Белая зала может появиться или исчезнуть только со сменой типа залы
+        if 'room_type' in new_data:
+            self.panel_c.update_white_room_controls(self.has_white_room())
+
+    def on_cells_data_changed(self, coords, changes):
+        """Одна правка для выделенных ячеек: один шаг отмены, каждая ячейка перерисовывается один раз."""
+        coords = [coord for coord in coords if coord in self.cell_data]
+        if not coords:
+            return
+        self.replace_cells({coord: self.cell_data[coord].with_changes(changes) for coord in coords})
+        for coord in coords:
+            for key, value in changes.items():
+                self.journal.record_cell(coord, key, value)
+            self.update_views_for_coord(coord)
+        
+        if 'room_type' in changes:
+            self.panel_c.update_white_room_controls(self.has_white_room())
+
+    def swap_cells(self, r1, c1, r2, c2):
+        first, second = (r1, c1), (r2, c2)
+        if first == second or first not in self.cell_data or second not in self.cell_data:
+            return
+        self.replace_cells({first: self.cell_data[second], second: self.cell_data[first]})
+        self.journal.record_cell_replaced(first, self.cell_data[first])
+        self.journal.record_cell_replaced(second, self.cell_data[second])
         
-        self.panel_c.update_white_room_controls(self.cell_data)
+        self.update_views_for_coord(first)
+        self.update_views_for_coord(second)
+        self.panel_c.update_white_room_controls(self.has_white_room())
 
     def play_sound(self, path):
-        if path and os.path.exists(path):
+        path = campaign_io.resolve_media(path)
+        if path:
             # Используем QMediaPlayer вместо QSoundEffect
+            if self.player is None:
+                self.create_player()
             self.player.setSource(QUrl.fromLocalFile(path))
             self.player.play()
 
+    def create_player(self):
+        from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+        self.player = QMediaPlayer()
+        self.audio_output = QAudioOutput()
+        self.player.setAudioOutput(self.audio_output)
+        self.audio_output.setVolume(1.0)
+
     def confirm_end_sound(self, path):
         reply = QMessageBox.question(
             self, 
@@ -326,108 +390,217 @@ class MainWindow(QMainWindow):
 
     def stop_all_sounds(self):
         # Останавливаем основной плеер звуков
-        self.player.stop()
+        if self.player:
+            self.player.stop()
             
-        music_player = self.panel_c.tabs.widget(2)
-        if hasattr(music_player, 'player'):
+        music_player = self.panel_c.music_player
+        if music_player:
             music_player.player.pause()
-            if hasattr(music_player, 'set_paused_ui'):
-                music_player.set_paused_ui()
-
-    def find_empty_storage_cell(self):
-        for c in [config.COLS, config.COLS + 1]:
-            for r in range(1, config.EXTRA_ROWS_TOP + 1):
-                coord = (r, c)
-                if coord in self.cell_data:
-                    if self.cell_data[coord].get('room_type') == 'Сгенерированная зала':
-                        return coord
-        return None
+            music_player.set_paused_ui()
+
+    def find_white_room(self):
+        """Белая зала на внешнем контуре: (место на контуре, координата) или (-1, None)."""
+        on_contour = [(contour_position(coord), coord) for coord in self.cell_lookup.coords_of_type(WHITE_ROOM)
+                      if contour_position(coord) is not None]
+        return min(on_contour, default=(-1, None))
+
+    def has_white_room(self):
+        return self.find_white_room()[1] is not None
 
     def move_white_room(self, clockwise, with_sound):
-        current_idx = -1
-        current_coord = None
-        
-        for i, coord in enumerate(config.OUTER_CONTOUR_COORDS):
-            if coord in self.cell_data and self.cell_data[coord].get('room_type') == 'Белая зала':
-                current_idx = i
-                current_coord = coord
-                break
-        
-        if current_idx == -1:
+        self.move_white_room_steps(clockwise, 1, with_sound)
+
+    def move_white_room_to(self, clockwise, label, with_sound, show_path=False):
+        """Перемещает белую залу по контуру в заданном направлении до ячейки label ("D7")."""
+        current_idx, current_coord = self.find_white_room()
+        target = parse_coord_label(label)
+        target_idx = contour_position(target) if target else None
+        if current_coord is None or target_idx is None:
+            self.statusBar().showMessage(f"Ячейка {label} не лежит на внешнем контуре", 5000)
             return
-            
-        if clockwise:
-            next_idx = (current_idx + 1) % len(config.OUTER_CONTOUR_COORDS)
-        else:
-            next_idx = (current_idx - 1) % len(config.OUTER_CONTOUR_COORDS)
-            
-        next_coord = config.OUTER_CONTOUR_COORDS[next_idx]
-        
-        native_number = f"{current_idx + 1:04d}"
-        
-        found_native_coord = None
-        data_native = None
-        
-        for coord, data in self.cell_data.items():
-            if str(data.get('number')) == native_number and data.get('room_type') == 'Зала внутреннего контура':
-                found_native_coord = coord
-                break
+        count = len(config.OUTER_CONTOUR_COORDS)
+        steps = (target_idx - current_idx) % count if clockwise else (current_idx - target_idx) % count
+        self.move_white_room_steps(clockwise, steps, with_sound, show_path)
+
+    def move_white_room_steps(self, clockwise, steps, with_sound, show_path=False):
+        """
+        Перемещение белой залы на steps шагов: итоговое состояние считается целиком,
+        применяется одним шагом истории, и каждая затронутая ячейка перерисовывается один раз.
+        """
+        plan = self.plan_white_room_moves(clockwise, steps)
+        if plan is None:
+            return
+        cells, storage, path = plan
         
-        if not found_native_coord and native_number in self.cell_storage:
-            data_native = self.cell_storage.pop(native_number)
+        self.replace_cells(cells, storage)
+        for number, record in storage.items():
+            self.journal.record_storage(number, record)
+        for coord, record in cells.items():
+            self.journal.record_cell_replaced(coord, record)
+            self.update_views_for_coord(coord)
         
-        data_white = self.cell_data[current_coord]
-        data_next = self.cell_data[next_coord]
+        if show_path and len(path) > 1:
+            self.map_scene.show_path(path)
         
-        if found_native_coord:
-            data_native = self.cell_data[found_native_coord]
-            
-            self.cell_data[found_native_coord] = data_next
-            self.cell_data[next_coord] = data_white
-            self.cell_data[current_coord] = data_native
-            
-            self.update_views_for_coord(found_native_coord)
-            
-        elif data_native:
-            self.cell_storage[str(data_next.get('number'))] = data_next
+        if with_sound:
+            sound_path = os.path.join(config.SCRIPT_DIR, "WhiteRoomMove", "Перемещение.wav")
+            self.play_sound(sound_path)
+
+    def plan_white_room_moves(self, clockwise, steps):
+        """
+        Итог steps шагов белой залы по внешнему контуру, данные похода не меняются.
+        Возвращает (ячейки, хранилище, путь по контуру) или None, если белой залы на контуре нет.
+        Каждый шаг - как прежнее одиночное перемещение: белая зала меняется местами с соседней ячейкой,
+        на ее место возвращается родная зала контура (с карты, из хранилища или новая),
+        а вытесненная ячейка уходит в хранилище.
+        """
+        current_idx, current_coord = self.find_white_room()
+        if current_coord is None or steps <= 0:
+            return None
+        
+        # Изменения копятся поверх текущих данных: чтение сначала из них
+        cells = {}
+        storage = {}
+        
+        def cell(coord):
+            return cells[coord] if coord in cells else self.cell_data[coord]
+        
+        def stored(number):
+            return storage[number] if number in storage else self.cell_storage.get(number)
+        
+        def find_native(number):
+            for coord, record in cells.items():
+                if record.get('room_type') == INNER_CONTOUR_ROOM and str(record.get('number')) == number:
+                    return coord
+            for coord in sorted(self.cell_lookup.coords_of_number(number)):
+                if coord not in cells and self.cell_lookup.type_of(coord) == INNER_CONTOUR_ROOM:
+                    return coord
+            return None
+        
+        contour = config.OUTER_CONTOUR_COORDS
+        direction = 1 if clockwise else -1
+        path = [current_coord]
+        
+        for _ in range(steps):
+            next_idx = (current_idx + direction) % len(contour)
+            next_coord = contour[next_idx]
+            native_number = f"{current_idx + 1:04d}"
+            found_native_coord = find_native(native_number)
             
-            self.cell_data[next_coord] = data_white
-            self.cell_data[current_coord] = data_native
+            data_white = cell(current_coord)
+            data_next = cell(next_coord)
             
-        else:
-            new_native_data = {
-                'room_type': 'Зала внутреннего контура',
-                'number': native_number,
-                'name': "",
-                'color': '#666666',
-                'text_color': '#CCCCCC',
-                'text_color_name': '#CCCCCC',
-                'font_size_num': config.BASE_FONT_SIZE_NUMBER,
-                'font_size_name': 12,
-                'font_family_num': config.FONT_FAMILY_REGULAR,
-                'font_weight_num': 'bold',
-                'font_family_name': config.FONT_FAMILY_REGULAR, 
-                'font_weight_name': 'normal',
-                'is_default_name': True, 'is_default_number': True,
-                'font_slant_num': 'roman', 'font_underline_num': False, 'font_overstrike_num': False,
-                'font_slant_name': 'roman', 'font_underline_name': False, 'font_overstrike_name': False,
-                'description_text': '', 'signal_text': '', 'key_action_enabled': False,
-            }
+            if found_native_coord:
+                data_native = cell(found_native_coord)
+                
+                cells[found_native_coord] = data_next
+                cells[next_coord] = data_white
+                cells[current_coord] = data_native
+                
+            elif stored(native_number) is not None:
+                data_native = stored(native_number)
+                storage[native_number] = None
+                storage[str(data_next.get('number'))] = data_next
+                
+                cells[next_coord] = data_white
+                cells[current_coord] = data_native
+                
+            else:
+                new_native_data = CellRecord.from_dict({
+                    'room_type': INNER_CONTOUR_ROOM,
+                    'number': native_number,
+                    'name': "",
+                    'color': '#666666',
+                    'text_color': '#CCCCCC',
+                    'text_color_name': '#CCCCCC',
+                    'font_size_num': config.BASE_FONT_SIZE_NUMBER,
+                    'font_size_name': 12,
+                    'font_family_num': config.FONT_FAMILY_REGULAR,
+                    'font_weight_num': 'bold',
+                    'font_family_name': config.FONT_FAMILY_REGULAR, 
+                    'font_weight_name': 'normal',
+                    'is_default_name': True, 'is_default_number': True,
+                    'font_slant_num': 'roman', 'font_underline_num': False, 'font_overstrike_num': False,
+                    'font_slant_name': 'roman', 'font_underline_name': False, 'font_overstrike_name': False,
+                    'description_text': '', 'signal_text': '', 'key_action_enabled': False,
+                })
+                
+                storage[str(data_next.get('number'))] = data_next
+                
+                cells[next_coord] = data_white
+                cells[current_coord] = new_native_data
             
-            self.cell_storage[str(data_next.get('number'))] = data_next
+            current_idx, current_coord = next_idx, next_coord
+            path.append(current_coord)
+        
+        return cells, storage, path
+
+    def replace_cells(self, cells, storage=None, group=None):
+        """
+        Единственная точка изменения ячеек и хранилища: записи не меняются на месте,
+        новая запись заменяет старую, а старая остается в шаге истории.
+        storage: {номер: запись или None для удаления}.
+        """
+        step_cells = {}
+        for coord, record in cells.items():
+            step_cells[coord] = (self.cell_data.get(coord), record)
+            self.cell_data[coord] = record
+            self.cell_lookup.update(coord, record)
             
-            self.cell_data[next_coord] = data_white
-            self.cell_data[current_coord] = new_native_data
+        step_storage = {}
+        for number, record in (storage or {}).items():
+            step_storage[number] = (self.cell_storage.get(number), record)
+            if record is None:
+                self.cell_storage.pop(number, None)
+            else:
+                self.cell_storage[number] = record
+                
+        self.undo_stack.push(step_cells, step_storage, group)
+        self.is_modified = True
+        self.update_undo_actions()
+
+    def undo(self):
+        state = self.undo_stack.undo()
+        if state:
+            self.restore_cells(*state)
+
+    def redo(self):
+        state = self.undo_stack.redo()
+        if state:
+            self.restore_cells(*state)
+
+    def restore_cells(self, cells, storage):
+        for number, record in storage.items():
+            if record is None:
+                self.cell_storage.pop(number, None)
+            else:
+                self.cell_storage[number] = record
+            self.journal.record_storage(number, record)
             
-        self.update_views_for_coord(current_coord)
-        self.update_views_for_coord(next_coord)
+        for coord, record in cells.items():
+            if record is None:
+                self.cell_data.pop(coord, None)
+            else:
+                self.cell_data[coord] = record
+            self.cell_lookup.update(coord, record)
+            self.journal.record_cell_replaced(coord, record)
+            if record is not None:
+                self.update_views_for_coord(coord)
+                
+        self.panel_c.update_white_room_controls(self.has_white_room())
         self.is_modified = True
-        
-        if with_sound:
-            sound_path = os.path.join(config.SCRIPT_DIR, "WhiteRoomMove", "Перемещение.wav")
-            self.play_sound(sound_path)
+        self.update_undo_actions()
+
+    def update_undo_actions(self):
+        self.undo_action.setEnabled(self.undo_stack.can_undo())
+        self.redo_action.setEnabled(self.undo_stack.can_redo())
+
+    def reset_history(self):
+        self.undo_stack.clear()
+        self.update_undo_actions()
 
     def update_views_for_coord(self, coord):
+        self.map_scene.update_visuals(coord[0], coord[1])
         self.panel_a.update_cell_view(coord[0], coord[1])
         self.panel_b.update_cell_view(coord[0], coord[1])
 
@@ -442,6 +615,13 @@ class MainWindow(QMainWindow):
                 event.ignore()
                 return
 
+        # Дожидаемся фоновой записи, иначе поток будет прерван вместе с программой
+        if not self.wait_for_save():
+            event.ignore()
+            return
+        # Все, что пользователь хотел сохранить, уже в .kontt
+        self.journal.discard()
+
         if self.timer.timer_window:
             self.timer.timer_window.close()
         super().closeEvent(event)
@@ -454,7 +634,15 @@ class MainWindow(QMainWindow):
         
         self.play_sound(path)
 
-    def new_campaign(self):
+    def new_campaign_with_size(self):
+        rows, ok = QInputDialog.getInt(self, "Размер сетки", "Рядов:", config.ROWS, 3, config.MAX_GRID_SIZE)
+        if not ok:
+            return
+        cols, ok = QInputDialog.getInt(self, "Размер сетки", "Столбцов:", config.COLS, 3, config.MAX_GRID_SIZE)
+        if ok:
+            self.new_campaign(rows, cols)
+
+    def new_campaign(self, rows=config.DEFAULT_ROWS, cols=config.DEFAULT_COLS):
         if self.is_modified:
             reply = QMessageBox.question(self, "Сохранить изменения?", 
                                          "Хотите сохранить текущий поход перед созданием нового?",
@@ -464,23 +652,33 @@ class MainWindow(QMainWindow):
             elif reply == QMessageBox.StandardButton.Cancel:
                 return
 
+        if not self.wait_for_save():
+            return
+        self.journal.discard()
+        self.journal.reset(journal_path(None))
+
         self.current_file_path = None
         self.is_modified = False
+        self.set_media_store(None)
         self.campaign_title_ref[0] = config.DEFAULT_TITLE
-        self.panel_a.map_view.title_item.update_text()
-        self.panel_b.map_view.title_item.update_text()
+        self.map_scene.title_item.update_text()
         
         self.cell_data.clear()
         self.cell_storage.clear()
+        set_grid_size(rows, cols)
         self.cell_layout = get_cell_layout()
         for r, c in self.cell_layout.keys():
             set_cell_default(r, c, self.cell_data)
-            self.update_views_for_coord((r, c))
+        self.cell_lookup.rebuild(self.cell_data)
+        self.map_scene.set_cell_data(self.cell_data)
+        self.panel_a.refresh_detailed_view()
+        self.panel_b.refresh_detailed_view()
             
         self.panel_a.set_data({})
         self.panel_b.set_data({})
         
-        self.panel_c.update_white_room_controls(self.cell_data)
+        self.panel_c.update_white_room_controls(self.has_white_room())
+        self.reset_history()
 
     def open_campaign(self):
         if self.is_modified:
@@ -496,18 +694,25 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
 
+        self.load_campaign_file(file_path)
+
+    def load_campaign_file(self, file_path):
         try:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                with zip_ref.open('data.json') as f:
-                    data = json.load(f)
-                
-                # Load audio files if any (not implemented fully yet as we need to know where to put them)
-                # For now we just load data
+            data = read_campaign(file_path)
+            if not self.wait_for_save():
+                return
+            self.journal.discard()
+            
+            # Медиафайлы не извлекаются при открытии, только при первом воспроизведении
+            self.set_media_store(MediaStore(file_path, data.get('media', {})))
                 
             self.current_file_path = file_path
             self.load_data(data)
             self.is_modified = False
             
+            self.journal.reset(journal_path(file_path))
+            self.replay_journal()
+            
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл: {e}")
 
@@ -526,62 +731,169 @@ class MainWindow(QMainWindow):
             self.current_file_path = file_path
 
     def save_to_file(self, file_path):
-        data = self.collect_data()
-        
-        try:
-            with zipfile.ZipFile(file_path, 'w') as zip_ref:
-                zip_ref.writestr('data.json', json.dumps(data, indent=4))
-                
-                # Save audio files referenced in cell data
-                # We need to find all audio files and add them to zip
-                # For simplicity, we just save paths in json for now, 
-                # but user asked to save actual files.
-                # This requires parsing data and finding paths.
-                
-            self.is_modified = False
-            QMessageBox.information(self, "Успех", "Поход успешно сохранен!")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {e}")
+        # Пока идет запись, повторное сохранение ставим в очередь, а не блокируем интерфейс
+        if self.save_worker:
+            self.pending_save_path = file_path
+            self.statusBar().showMessage("Сохранение... (следующее сохранение в очереди)")
+            return
+
+        # Снимок берется в GUI-потоке, сериализация и запись - в фоновом
+        data = snapshot_data(self.collect_data())
+        self.is_modified = False
+        self.set_saving_state(True)
+        
+        # Аудио и изображения, на которые ссылается поход, упаковываются в архив воркером
+        self.save_worker = SaveWorker(file_path, data, self.media_store)
+        self.save_worker.journal_seq = self.journal.seq
+        self.save_worker.saved.connect(self.on_save_finished)
+        self.save_worker.error.connect(self.on_save_error)
+        self.save_worker.start()
+
+    def set_saving_state(self, saving):
+        title = config.DEFAULT_TITLE
+        if saving:
+            title += " — сохранение..."
+            self.statusBar().showMessage("Сохранение похода...")
+        self.setWindowTitle(title)
+
+    def on_save_finished(self, file_path):
+        # Сохранение могло быть уже обработано в wait_for_save
+        worker = self.sender()
+        if worker is None or worker is not self.save_worker:
+            return
+        self.complete_save(worker)
+        self.statusBar().showMessage(f"Поход сохранен: {os.path.basename(file_path)}", 5000)
+        self.run_pending_save()
+
+    def on_save_error(self, error_msg):
+        worker = self.sender()
+        if worker is None or worker is not self.save_worker:
+            return
+        self.complete_save(worker)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {error_msg}")
+        self.run_pending_save()
+
+    def complete_save(self, worker):
+        # Сигнал приходит до выхода из run(): поток дожидается, прежде чем запускать сохранение из очереди
+        worker.wait()
+        self.save_worker = None
+        self.set_saving_state(False)
+        if worker.error_message:
+            self.is_modified = True
+        else:
+            self.set_media_store(MediaStore(worker.file_path, worker.media_manifest))
+            # Правки, вошедшие в снимок, больше не нужны в журнале
+            self.journal.compact(worker.journal_seq, worker.file_path)
+
+    def run_pending_save(self):
+        if self.pending_save_path:
+            file_path = self.pending_save_path
+            self.pending_save_path = None
+            self.save_to_file(file_path)
+
+    def set_media_store(self, store):
+        self.media_store = store
+        campaign_io.active_store = store
+
+    def wait_for_save(self):
+        """Синхронно дожидается всех сохранений (используется при выходе). Возвращает False при ошибке."""
+        while self.save_worker:
+            worker = self.save_worker
+            worker.wait()
+            self.complete_save(worker)
+            if worker.error_message:
+                self.pending_save_path = None
+                QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {worker.error_message}")
+                return False
+            self.run_pending_save()
+        return True
+
+    def compact_journal(self):
+        """Сворачивает разросшийся журнал в файл похода."""
+        if self.current_file_path and not self.save_worker:
+            self.save_to_file(self.current_file_path)
+
+    def replay_journal(self):
+        touched = self.journal.replay(self.cell_data, self.cell_storage)
+        if touched is None:
+            return
+        for coord in touched:
+            # Журнал меняет ячейки в обход replace_cells
+            self.cell_lookup.update(coord, self.cell_data.get(coord))
+            if coord in self.cell_data:
+                self.update_views_for_coord(coord)
+        self.panel_c.update_white_room_controls(self.has_white_room())
+        self.is_modified = True
+        self.statusBar().showMessage("Восстановлены несохраненные правки из журнала", 5000)
 
     def collect_data(self):
-        # Convert tuple keys to string for JSON
-        cell_data_str_keys = {f"{k[0]},{k[1]}": v for k, v in self.cell_data.items()}
+        # Convert tuple keys to string for JSON; cells are stored as deltas from their room template
+        cell_data_str_keys = {f"{k[0]},{k[1]}": encode_cell(v) for k, v in self.cell_data.items()}
         
         data = {
             'campaign_title': self.campaign_title_ref[0],
+            'grid_size': [config.ROWS, config.COLS],
             'cell_data': cell_data_str_keys,
-            'cell_storage': self.cell_storage,
+            'cell_storage': {number: encode_cell(v) for number, v in self.cell_storage.items()},
             'panel_a_data': self.panel_a.get_data(),
-            'panel_b_data': self.panel_b.get_data()
+            'panel_b_data': self.panel_b.get_data(),
+            'panel_c_data': self.panel_c.get_data()
         }
         return data
 
     def load_data(self, data):
         self.campaign_title_ref[0] = data.get('campaign_title', config.DEFAULT_TITLE)
-        self.panel_a.map_view.title_item.update_text()
-        self.panel_b.map_view.title_item.update_text()
+        self.map_scene.title_item.update_text()
         
         cell_data_raw = data.get('cell_data', {})
+        old_cell_data = self.cell_data
         self.cell_data = {}
         for k, v in cell_data_raw.items():
             r, c = map(int, k.split(','))
-            self.cell_data[(r, c)] = v
+            cell = decode_cell(v)
+            # Неизменившаяся ячейка остается прежней записью: ее кэш отрисовки остается в силе
+            old = old_cell_data.get((r, c))
+            self.cell_data[(r, c)] = old if old is not None and old.same_content(cell) else cell
             
-        self.cell_storage = data.get('cell_storage', {})
+        self.cell_storage = {number: decode_cell(v) for number, v in data.get('cell_storage', {}).items()}
+        
+        # Старые походы без размера сетки - 7x7
+        set_grid_size(*data.get('grid_size', (config.DEFAULT_ROWS, config.DEFAULT_COLS)))
+        self.cell_layout = get_cell_layout()
+        for r, c in self.cell_layout.keys():
+            set_cell_default(r, c, self.cell_data)
+        self.cell_lookup.rebuild(self.cell_data)
         
         # Update map views
-        self.panel_a.map_view.cell_data = self.cell_data
-        self.panel_b.map_view.cell_data = self.cell_data
-        self.panel_a.map_view._create_grid() # Recreate items
-        self.panel_b.map_view._create_grid()
+        self.map_scene.set_cell_data(self.cell_data)
+        self.panel_a.refresh_detailed_view()
+        self.panel_b.refresh_detailed_view()
         
         self.panel_a.set_data(data.get('panel_a_data', {}))
         self.panel_b.set_data(data.get('panel_b_data', {}))
+        self.panel_c.set_data(data.get('panel_c_data', {}))
         
-        self.panel_c.update_white_room_controls(self.cell_data)
+        self.panel_c.update_white_room_controls(self.has_white_room())
+        self.reset_history()
+
+class FirstPaintTracer(QObject):
+    """Ловит первую отрисовку окна и печатает этапы запуска (флаг --startup-profile)."""
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            QApplication.instance().removeEventFilter(self)
+            # Отметка ставится после того, как проход отрисовки завершится
+            QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        startup_trace.mark("первая отрисовка")
+        print(startup_trace.report(), flush=True)
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    startup_trace.mark("QApplication")
     
     app.setStyleSheet("""
         QMenu {
@@ -602,5 +914,9 @@ if __name__ == '__main__':
     """)
 
     window = MainWindow()
+    startup_trace.mark("MainWindow")
+    if startup_trace.enabled():
+        paint_tracer = FirstPaintTracer()
+        app.installEventFilter(paint_tracer)
     window.showMaximized()
     sys.exit(app.exec())
@@ -1,83 +1,115 @@
-from config import (
-    ROWS, COLS, EXTRA_COLS, EXTRA_ROWS_TOP, DEFAULT_COLOR,
-    FONT_FAMILY_REGULAR, BASE_FONT_SIZE_NUMBER,
-    CELL_SIZE, CELL_SPACING
-)
+import math
+import re
+import config
+from config import EXTRA_COLS, EXTRA_ROWS_TOP, CELL_SIZE, CELL_SPACING
+from cell_model import (CellRecord, get_cell_template, INNER_CONTOUR_ROOM, GENERATED_ROOM,
+                        WHITE_ROOM, TRANSPORT_ROOM)
+
+# Размер сетки (config.ROWS x config.COLS) задается походом, поэтому читается из config при каждом вызове
+
+def get_outer_contour_coords(rows, cols):
+    """Ячейки внешнего контура по часовой стрелке, начиная с левой верхней (A1)."""
+    top, right = rows - 1, cols - 1
+    coords = [(top, c) for c in range(cols)]
+    coords += [(r, right) for r in range(top - 1, -1, -1)]
+    if top > 0:
+        coords += [(0, c) for c in range(right - 1, -1, -1)]
+    if right > 0:
+        coords += [(r, 0) for r in range(1, top)]
+    return coords
+
+# Координата -> место на внешнем контуре (индекс в config.OUTER_CONTOUR_COORDS)
+_contour_positions = {coord: i for i, coord in enumerate(config.OUTER_CONTOUR_COORDS)}
+
+def set_grid_size(rows, cols):
+    """Меняет размер основной сетки. Список внешнего контура обновляется на месте: его импортируют напрямую."""
+    config.ROWS = rows
+    config.COLS = cols
+    config.OUTER_CONTOUR_COORDS[:] = get_outer_contour_coords(rows, cols)
+    _contour_positions.clear()
+    _contour_positions.update((coord, i) for i, coord in enumerate(config.OUTER_CONTOUR_COORDS))
+
+def contour_position(coord):
+    """Место ячейки на внешнем контуре (0 - A1, дальше по часовой стрелке) или None."""
+    return _contour_positions.get(coord)
+
+# Буквы столбцов основной сетки: X и Z заняты дополнительными столбцами
+MAIN_COLUMN_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWY"
+
+def column_label(c):
+    """Буквы столбца: A..Y без X, затем AA, AB... Дополнительные столбцы - X и Z."""
+    if c == config.COLS:
+        return "X"
+    if c == config.COLS + 1:
+        return "Z"
+    base = len(MAIN_COLUMN_LETTERS)
+    label = ""
+    c += 1
+    while c > 0:
+        c, rest = divmod(c - 1, base)
+        label = MAIN_COLUMN_LETTERS[rest] + label
+    return label
+
+def coord_label(r, c):
+    """Координата ячейки в виде "A1" (ряды основной сетки считаются сверху, X/Z - от 6 вниз)."""
+    row_num = config.ROWS - r if c < config.COLS else 6 - r
+    return f"{column_label(c)}{row_num}"
+
+def parse_coord_label(text):
+    """Обратное к coord_label: "A2" -> (r, c). Возвращает None, если такой ячейки на карте нет."""
+    match = re.fullmatch(r"([A-Z]+)(\d+)", text.strip().upper())
+    if not match:
+        return None
+    letters, row_num = match.group(1), int(match.group(2))
+    if letters in ("X", "Z"):
+        r = 6 - row_num
+        if not 0 <= r <= EXTRA_ROWS_TOP:
+            return None
+        return r, config.COLS + (letters == "Z")
+    c = 0
+    for char in letters:
+        digit = MAIN_COLUMN_LETTERS.find(char)
+        if digit < 0:
+            return None
+        c = c * len(MAIN_COLUMN_LETTERS) + digit + 1
+    c -= 1
+    if c >= config.COLS or not 1 <= row_num <= config.ROWS:
+        return None
+    return config.ROWS - row_num, c
 
 def set_cell_default(r, c, cell_data):
     """Устанавливает начальные значения для ячейки."""
     if (r, c) not in cell_data:
-        is_outer_main_grid = (r in [0, 6] or c in [0, 6]) and (0 <= r < ROWS and 0 <= c < COLS)
-        default_name = "Введите имя залы"
-        default_number = "0000"
-        default_color = DEFAULT_COLOR
-        default_text_color = '#CCCCCC'
-        default_text_color_name = '#CCCCCC'
+        rows, cols = config.ROWS, config.COLS
+        is_outer_main_grid = (r in [0, rows - 1] or c in [0, cols - 1]) and (0 <= r < rows and 0 <= c < cols)
+        room_type = None
+        delta = {}
 
         if is_outer_main_grid:
-            default_name = ""
-            # Логика нумерации для внешнего контура (примерная)
-            if r == 6: num = c + 1
-            elif c == 6: num = 7 + (6 - r)
-            elif r == 0: num = 13 + (6 - c)
-            else: num = 19 + r
-            default_number = f"{num:04d}"
-
-        cell_data[(r, c)] = {
-            'color': default_color, 'name': default_name, 'number': default_number,
-            'text_color': default_text_color, 'text_color_name': default_text_color_name,
-            'font_size_num': BASE_FONT_SIZE_NUMBER,
-            'font_size_name': 12,
-            'font_family_num': FONT_FAMILY_REGULAR,
-            'font_weight_num': 'bold',
-            'font_family_name': FONT_FAMILY_REGULAR, 'font_weight_name': 'normal',
-            'is_default_name': True, 'is_default_number': True,
-            'font_slant_num': 'roman', 'font_underline_num': False, 'font_overstrike_num': False,
-            'font_slant_name': 'roman', 'font_underline_name': False, 'font_overstrike_name': False,
-            'description_text': '', 'signal_text': '', 'key_action_enabled': False,
-        }
-        
-        if is_outer_main_grid:
-            cell_data[(r, c)]['room_type'] = 'Зала внутреннего контура'
-            cell_data[(r, c)]['color'] = '#666666'
-            cell_data[(r, c)]['text_color'] = '#CCCCCC'
-            cell_data[(r, c)]['text_color_name'] = '#CCCCCC'
-            cell_data[(r, c)]['name'] = ""
-            cell_data[(r, c)]['is_default_name'] = True
-            cell_data[(r, c)]['description_text'] = "В зале находится таймер на 20 мин и экран, транслирующий вид на какой-то город. Нет никакого испытания, можно кратко описать, чем занимаются персонажи."
-            cell_data[(r, c)]['signal_text'] = "Досточтимые рыцари! Вы находитесь в зале внутреннего контура. Двери залы откроются через 20 минут."
-            
-        elif c >= COLS: # X and Z columns
-             cell_data[(r, c)]['room_type'] = 'Сгенерированная зала'
-             # Special cases for bottom cells
-             if r == 0: # Bottom cells
-                 if c == COLS: # X bottom
-                     cell_data[(r, c)]['room_type'] = 'Белая зала'
-                     cell_data[(r, c)]['color'] = '#FFFFFF'
-                     cell_data[(r, c)]['text_color'] = '#000000'
-                     cell_data[(r, c)]['text_color_name'] = '#000000'
-                     cell_data[(r, c)]['number'] = "1001"
-                     cell_data[(r, c)]['name'] = "Точка нужной координаты"
-                     cell_data[(r, c)]['font_weight_name'] = 'normal' # Changed to normal
-                     cell_data[(r, c)]['description_text'] = "Играет торжественная музыка. В центре залы находится консоль, в которую можно ввести требуемое для исполнения желание. В комнате стоят конструкторы, они смотрят на героев, что-то делают."
-                     cell_data[(r, c)]['signal_text'] = "Досточтимые рыцари! Ваш поход завершен. Вы находитесь в белой зале конструктора под номером 1001. Для окончания похода просканируйте вашу эмблему, введите желание, требуемое для исполнения, а затем нажмите кнопку ввода."
-                 elif c == COLS + 1: # Z bottom
-                     cell_data[(r, c)]['room_type'] = 'Транспортная зала'
-                     cell_data[(r, c)]['color'] = '#ffc000'
-                     cell_data[(r, c)]['text_color'] = '#000000'
-                     cell_data[(r, c)]['text_color_name'] = '#000000'
-                     cell_data[(r, c)]['number'] = "2761"
-                     cell_data[(r, c)]['name'] = "Переход вертикального уровня"
-                     cell_data[(r, c)]['font_weight_name'] = 'normal' # Changed to normal
-                     cell_data[(r, c)]['description_text'] = "Двери залы открыты. В центре залы стоит кабина лифта, напоминающего лифт из дорого отеля начала 21-го века.\nС помощью лифта можно переместиться на Оранжевый или Фиолетовый уровень конструктора"
-                     cell_data[(r, c)]['signal_text'] = "Досточтимые рыцари! Вы находитесь в транспортной зале Конструктора. Двери залы открыты. Вы можете использовать залу для перемещения между уровнями Конструктора."
+            room_type = INNER_CONTOUR_ROOM
+            # Нумерация по внешнему контуру по часовой стрелке от A1
+            num = contour_position((r, c)) + 1
+            delta['number'] = f"{num:04d}"
+
+        elif c >= cols: # X and Z columns
+            room_type = GENERATED_ROOM
+            # Special cases for bottom cells
+            if r == 0: # Bottom cells
+                if c == cols: # X bottom
+                    room_type = WHITE_ROOM
+                elif c == cols + 1: # Z bottom
+                    room_type = TRANSPORT_ROOM
+
+        # Значения по умолчанию берутся из шаблона типа залы (см. cell_model.CELL_TEMPLATES)
+        cell_data[(r, c)] = CellRecord(get_cell_template(room_type), delta)
 
 def get_cell_layout():
     """Возвращает словарь с координатами и размерами всех ячеек."""
     layout = {}
+    ROWS, COLS = config.ROWS, config.COLS
     
-    # Main Grid (7x7)
-    # r=0 is bottom, r=6 is top
+    # Main Grid (7x7 по умолчанию)
+    # r=0 is bottom, r=ROWS-1 is top
     for r in range(ROWS):
         for c in range(COLS):
             x = c * (CELL_SIZE + CELL_SPACING)
@@ -108,3 +140,64 @@ def get_cell_layout():
             layout[(r, c)] = (x, y, CELL_SIZE, CELL_SIZE)
 
     return layout
+
+
+class CellIndex:
+    """
+    Пространственный индекс ячеек в координатах сцены (ось Y вниз, как в get_cell_layout после переворота).
+    Сцена разбита на квадраты размером с шаг сетки; поиск точки или прямоугольника
+    смотрит только в свои квадраты, а не перебирает все ячейки.
+    """
+    def __init__(self, layout):
+        self.step = CELL_SIZE + CELL_SPACING
+        self.rects = {}    # координата -> (x, y, w, h) в сцене
+        self.buckets = {}  # (i, j) -> [координаты]
+        self._bounds = (0, 0, 0, 0)
+        if not layout:
+            return
+        max_y = max(y + h for _, y, _, h in layout.values())
+        for coord, (x, y, w, h) in layout.items():
+            rect = (x, max_y - (y + h), w, h)
+            self.rects[coord] = rect
+            for key in self._bucket_keys(*rect):
+                self.buckets.setdefault(key, []).append(coord)
+
+        left = min(x for x, _, _, _ in self.rects.values())
+        top = min(y for _, y, _, _ in self.rects.values())
+        right = max(x + w for x, _, w, _ in self.rects.values())
+        bottom = max(y + h for _, y, _, h in self.rects.values())
+        self._bounds = (left, top, right - left, bottom - top)
+
+    def _bucket_keys(self, x, y, w, h):
+        for i in range(math.floor(x / self.step), math.floor((x + w) / self.step) + 1):
+            for j in range(math.floor(y / self.step), math.floor((y + h) / self.step) + 1):
+                yield i, j
+
+    def cell_at(self, x, y):
+        """Ячейка под точкой сцены или None (промежутки между ячейками - тоже None)."""
+        for coord in self.buckets.get((math.floor(x / self.step), math.floor(y / self.step)), ()):
+            rx, ry, rw, rh = self.rects[coord]
+            if rx <= x < rx + rw and ry <= y < ry + rh:
+                return coord
+        return None
+
+    def cells_in(self, x, y, w, h):
+        """Ячейки, пересекающие прямоугольник сцены."""
+        found = set()
+        # Квадраты за пределами сетки пусты: прямоугольник отдаленного вида обрезается по ней
+        left, top, width, height = self._bounds
+        right, bottom = min(x + w, left + width), min(y + h, top + height)
+        x, y = max(x, left), max(y, top)
+        w, h = right - x, bottom - y
+        if w < 0 or h < 0:
+            return found
+        for key in self._bucket_keys(x, y, w, h):
+            for coord in self.buckets.get(key, ()):
+                rx, ry, rw, rh = self.rects[coord]
+                if rx < x + w and x < rx + rw and ry < y + h and y < ry + rh:
+                    found.add(coord)
+        return found
+
+    def bounds(self):
+        """(x, y, w, h), охватывающий все ячейки."""
+        return self._bounds
@@ -0,0 +1,60 @@
+"""
+Замер этапов запуска: импорты, загрузка шрифтов, сборка панелей, первая отрисовка окна.
+
+    python main.py --startup-profile
+"""
+import sys
+import time
+
+# Флаг командной строки, по которому сводка печатается после первой отрисовки
+FLAG = '--startup-profile'
+
+_start = time.perf_counter()
+_last = _start
+phases = []  # [(название, мс, вложенный этап)]
+
+
+def enabled():
+    return FLAG in sys.argv
+
+
+def mark(name):
+    """Закрывает этап: время с предыдущей отметки записывается под именем name."""
+    global _last
+    now = time.perf_counter()
+    if enabled():
+        phases.append((name, (now - _last) * 1000, False))
+    _last = now
+
+
+class phase:
+    """
+    Этап внутри другого (with startup_trace.phase("...")): в общий отсчет не вмешивается,
+    в сводке печатается с отступом под этапом, который его содержит.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if enabled():
+            phases.append((self.name, (time.perf_counter() - self.started) * 1000, True))
+
+
+def report():
+    total = (time.perf_counter() - _start) * 1000
+    lines = ["Этапы запуска:"]
+    # Вложенные этапы записываются раньше этапа, который их содержит
+    pending = []
+    for name, ms, nested in phases:
+        if nested:
+            pending.append(f"      {name:<24} {ms:8.1f} мс")
+        else:
+            lines.append(f"  {name:<28} {ms:8.1f} мс")
+            lines += pending
+            pending = []
+    lines.append(f"  {'всего':<28} {total:8.1f} мс")
+    return "\n".join(lines)
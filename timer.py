@@ -1,120 +1,318 @@
-from PyQt6.QtCore import QTimer, QObject, pyqtSignal, Qt, QRectF, QSize, QUrl, QRect
+from PyQt6.QtCore import QTimer, QObject, pyqtSignal, Qt, QRectF, QSize, QUrl, QRect, QEvent
 from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QStackedLayout, QSizePolicy
-from PyQt6.QtGui import QFont, QColor, QPainter, QBrush, QPen, QPainterPath, QMovie, QPixmap, QIcon
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QVideoSink
+from PyQt6.QtGui import QFont, QColor, QPainter, QBrush, QPen, QMovie, QPixmap, QIcon, QFontMetrics
 from config import FONT_FAMILY_REGULAR, FONT_FAMILY_BOLD, SCRIPT_DIR, ORANGE_LVL_DIR
 import os
+import math
+import time
+from collections import OrderedDict
 import config
+from campaign_io import resolve_media
+
+RED_SHIFT_BUCKETS = 64 # Steps of the red shift for the cached progress bar blocks
+GREY_BLOCK_COLOR = QColor("#333333")
+
+
+def red_shift(color, red_ratio):
+    """Blends a color towards red (0.0 - unchanged, 1.0 - pure red)."""
+    color = QColor(color)
+    if red_ratio <= 0:
+        return color
+    r = color.red() + (255 - color.red()) * red_ratio
+    g = color.green() * (1 - red_ratio)
+    b = color.blue() * (1 - red_ratio)
+    return QColor(int(r), int(g), int(b))
+
 
 class ProgressBarWidget(QWidget):
+    """
+    Five hour blocks: elapsed ones grey, remaining ones white shifting to red. Whole blocks are
+    pre-rendered per size, red-shift step and border; a tick composes only the partial block and
+    repaints nothing when its rounded pixel fill has not changed.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.total_hours = 5
         self.current_seconds = 5 * 3600
         self.setFixedHeight(20) 
         self.border_color = None # None means no border
-        self.red_effect_ratio = 0.0 # 0.0 to 1.0, how much red to blend in
+        self.red_bucket = 0 # Red shift step, 0..RED_SHIFT_BUCKETS
+        self.remaining_color = QColor("white")
+        self.block_pixmaps = {}
 
     def update_progress(self, seconds, red_ratio=0.0):
+        red_bucket = round(min(max(red_ratio, 0.0), 1.0) * RED_SHIFT_BUCKETS)
+        old_fill = self.fill_pixels(self.current_seconds)
         self.current_seconds = seconds
-        self.red_effect_ratio = red_ratio
-        self.update()
+        if red_bucket != self.red_bucket:
+            # The blend is computed once per step, not on every paint
+            self.red_bucket = red_bucket
+            self.remaining_color = red_shift(QColor("white"), red_bucket / RED_SHIFT_BUCKETS)
+            self.update()
+            return
+        new_fill = self.fill_pixels(seconds)
+        if new_fill != old_fill:
+            for block, _ in {old_fill, new_fill}:
+                if block < self.total_hours:
+                    self.update(self.block_rect(block).toAlignedRect().adjusted(-1, -1, 1, 1))
 
     def set_border_color(self, color):
         self.border_color = color
         self.update()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        width = self.width()
-        height = self.height()
-        
+    def block_width(self):
         spacing = 10
-        block_width = (width - (self.total_hours - 1) * spacing) / self.total_hours
-        
+        return (self.width() - (self.total_hours - 1) * spacing) / self.total_hours
+
+    def block_rect(self, i):
+        block_width = self.block_width()
+        return QRectF(i * (block_width + 10), 0, block_width, self.height())
+
+    def fill_pixels(self, seconds):
+        """(block with the boundary, elapsed pixels inside it) - what the bar actually shows."""
         total_duration = self.total_hours * 3600
-        
-        time_passed = total_duration - self.current_seconds
-        if time_passed < 0: time_passed = 0
-        if time_passed > total_duration: time_passed = total_duration
-        
-        radius = height / 2
-        
-        # Calculate colors based on red effect
-        white_color = QColor("white")
-        grey_color = QColor("#333333")
-        
-        if self.red_effect_ratio > 0:
-            # Blend white towards red
-            r = white_color.red() + (255 - white_color.red()) * self.red_effect_ratio # Stay 255
-            g = white_color.green() * (1 - self.red_effect_ratio)
-            b = white_color.blue() * (1 - self.red_effect_ratio)
-            white_color = QColor(int(r), int(g), int(b))
-        
-        for i in range(self.total_hours):
-            x = i * (block_width + spacing)
-            rect = QRectF(x, 0, block_width, height)
-            
-            hour_start = i * 3600
-            hour_end = (i + 1) * 3600
-            
-            fill_ratio = 0.0
-            if time_passed > hour_start:
-                if time_passed >= hour_end:
-                    fill_ratio = 1.0
-                else:
-                    fill_ratio = (time_passed - hour_start) / 3600
-            
-            # Draw border if set
+        time_passed = min(max(total_duration - seconds, 0), total_duration)
+        block, rest = divmod(time_passed, 3600)
+        return block, round(self.block_width() * rest / 3600)
+
+    def block_pixmap(self, color, size):
+        ratio = self.devicePixelRatioF()
+        key = (color.rgb(), size.width(), size.height(), self.border_color, ratio)
+        pixmap = self.block_pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(math.ceil(size.width() * ratio), math.ceil(size.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
             if self.border_color:
                 painter.setPen(QPen(QColor(self.border_color), 2))
             else:
                 painter.setPen(Qt.PenStyle.NoPen)
-            
-            if fill_ratio == 0.0:
-                # Fully remaining (white/red)
-                painter.setBrush(QBrush(white_color))
-                painter.drawRoundedRect(rect, radius, radius)
-            elif fill_ratio == 1.0:
-                # Fully passed (grey)
-                painter.setBrush(QBrush(grey_color))
-                painter.drawRoundedRect(rect, radius, radius)
+            painter.setBrush(QBrush(color))
+            radius = size.height() / 2
+            painter.drawRoundedRect(QRectF(0, 0, size.width(), size.height()), radius, radius)
+            painter.end()
+            self.block_pixmaps[key] = pixmap
+        return pixmap
+
+    def resizeEvent(self, event):
+        # Blocks of the old size are not needed anymore
+        self.block_pixmaps.clear()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        full_block, fill_px = self.fill_pixels(self.current_seconds)
+        block_size = self.block_rect(0).size()
+        elapsed = self.block_pixmap(GREY_BLOCK_COLOR, block_size)
+        remaining = self.block_pixmap(self.remaining_color, block_size)
+        
+        for i in range(self.total_hours):
+            rect = self.block_rect(i)
+            if not rect.intersects(QRectF(event.rect())):
+                continue
+            if i < full_block:
+                painter.drawPixmap(rect.topLeft(), elapsed)
+            elif i > full_block or fill_px == 0:
+                painter.drawPixmap(rect.topLeft(), remaining)
             else:
-                # Partially filled
-                split_x = rect.x() + rect.width() * fill_ratio
-                
-                # Draw grey part (left)
-                path_grey = QPainterPath()
-                path_grey.moveTo(split_x, 0)
-                path_grey.lineTo(rect.x() + radius, 0)
-                path_grey.arcTo(rect.x(), 0, radius * 2, radius * 2, 90, 90)
-                path_grey.lineTo(rect.x(), rect.height() - radius)
-                path_grey.arcTo(rect.x(), rect.y(), radius * 2, radius * 2, 180, 90)
-                path_grey.lineTo(split_x, rect.height())
-                path_grey.closeSubpath()
-                
-                painter.setBrush(QBrush(grey_color))
-                painter.drawPath(path_grey)
-                
-                # Draw white/red part (right)
-                path_white = QPainterPath()
-                path_white.moveTo(split_x, 0)
-                path_white.lineTo(rect.right() - radius, 0)
-                path_white.arcTo(rect.right() - radius * 2, 0, radius * 2, radius * 2, 90, -90)
-                path_white.lineTo(rect.right(), rect.height() - radius)
-                path_white.arcTo(rect.right() - radius * 2, rect.y(), radius * 2, radius * 2, 0, -90)
-                path_white.lineTo(split_x, rect.height())
-                path_white.closeSubpath()
-                
-                painter.setBrush(QBrush(white_color))
-                painter.drawPath(path_white)
-                
-                # Redraw border on top if needed
-                if self.border_color:
-                     painter.setBrush(Qt.BrushStyle.NoBrush)
-                     painter.drawRoundedRect(rect, radius, radius)
+                # Partial block: grey on the left of the boundary, white/red on the right
+                split_x = rect.x() + fill_px
+                painter.save()
+                painter.setClipRect(QRectF(rect.x(), 0, fill_px, rect.height()))
+                painter.drawPixmap(rect.topLeft(), elapsed)
+                painter.setClipRect(QRectF(split_x, 0, rect.right() - split_x, rect.height()))
+                painter.drawPixmap(rect.topLeft(), remaining)
+                painter.restore()
+
+class TimerTextWidget(QWidget):
+    """
+    Centered single-line text of the timer window. Color and visibility are plain properties:
+    changing them repaints only the text rectangle instead of re-polishing a stylesheet.
+    """
+    def __init__(self, text="", font=None, parent=None):
+        super().__init__(parent)
+        self._text = text
+        self._color = QColor("white")
+        self._text_visible = True
+        self._hint = QSize()
+        if font is not None:
+            self.setFont(font)
+        self.refresh_geometry()
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        if text == self._text:
+            return
+        old_rect = self.text_rect()
+        self._text = text
+        self.refresh_geometry()
+        self.update(old_rect.united(self.text_rect()))
+
+    def set_color(self, color):
+        color = QColor(color)
+        if color != self._color:
+            self._color = color
+            self.update(self.text_rect())
+
+    def set_text_visible(self, visible):
+        # Hidden text keeps its place in the layout (blinking must not shift anything)
+        if visible != self._text_visible:
+            self._text_visible = visible
+            self.update(self.text_rect())
+
+    def compute_size_hint(self):
+        # Digits are measured by the widest one: the countdown does not change the layout every second
+        metrics = QFontMetrics(self.font())
+        widest = max("0123456789", key=metrics.horizontalAdvance)
+        sample = "".join(widest if ch.isdigit() else ch for ch in self._text)
+        return QSize(metrics.horizontalAdvance(sample), metrics.height())
+
+    def refresh_geometry(self):
+        hint = self.compute_size_hint()
+        if hint != self._hint:
+            self._hint = hint
+            self.updateGeometry()
+
+    def sizeHint(self):
+        return self._hint
+
+    def minimumSizeHint(self):
+        return self._hint
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.FontChange:
+            self.refresh_geometry()
+            self.update()
+        super().changeEvent(event)
+
+    def text_rect(self):
+        metrics = QFontMetrics(self.font())
+        width = metrics.horizontalAdvance(self._text)
+        height = metrics.height()
+        return QRect((self.width() - width) // 2 - 2, (self.height() - height) // 2, width + 4, height)
+
+    def paintEvent(self, event):
+        if not self._text_visible or not self._text:
+            return
+        painter = QPainter(self)
+        painter.setFont(self.font())
+        painter.setPen(self._color)
+        painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self._text)
+
+
+class CountdownTextWidget(TimerTextWidget):
+    """
+    Big "HH:MM:SS" countdown drawn from a glyph atlas: the digits and the colon are rendered once per
+    (font, color bucket, pixel ratio), every character has a fixed cell, and a tick repaints only
+    the cells whose character changed.
+    """
+    ATLAS_LIMIT = 4 # Atlases kept at once (the red shift walks through color buckets one way)
+    COLOR_STEP = 16 # Color channels are bucketed so the red shift does not re-render glyphs every second
+
+    def __init__(self, text="", font=None, parent=None):
+        self.atlases = OrderedDict()
+        super().__init__(text, font, parent)
+
+    def setText(self, text):
+        if text == self._text:
+            return
+        old_text = self._text
+        self._text = text
+        if len(text) != len(old_text):
+            self.refresh_geometry()
+            self.update()
+            return
+        cells = self.cell_rects()
+        for cell, old_char, new_char in zip(cells, old_text, text):
+            if old_char != new_char:
+                self.update(cell)
+
+    def set_color(self, color):
+        color = QColor(color)
+        bucket = self.color_bucket(color)
+        if bucket != self.color_bucket(self._color):
+            self.update(self.text_rect())
+        self._color = color
+
+    def color_bucket(self, color):
+        step = self.COLOR_STEP
+        return tuple(min(255, round(channel / step) * step) for channel in (color.red(), color.green(), color.blue()))
+
+    def cell_width(self, metrics, char):
+        if char.isdigit():
+            return max(metrics.horizontalAdvance(digit) for digit in "0123456789")
+        return metrics.horizontalAdvance(char)
+
+    def compute_size_hint(self):
+        metrics = QFontMetrics(self.font())
+        return QSize(sum(self.cell_width(metrics, char) for char in self._text), metrics.height())
+
+    def cell_rects(self):
+        metrics = QFontMetrics(self.font())
+        widths = [self.cell_width(metrics, char) for char in self._text]
+        x = (self.width() - sum(widths)) // 2
+        y = (self.height() - metrics.height()) // 2
+        cells = []
+        for width in widths:
+            cells.append(QRect(x, y, width, metrics.height()))
+            x += width
+        return cells
+
+    def text_rect(self):
+        cells = self.cell_rects()
+        if not cells:
+            return QRect()
+        return cells[0].united(cells[-1])
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.FontChange:
+            self.atlases.clear()
+        super().changeEvent(event)
+
+    def atlas(self):
+        """Glyph pixmaps (character -> pixmap) for the current font, color bucket and pixel ratio."""
+        ratio = self.devicePixelRatioF()
+        bucket = self.color_bucket(self._color)
+        key = (self.font().key(), bucket, ratio)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = {}
+            self.atlases[key] = atlas
+            while len(self.atlases) > self.ATLAS_LIMIT:
+                self.atlases.popitem(last=False)
+        else:
+            self.atlases.move_to_end(key)
+        return atlas
+
+    def glyph(self, atlas, char, size):
+        pixmap = atlas.get(char)
+        if pixmap is None:
+            ratio = self.devicePixelRatioF()
+            pixmap = QPixmap(math.ceil(size.width() * ratio), math.ceil(size.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(self.font())
+            painter.setPen(QColor(*self.color_bucket(self._color)))
+            painter.drawText(QRect(0, 0, size.width(), size.height()), Qt.AlignmentFlag.AlignCenter, char)
+            painter.end()
+            atlas[char] = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        if not self._text_visible or not self._text:
+            return
+        atlas = self.atlas()
+        painter = QPainter(self)
+        damaged = event.rect()
+        for cell, char in zip(self.cell_rects(), self._text):
+            if cell.intersects(damaged):
+                painter.drawPixmap(cell.topLeft(), self.glyph(atlas, char, cell.size()))
+
 
 class ScalableImageLabel(QLabel):
     def __init__(self, parent=None):
@@ -174,16 +372,10 @@ class TimerWindow(QWidget):
         self.header_layout.setContentsMargins(0, 0, 0, 0)
         self.header_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        self.lbl_title = QLabel("ОСТАТОЧНОЕ ВРЕМЯ ПОХОДА")
-        self.lbl_title.setFont(QFont(FONT_FAMILY_BOLD, 48))
-        self.lbl_title.setStyleSheet("color: white;")
-        self.lbl_title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_title = TimerTextWidget("ОСТАТОЧНОЕ ВРЕМЯ ПОХОДА", QFont(FONT_FAMILY_BOLD, 48))
         self.header_layout.addWidget(self.lbl_title)
         
-        self.lbl_time = QLabel("05:00:00")
-        self.lbl_time.setFont(QFont(FONT_FAMILY_REGULAR, 150))
-        self.lbl_time.setStyleSheet("color: white;")
-        self.lbl_time.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_time = CountdownTextWidget("05:00:00", QFont(FONT_FAMILY_REGULAR, 150))
         self.header_layout.addWidget(self.lbl_time)
         
         self.main_layout.addWidget(self.header_container)
@@ -228,29 +420,13 @@ class TimerWindow(QWidget):
         self.lbl_time.setText(time_str)
         self.progress_bar.update_progress(seconds, red_ratio)
         
-        # Calculate final color based on red effect
-        base_color = QColor(self.current_text_color)
-        if red_ratio > 0:
-            # Blend current text color towards red
-            r = base_color.red() + (255 - base_color.red()) * red_ratio
-            g = base_color.green() * (1 - red_ratio)
-            b = base_color.blue() * (1 - red_ratio)
-            final_color = QColor(int(r), int(g), int(b))
-        else:
-            final_color = base_color
-            
-        # Apply to Title (always visible)
-        self.lbl_title.setStyleSheet(f"color: {final_color.name()};")
-            
-        # Apply to Time (blinking)
-        if blink_visible:
-            self.lbl_time.setStyleSheet(f"color: {final_color.name()};")
-        else:
-            # Use transparent color instead of hiding widget to prevent layout shift
-            self.lbl_time.setStyleSheet("color: transparent;")
-            
-        # Ensure widget is always visible in layout
-        self.lbl_time.show()
+        # Blend current text color towards red
+        final_color = red_shift(self.current_text_color, red_ratio)
+        
+        # Title is always visible, time blinks (hidden text keeps its place in the layout)
+        self.lbl_title.set_color(final_color)
+        self.lbl_time.set_color(final_color)
+        self.lbl_time.set_text_visible(blink_visible)
 
     def set_title(self, title):
         self.lbl_title.setText(title)
@@ -263,8 +439,8 @@ class TimerWindow(QWidget):
         is_light = bg_color.lightness() > 128
         self.current_text_color = "black" if is_light else "white"
         
-        self.lbl_title.setStyleSheet(f"color: {self.current_text_color};")
-        self.lbl_time.setStyleSheet(f"color: {self.current_text_color};")
+        self.lbl_title.set_color(self.current_text_color)
+        self.lbl_time.set_color(self.current_text_color)
         
         # Border for progress bar if background is light
         if is_light:
@@ -302,8 +478,9 @@ class TimerWindow(QWidget):
         elif overlay_type == "Custom":
             self.overlay_widget.show()
             self.overlay_widget.setStyleSheet("background-color: black;")
-            if self.custom_overlay_path and os.path.exists(self.custom_overlay_path):
-                pixmap = QPixmap(self.custom_overlay_path)
+            overlay_path = resolve_media(self.custom_overlay_path)
+            if overlay_path:
+                pixmap = QPixmap(overlay_path)
                 self.overlay_widget.setPixmap(pixmap.scaled(
                     self.size(), 
                     Qt.AspectRatioMode.KeepAspectRatio, 
@@ -444,8 +621,9 @@ class TimerWindow(QWidget):
         
         # Rescale custom image if present
         if self.overlay_widget.isVisible() and self.custom_overlay_path and not self.movie:
-             if os.path.exists(self.custom_overlay_path):
-                pixmap = QPixmap(self.custom_overlay_path)
+             overlay_path = resolve_media(self.custom_overlay_path)
+             if overlay_path:
+                pixmap = QPixmap(overlay_path)
                 self.overlay_widget.setPixmap(pixmap.scaled(
                     self.size(), 
                     Qt.AspectRatioMode.KeepAspectRatio, 
@@ -474,10 +652,19 @@ class Timer(QObject):
     intro_position_changed = pyqtSignal(int, int) # position, duration
     stop_all_audio = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, clock=time.monotonic):
         super().__init__(parent)
         self.total_seconds = 5 * 3600
+        
+        # The countdown follows a monotonic clock (seconds; replaceable in benchmarks), not the number of
+        # timeouts: a late or skipped timeout is caught up on the next one, so slack never accumulates
+        self.clock = clock
+        self.run_started_at = None # Clock time of the start, shifted forward by every pause
+        self.paused_at = None
+        self.ticks_done = 0 # Whole seconds counted down since run_started_at
         self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(self.update)
         self.is_running = False
         self.is_paused = False
@@ -505,9 +692,17 @@ class Timer(QObject):
         self.break_timer.timeout.connect(self.update_break)
         self.break_running = False
         
-        # Intro Logic
+        # Intro Logic (QtMultimedia pipeline is created when the intro is first enabled)
+        self.intro_player = None
+        self.intro_audio = None
+        self.intro_video_sink = None
+        self.intro_volume = 1.0
+
+    def create_intro_player(self):
+        from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QVideoSink
         self.intro_player = QMediaPlayer()
         self.intro_audio = QAudioOutput()
+        self.intro_audio.setVolume(self.intro_volume)
         self.intro_player.setAudioOutput(self.intro_audio)
         self.intro_video_sink = QVideoSink()
         self.intro_player.setVideoOutput(self.intro_video_sink)
@@ -546,14 +741,18 @@ class Timer(QObject):
         if not self.is_running:
             self.is_running = True
             self.is_paused = False
-            self.timer.start(1000)
+            self.run_started_at = self.clock()
+            self.ticks_done = 0
+            self.schedule_next_tick()
             # Resume blinking if needed
             if self.total_seconds <= self.blink_effect_start_seconds:
                 self.blink_timer.start()
 
     def pause(self):
         if self.is_running and not self.is_paused:
+            self.apply_due_ticks()
             self.is_paused = True
+            self.paused_at = self.clock()
             self.timer.stop()
             # Stop blinking, ensure visible
             self.blink_timer.stop()
@@ -563,7 +762,10 @@ class Timer(QObject):
     def resume(self):
         if self.is_running and self.is_paused:
             self.is_paused = False
-            self.timer.start(1000)
+            # The paused interval does not count; the part of a second before the pause is kept
+            self.run_started_at += self.clock() - self.paused_at
+            self.paused_at = None
+            self.schedule_next_tick()
             # Resume blinking if needed
             if self.total_seconds <= self.blink_effect_start_seconds:
                 self.blink_timer.start()
@@ -572,6 +774,8 @@ class Timer(QObject):
         self.is_running = False
         self.is_paused = False
         self.timer.stop()
+        self.run_started_at = None
+        self.paused_at = None
         self.total_seconds = 5 * 3600
         self.blink_state = True
         self.blink_timer.stop()
@@ -587,7 +791,40 @@ class Timer(QObject):
         if self.timer_window:
             self.timer_window.set_title(title)
 
+    def schedule_next_tick(self):
+        """Single-shot wakeup exactly at the next whole-second boundary of the run."""
+        next_tick_at = self.run_started_at + self.ticks_done + 1
+        self.timer.start(max(0, math.ceil((next_tick_at - self.clock()) * 1000)))
+
+    def apply_due_ticks(self):
+        """Counts down every second that has passed by the clock, including ones missed during a stall."""
+        due = int(self.clock() - self.run_started_at)
+        while self.ticks_done < due:
+            self.tick()
+            self.ticks_done += 1
+            if self.total_seconds == 0 and self.last_sound_played_at == 0:
+                # Nothing left to count or play: the remaining ticks would change nothing
+                self.ticks_done = due
+
     def update(self):
+        if not self.is_running or self.is_paused:
+            return
+        self.apply_due_ticks()
+        
+        # Handle blinking activation
+        if self.total_seconds <= self.blink_effect_start_seconds:
+            if not self.blink_timer.isActive():
+                self.blink_timer.start()
+        else:
+            if self.blink_timer.isActive():
+                self.blink_timer.stop()
+            self.blink_state = True
+        
+        self._notify_update()
+        self.schedule_next_tick()
+
+    def tick(self):
+        """One second of the countdown. Sounds fire once per second, even when a stall is caught up."""
         # Sound Logic: Play only if not played recently for this second
         if not self.is_muted and self.total_seconds in self.sound_signals:
             if self.total_seconds != self.last_sound_played_at:
@@ -604,17 +841,6 @@ class Timer(QObject):
         else:
             # If reached 0, we stop counting down but keep running for blink effect
             pass
-        
-        # Handle blinking activation
-        if self.total_seconds <= self.blink_effect_start_seconds:
-            if not self.blink_timer.isActive() and self.is_running and not self.is_paused:
-                self.blink_timer.start()
-        else:
-            if self.blink_timer.isActive():
-                self.blink_timer.stop()
-            self.blink_state = True
-        
-        self._notify_update()
 
     def on_blink_tick(self):
         self.blink_state = not self.blink_state
@@ -724,17 +950,22 @@ class Timer(QObject):
         if enabled:
             path = os.path.join(SCRIPT_DIR, "VisualTab", "Intro.mp4")
             if os.path.exists(path):
+                if self.intro_player is None:
+                    self.create_intro_player()
                 self.intro_player.setSource(QUrl.fromLocalFile(path))
                 if self.timer_window:
                     self.timer_window.show_video(True)
             else:
                 print(f"Intro video not found: {path}")
         else:
-            self.intro_player.stop()
+            if self.intro_player:
+                self.intro_player.stop()
             if self.timer_window:
                 self.timer_window.show_video(False)
 
     def control_intro(self, action):
+        if self.intro_player is None:
+            return
         if action == "play":
             self.stop_all_audio.emit()
             self.intro_player.play()
@@ -745,12 +976,16 @@ class Timer(QObject):
             self.intro_player.setPosition(0)
 
     def seek_intro(self, position):
-        self.intro_player.setPosition(position)
+        if self.intro_player:
+            self.intro_player.setPosition(position)
         
     def set_intro_volume(self, value):
-        self.intro_audio.setVolume(value / 100.0)
+        self.intro_volume = value / 100.0
+        if self.intro_audio:
+            self.intro_audio.setVolume(self.intro_volume)
 
     def on_intro_status_changed(self, status):
+        from PyQt6.QtMultimedia import QMediaPlayer
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
             self.set_intro_state(False)
             self.intro_finished.emit()
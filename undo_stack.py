@@ -0,0 +1,76 @@
+import config
+
+
+class UndoStep:
+    """
+    Один шаг истории: для каждой затронутой ячейки - ссылки на запись до и после.
+    Записи не копируются: при правке ячейка заменяется новой CellRecord,
+    а старая остается в истории как есть (None - ячейки не было).
+    """
+    __slots__ = ('cells', 'storage', 'group')
+
+    def __init__(self, cells, storage, group=None):
+        self.cells = cells      # {(r, c): (до, после)}
+        self.storage = storage  # {номер: (до, после)}
+        self.group = group
+
+    def merge(self, other):
+        """Присоединяет следующий шаг той же группы: остается исходное "до" и новое "после"."""
+        for coord, (before, after) in other.cells.items():
+            self.cells[coord] = (self.cells[coord][0] if coord in self.cells else before, after)
+        for number, (before, after) in other.storage.items():
+            self.storage[number] = (self.storage[number][0] if number in self.storage else before, after)
+
+
+class UndoStack:
+    """Стек отмены/повтора правок карты."""
+    def __init__(self, limit=config.UNDO_LIMIT):
+        self.limit = limit
+        self.undo_steps = []
+        self.redo_steps = []
+
+    def push(self, cells, storage=None, group=None):
+        """
+        Добавляет шаг. Подряд идущие шаги с одинаковой группой (набор одного описания)
+        сливаются в один.
+        """
+        step = UndoStep(cells, storage or {}, group)
+        self.redo_steps.clear()
+        if group is not None and self.undo_steps and self.undo_steps[-1].group == group:
+            self.undo_steps[-1].merge(step)
+            return
+        self.undo_steps.append(step)
+        if len(self.undo_steps) > self.limit:
+            del self.undo_steps[0]
+
+    def break_group(self):
+        """Следующая правка начнет новый шаг, даже если она из той же группы."""
+        if self.undo_steps:
+            self.undo_steps[-1].group = None
+
+    def undo(self):
+        """Возвращает состояние для восстановления: ({координата: запись}, {номер: запись})."""
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return ({coord: before for coord, (before, _) in step.cells.items()},
+                {number: before for number, (before, _) in step.storage.items()})
+
+    def redo(self):
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return ({coord: after for coord, (_, after) in step.cells.items()},
+                {number: after for number, (_, after) in step.storage.items()})
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
@@ -1,6 +1,11 @@
+from collections import OrderedDict
 from PyQt6.QtGui import QFont, QFontMetrics
 from PyQt6.QtWidgets import QFileDialog
-from config import FONT_FAMILY_BOLD, FONT_FAMILY_REGULAR
+import config
+
+FONT_FIT_CACHE_SIZE = 4096  # Сколько подобранных размеров шрифта помнить
+
+_font_fit_cache = OrderedDict()
 
 def hex_to_rgba(hex_color):
     """Преобразует цвет из #RRGGBB в кортеж (r, g, b, 255)."""
@@ -9,37 +14,61 @@ def hex_to_rgba(hex_color):
 
 def get_font_name(is_bold):
     """Возвращает имя шрифта в зависимости от жирности."""
-    return FONT_FAMILY_BOLD if is_bold else FONT_FAMILY_REGULAR
+    # Читается из config при каждом вызове: load_fonts заменяет имена после загрузки файлов шрифтов
+    return config.FONT_FAMILY_BOLD if is_bold else config.FONT_FAMILY_REGULAR
+
+def clear_font_fit_cache():
+    """Сбрасывает подобранные размеры (после смены шрифтов в load_fonts)."""
+    _font_fit_cache.clear()
 
 def get_fitted_font_size(text, is_bold, initial_font_size, max_width):
     """
     Подбирает размер шрифта так, чтобы текст помещался в заданную ширину.
+    Результат запоминается, поэтому повторная отрисовка той же ячейки ничего не измеряет.
     """
     if not text:
         return initial_font_size
 
-    font_size = initial_font_size
     font_name = get_font_name(is_bold)
-    
+    key = (text, is_bold, initial_font_size, max_width, font_name)
+    font_size = _font_fit_cache.get(key)
+    if font_size is not None:
+        _font_fit_cache.move_to_end(key)
+        return font_size
+
+    font_size = _fit_font_size(text, is_bold, font_name, initial_font_size, max_width)
+    _font_fit_cache[key] = font_size
+    if len(_font_fit_cache) > FONT_FIT_CACHE_SIZE:
+        _font_fit_cache.popitem(last=False)
+    return font_size
+
+def _fit_font_size(text, is_bold, font_name, initial_font_size, max_width):
     # Создаем шрифт
-    font = QFont(font_name, font_size)
+    font = QFont(font_name, initial_font_size)
     if is_bold:
         font.setBold(True)
     
     # Разбиваем на строки, ищем самую длинную
     lines = text.replace(' ', '\n').split('\n')
     longest_line = max(lines, key=len) if lines else ""
-    
-    fm = QFontMetrics(font)
-    width = fm.horizontalAdvance(longest_line)
-    
-    while width > max_width and font_size > 5:
-        font_size -= 1
-        font.setPointSize(font_size)
-        fm = QFontMetrics(font)
-        width = fm.horizontalAdvance(longest_line)
-        
-    return font_size
+
+    def fits(size):
+        font.setPointSize(size)
+        return QFontMetrics(font).horizontalAdvance(longest_line) <= max_width
+
+    if initial_font_size <= 5 or fits(initial_font_size):
+        return initial_font_size
+
+    # Двоичный поиск самого крупного размера из [5, initial_font_size), при котором строка помещается.
+    # Меньше 5 не уменьшаем, даже если не помещается
+    low, high = 5, initial_font_size - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
 def mark_as_changed():
     """Заглушка для отметки изменений."""